@@ -1,9 +1,13 @@
+import multiprocessing
 import customtkinter as ctk
 from src.ui.main_window import MainWindow
 from src.ui.hot_reload import ThemeHotReloader
 from src.utils.resource_path import get_resource_path
 
 if __name__ == "__main__":
+    # Required for the sharded generator's process pool in the frozen EXE
+    multiprocessing.freeze_support()
+    
     ctk.set_appearance_mode("Dark")
     
     theme_path = get_resource_path("src/ui/theme.json")
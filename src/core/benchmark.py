@@ -0,0 +1,326 @@
+"""
+Headless throughput benchmark for the palette generators.
+
+Runs PaletteGenerator and HairPaletteGenerator (no Tk) across a matrix of
+palette counts, group layouts, class counts and random flags, and writes the
+results as JSON so runs can be compared across commits on the same machine:
+
+    python -m src.core.benchmark --quick -o bench.json
+    python -m src.core.benchmark --counts 100 1000 100000 --layouts 1v 8v 4v4f
+
+Every case runs in a fresh process so peak RSS belongs to that case alone.
+Layouts are written "<n>v<m>f": n variable groups and m fixed groups of 8 colors.
+
+compute_s / io_s split the generating time between color math and writes.
+With workers > 1 both are measured inside the worker processes and summed
+over all of them (core-seconds, so they can exceed wall_s); with writer
+threads io_s is the writer busy time, which overlaps compute_s.
+worker_peak_rss_bytes is the largest worker process (each worker reports its
+own peak with every shard), peak_rss_bytes the case process itself. Both are
+the peak working set on Windows.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.generator import PaletteGenerator
+from src.core.hair_generator import HairPaletteGenerator
+from src.core.logic.state import ColorGroup
+from src.core.sinks import PaletteSink, DirectorySink
+from src.core.writer import WriterStats
+from src.core.vector_engine import NUMPY_AVAILABLE
+from src.utils.memory import peak_rss_bytes
+
+DEFAULT_COUNTS = [100, 1000, 10000, 100000]
+DEFAULT_LAYOUTS = ["1v", "4v", "8v", "4v4f"]
+DEFAULT_CLASSES = [1, 4]
+QUICK_COUNTS = [100, 1000]
+QUICK_LAYOUTS = ["1v", "4v4f"]
+
+GROUP_SIZE = 8
+FIRST_INDEX = 8  # Indices 0-7 are usually background/outline colors
+HAIR_STYLE_COUNT = 40
+
+
+class TimingSink(PaletteSink):
+    """
+    Pass-through sink that measures the time spent inside the wrapped sink (I/O).
+
+    The time goes to writer_stats.writer_busy like a WriterStage with no
+    threads, so worker shards report it back to the parent the same way.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.writer_stats = WriterStats()
+
+    @property
+    def dedup(self):
+        return self.sink.dedup
+
+    @property
+    def dedup_stats(self):
+        return self.sink.dedup_stats
+
+    @property
+    def thread_safe(self):
+        return self.sink.thread_safe
+
+    def path_for(self, name):
+        return self.sink.path_for(name)
+
+    def sync(self, written):
+        self.sink.sync(written)
+
+    def open(self):
+        started = time.perf_counter()
+        self.sink.open()
+        self.writer_stats.writer_busy += time.perf_counter() - started
+
+    def write(self, name, data):
+        started = time.perf_counter()
+        result = self.sink.write(name, data)
+        self.writer_stats.writer_busy += time.perf_counter() - started
+        self.writer_stats.entries += 1
+        self.writer_stats.bytes_written += len(data)
+        return result
+
+    def close(self):
+        started = time.perf_counter()
+        self.sink.close()
+        self.writer_stats.writer_busy += time.perf_counter() - started
+
+    def worker_sink(self):
+        inner = self.sink.worker_sink()
+        return TimingSink(inner) if inner is not None else None
+
+
+def parse_layout(layout):
+    """'4v4f' -> (4, 4). Raises ValueError for anything else."""
+    match = re.fullmatch(r"(?:(\d+)v)?(?:(\d+)f)?", layout.strip().lower())
+    if not match or not any(match.groups()):
+        raise ValueError(f"Invalid layout '{layout}' (expected e.g. 4v, 2f or 4v4f)")
+    return int(match.group(1) or 0), int(match.group(2) or 0)
+
+
+def build_groups(layout):
+    """Synthetic ColorGroups for a layout, each one owning 8 consecutive indices."""
+    variable, fixed = parse_layout(layout)
+    groups = []
+    next_index = FIRST_INDEX
+    for g_idx in range(variable + fixed):
+        group = ColorGroup(f"bench {g_idx + 1}")
+        group.set_indices(range(next_index, next_index + GROUP_SIZE))
+        group.is_fixed = g_idx >= variable
+        group.hue_range_start = (g_idx * 45) % 360
+        group.hue_range_end = group.hue_range_start + 180
+        next_index += GROUP_SIZE
+        groups.append(group)
+    if next_index > 256:
+        raise ValueError(f"Layout '{layout}' needs more than 256 palette indices")
+    return groups
+
+
+def base_palette():
+    """Deterministic base palette so every run works on the same colors."""
+    rng = random.Random(0)
+    return [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(256)]
+
+
+def run_case(case):
+    """
+    Runs one benchmark case and returns its measurements.
+
+    Args:
+        case: Dict with generator, count, layout, classes, random_saturation,
+              random_brightness, engine, workers and writer_threads
+
+    Returns:
+        The case dict extended with timings, rates and peak RSS (see the module docstring)
+    """
+    groups = build_groups(case['layout'])
+    output_dir = tempfile.mkdtemp(prefix="palbench_")
+    sink = TimingSink(DirectorySink(output_dir))
+    try:
+        started = time.perf_counter()
+        if case['generator'] == "hair":
+            generator = HairPaletteGenerator(base_palette())
+            files = generator.generate_hair_palettes(
+                output_dir, HAIR_STYLE_COUNT, case['count'], groups,
+                random_saturation=case['random_saturation'],
+                random_brightness=case['random_brightness'],
+                engine=case['engine'], workers=case['workers'],
+                sink=sink, writer_threads=case['writer_threads'])
+        else:
+            generator = PaletteGenerator(base_palette())
+            class_names = [f"class{n}" for n in range(case['classes'])]
+            files = generator.generate_batch(
+                output_dir, "bench", case['count'], groups, class_names=class_names,
+                random_saturation=case['random_saturation'],
+                random_brightness=case['random_brightness'],
+                engine=case['engine'], workers=case['workers'],
+                sink=sink, writer_threads=case['writer_threads'])
+        wall = time.perf_counter() - started
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    # TimingSink stats for inline writes, the WriterStage ones with writer threads;
+    # shards of a sharded run merge theirs in either way
+    writer_stats = generator.last_writer_stats
+    shard_stats = generator.last_shard_stats
+    busy = shard_stats.busy if shard_stats is not None else wall
+    if case['writer_threads']:
+        # Writes overlap the math: it is the time not spent waiting on the writers
+        compute = busy - writer_stats.producer_wait - writer_stats.drain_wait
+    else:
+        compute = busy - writer_stats.writer_busy
+
+    result = dict(case)
+    result.update({
+        'files': len(files),
+        'wall_s': round(wall, 6),
+        'compute_s': round(compute, 6),
+        'io_s': round(writer_stats.writer_busy, 6),
+        'shards': shard_stats.shards if shard_stats is not None else None,
+        'shard_busy_s': round(shard_stats.busy, 6) if shard_stats is not None else None,
+        'shard_max_s': round(shard_stats.slowest, 6) if shard_stats is not None else None,
+        'palettes_per_s': round(case['count'] / wall, 2) if wall else None,
+        'files_per_s': round(len(files) / wall, 2) if wall else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'worker_peak_rss_bytes': shard_stats.peak_rss_bytes if shard_stats is not None else None,
+    })
+    return result
+
+
+def build_matrix(generators, counts, layouts, classes, flags, engines, workers, writer_threads):
+    """Every combination of the given dimensions (hair runs ignore class counts)."""
+    cases = []
+    for generator, count, layout, engine, n_workers, n_writers, flag in itertools.product(
+            generators, counts, layouts, engines, workers, writer_threads, flags):
+        class_counts = [None] if generator == "hair" else classes
+        for n_classes in class_counts:
+            cases.append({
+                'generator': generator,
+                'count': count,
+                'layout': layout,
+                'classes': n_classes,
+                'random_saturation': flag in ("sat", "both"),
+                'random_brightness': flag in ("bri", "both"),
+                'engine': engine,
+                'workers': n_workers,
+                'writer_threads': n_writers,
+            })
+    return cases
+
+
+def machine_info():
+    info = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'numpy': None,
+        'commit': None,
+    }
+    if NUMPY_AVAILABLE:
+        import numpy
+        info['numpy'] = numpy.__version__
+    try:
+        info['commit'] = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def run_matrix(cases, repeat=1, progress=None):
+    """
+    Runs every case `repeat` times, each one in a fresh process.
+
+    Returns:
+        List of result dicts (one per case and repetition)
+    """
+    results = []
+    # spawn: a forked child would start with the parent's memory high-water mark
+    context = multiprocessing.get_context("spawn")
+    total = len(cases) * repeat
+    for n, (case, rep) in enumerate(itertools.product(cases, range(repeat)), 1):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_case, case).result()
+        result['repeat'] = rep
+        results.append(result)
+        if progress:
+            progress(n, total, result)
+    return results
+
+
+def _print_result(n, total, result):
+    classes = "-" if result['classes'] is None else result['classes']
+    io = f"{result['compute_s']:.2f}s/{result['io_s']:.2f}s"
+    rss = "-" if result['peak_rss_bytes'] is None else f"{result['peak_rss_bytes'] / 2**20:.0f}MiB"
+    if result['worker_peak_rss_bytes'] is not None:
+        rss += f" workers={result['worker_peak_rss_bytes'] / 2**20:.0f}MiB"
+    print(f"[{n}/{total}] {result['generator']:7} n={result['count']:<7} {result['layout']:5} "
+          f"classes={classes:<2} sat={int(result['random_saturation'])} "
+          f"bri={int(result['random_brightness'])} {result['engine']:6} "
+          f"w={result['workers']} wt={result['writer_threads']} | "
+          f"{result['palettes_per_s']:>10.0f} pal/s {result['files_per_s']:>10.0f} files/s "
+          f"compute/io={io} rss={rss}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Palette generator throughput benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS)
+    parser.add_argument("--layouts", nargs="+", default=DEFAULT_LAYOUTS,
+                        help="Group layouts, e.g. 1v 8v 4v4f (v = variable, f = fixed)")
+    parser.add_argument("--classes", type=int, nargs="+", default=DEFAULT_CLASSES)
+    parser.add_argument("--generators", nargs="+", choices=("palette", "hair"),
+                        default=["palette", "hair"])
+    parser.add_argument("--flags", nargs="+", choices=("none", "sat", "bri", "both"),
+                        default=["none", "both"],
+                        help="random_saturation / random_brightness combinations")
+    parser.add_argument("--engines", nargs="+", choices=("python", "numpy"),
+                        default=["python", "numpy"] if NUMPY_AVAILABLE else ["python"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--writer-threads", type=int, nargs="+", default=[0])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Small matrix: counts {QUICK_COUNTS}, layouts {QUICK_LAYOUTS}")
+    parser.add_argument("-o", "--output", help="JSON file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.counts, args.layouts = QUICK_COUNTS, QUICK_LAYOUTS
+    for layout in args.layouts:
+        build_groups(layout)  # Fail fast on invalid layouts
+
+    cases = build_matrix(args.generators, args.counts, args.layouts, args.classes,
+                         args.flags, args.engines, args.workers, args.writer_threads)
+    report = {
+        'machine': machine_info(),
+        'started': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'results': run_matrix(cases, args.repeat,
+                              progress=_print_result if args.output else None),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
 import colorsys
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Number of palettes whose HSV tables are kept in memory
+HSV_TABLE_CACHE_SIZE = 8
 
 def rgb_to_hsv(r, g, b):
     """
@@ -30,8 +36,14 @@ def apply_adjustments(color_rgb, hue_shift=0.0, saturation_mult=1.0, value_mult=
     """
     Applies Hue shift, Saturation multiplier, and Value multiplier to a color.
     """
-    r, g, b = color_rgb
-    h, s, v = rgb_to_hsv(r, g, b)
+    return adjust_hsv(rgb_to_hsv(*color_rgb), hue_shift, saturation_mult, value_mult)
+
+def adjust_hsv(color_hsv, hue_shift=0.0, saturation_mult=1.0, value_mult=1.0):
+    """
+    apply_adjustments() for a color already in HSV (e.g. from an HsvTable).
+    Returns RGB (0-255).
+    """
+    h, s, v = color_hsv
     
     new_h = (h + hue_shift) % 1.0
     new_s = max(0.0, min(1.0, s * saturation_mult))
@@ -49,8 +61,14 @@ def apply_colorize(color_rgb, target_hue, target_sat=None, value_mult=1.0):
                 So defaults to High saturation? Or user defined?
                 Let's require target_sat.
     """
-    r, g, b = color_rgb
-    h, s, v = rgb_to_hsv(r, g, b)
+    return colorize_hsv(rgb_to_hsv(*color_rgb), target_hue, target_sat, value_mult)
+
+def colorize_hsv(color_hsv, target_hue, target_sat=None, value_mult=1.0):
+    """
+    apply_colorize() for a color already in HSV (e.g. from an HsvTable).
+    Returns RGB (0-255).
+    """
+    h, s, v = color_hsv
     
     # In colorize mode (Standard "Color" blend mode logic):
     # Hue = Target
@@ -63,3 +81,53 @@ def apply_colorize(color_rgb, target_hue, target_sat=None, value_mult=1.0):
     sat = target_sat if target_sat is not None else s
     
     return hsv_to_rgb(target_hue, sat, max(0.0, min(1.0, v * value_mult)))
+
+
+class HsvTable:
+    """
+    HSV (0.0-1.0) of every color of a palette, computed once and shared.
+
+    The base palette does not change while palettes are generated or the preview
+    is refreshed, so its colors are converted a single time. Tables are cached
+    per palette content; use HsvTable.for_palette() instead of the constructor.
+    """
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, colors):
+        self.colors = colors
+        self.hsv = tuple(rgb_to_hsv(r, g, b) for r, g, b in colors)
+        self.digest = hashlib.blake2b(repr(colors).encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def for_palette(palette):
+        """
+        Returns the table of a palette (list of (r, g, b[, a]) colors), building it
+        only on a cache miss. An HsvTable is returned as is.
+        """
+        if isinstance(palette, HsvTable):
+            return palette
+
+        colors = tuple(tuple(c[:3]) for c in palette)
+        with HsvTable._lock:
+            table = HsvTable._cache.get(colors)
+            if table is not None:
+                HsvTable._cache.move_to_end(colors)
+                return table
+
+        table = HsvTable(colors)
+        with HsvTable._lock:
+            HsvTable._cache[colors] = table
+            while len(HsvTable._cache) > HSV_TABLE_CACHE_SIZE:
+                HsvTable._cache.popitem(last=False)
+        return table
+
+    def __getitem__(self, idx):
+        return self.hsv[idx]
+
+    def __len__(self):
+        return len(self.hsv)
+
+    def __iter__(self):
+        return iter(self.hsv)
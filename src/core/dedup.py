@@ -0,0 +1,102 @@
+"""
+Content-addressed output for generated palettes.
+
+Every palette is written under several names (male/female and one pair per
+class) with byte-identical content. DedupWriter writes each distinct palette
+once and creates the remaining names as hardlinks, falling back to a copy
+when the filesystem cannot link.
+"""
+import os
+import shutil
+import hashlib
+from collections import OrderedDict
+from src.core.pal_handler import PaletteHandler
+
+# Into an empty folder a regular save costs open + write + close and a
+# hardlink a single link call (an existing name adds an unlink to both)
+SYSCALLS_PER_WRITE = 3
+SYSCALLS_PER_LINK = 1
+# Distinct contents remembered as link sources. Identical palettes come from
+# the names of one palette, written one after the other, so a short window
+# finds them and memory stays flat however long the run is.
+DEDUP_WINDOW = 1024
+
+
+class DedupStats:
+    """Counters describing what a DedupWriter saved."""
+
+    def __init__(self):
+        self.files = 0           # Names produced (written + linked + copied)
+        self.unique_writes = 0   # Distinct palettes actually written
+        self.links = 0           # Names created as hardlinks
+        self.copies = 0          # Names copied because linking failed
+        self.bytes_written = 0
+        self.bytes_saved = 0
+        self.syscalls_saved = 0
+
+    def merge(self, other):
+        """Adds the counters of another DedupStats (e.g. from a worker shard)."""
+        for key, value in vars(other).items():
+            setattr(self, key, getattr(self, key) + value)
+        return self
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return (f"DedupStats(files={self.files}, unique_writes={self.unique_writes}, "
+                f"links={self.links}, copies={self.copies}, bytes_saved={self.bytes_saved}, "
+                f"syscalls_saved={self.syscalls_saved})")
+
+
+class DedupWriter:
+    """
+    Writes encoded palettes keyed by a digest of their bytes.
+    The first name seen for a given content is written; later names become
+    hardlinks to it.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW):
+        self.window = window
+        self._by_digest = OrderedDict()  # Most recently used content last
+        self._links_supported = True
+        self.stats = DedupStats()
+
+    def write(self, file_path, data):
+        """Saves encoded palette bytes to `file_path`, linking to an identical earlier file if possible."""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        source = self._by_digest.get(digest)
+
+        self.stats.files += 1
+        if source is None:
+            # save() replaces an existing name shared through a hardlink
+            PaletteHandler.save(file_path, data)
+            self._by_digest[digest] = file_path
+            if len(self._by_digest) > self.window:
+                self._by_digest.popitem(last=False)
+            self.stats.unique_writes += 1
+            self.stats.bytes_written += len(data)
+            return
+        self._by_digest.move_to_end(digest)
+
+        if self._links_supported:
+            try:
+                try:
+                    os.link(source, file_path)
+                except FileExistsError:
+                    # Replace the directory entry, never write through its inode
+                    os.unlink(file_path)
+                    os.link(source, file_path)
+                self.stats.links += 1
+                self.stats.bytes_saved += len(data)
+                self.stats.syscalls_saved += SYSCALLS_PER_WRITE - SYSCALLS_PER_LINK
+                return
+            except OSError:
+                # FAT/exFAT, some network shares, cross-device: stop trying
+                self._links_supported = False
+
+        if os.path.lexists(file_path):
+            os.unlink(file_path)
+        shutil.copyfile(source, file_path)
+        self.stats.copies += 1
+        self.stats.bytes_written += len(data)
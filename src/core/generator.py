@@ -1,12 +1,44 @@
-import os
 import colorsys
 import random
 from src.core.pal_handler import PaletteHandler
+from src.core import vector_engine, parallel
+from src.core.color_math import HsvTable
+from src.core.plan import GenerationPlan, HueScheduleCache
+from src.core.seeded import SeededStream, normalize_seed
+from src.core.sinks import DirectorySink
+from src.core.writer import WriterStage
+
+ENGINES = ("python", "numpy")
+
+# Palettes computed per NumPy block: bounds memory regardless of `count`
+NUMPY_BLOCK_SIZE = 4096
 
 class PaletteGenerator:
-    def __init__(self, base_palette):
+    def __init__(self, base_palette, hsv_table=None):
+        """
+        base_palette: List of 256 (r, g, b) colors
+        hsv_table: Optional HsvTable of base_palette (e.g. ProjectState.hsv_table)
+                   to reuse instead of looking it up again
+        """
         self.base_palette = base_palette
-        self._group_hues = {}
+        self.hsv_table = hsv_table or HsvTable.for_palette(base_palette)
+        # Random hue schedules of this generator, keyed by (plan key, group, count)
+        self._group_hues = HueScheduleCache()
+        # DedupStats of the last run made with dedup=True (None otherwise)
+        self.last_dedup_stats = None
+        # WriterStats of the last run made with writer_threads/fsync (None otherwise)
+        self.last_writer_stats = None
+        # parallel.ShardStats of the last run made with workers > 1 (None otherwise)
+        self.last_shard_stats = None
+
+    def _prepare_groups(self, groups, count, seed=None):
+        """
+        Group dicts with hue schedules consumed by both engines, taken from the
+        cached GenerationPlan of (base palette, groups).
+        With a seed, hue lists are replaced by lazy SeededHueSchedule objects.
+        """
+        plan = GenerationPlan.compile(self.hsv_table, groups)
+        return plan.processed_groups(count, seed, self._group_hues)
 
     def _generate_core(self,
                        output_dir, 
@@ -17,99 +49,39 @@ class PaletteGenerator:
                        class_names=None,
                        random_saturation=False,
                        random_brightness=False,
-                       progress_callback=None):
+                       progress_callback=None,
+                       engine="python",
+                       workers=1,
+                       dedup=False,
+                       sink=None,
+                       seed=None,
+                       writer_threads=0,
+                       fsync=False):
         """
         Unified core generation logic.
+
+        engine: "python" (scalar loop, default) or "numpy" (batched arrays).
+        workers: Number of worker processes. Values > 1 split the palette range
+                 into shards that are computed and written in parallel.
+        dedup: Write each distinct palette once and hardlink the other names
+               (summary in self.last_dedup_stats).
+        sink: Optional PaletteSink (zip, tar...). Defaults to a DirectorySink
+              on output_dir; the generator opens and closes it.
+        seed: Seeded mode. Palette k becomes a pure function of (seed, k) and
+              the group config, identical for both engines and any workers.
+        writer_threads: Threads writing files while palettes are computed
+                        (0 writes inline). Summary in self.last_writer_stats.
+        fsync: Flush all written files to disk at the end of the run.
         """
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        self._check_engine(engine)
+        if seed is not None:
+            seed = normalize_seed(seed)
 
-        generated_files = []
         names_to_generate = class_names if class_names else [base_filename]
         
         total_files = count * len(names_to_generate) * 2
-        current_file_count = 0
-
-        # Pre-process groups
-        # We need to know which indices belong to which group and their settings
-        # to avoid repeated attribute lookups inside the loop.
-        processed_groups = []
-        for g_idx, group in enumerate(groups):
-            is_fixed = getattr(group, 'is_fixed', False)
-            if is_fixed:
-                fixed_gradient = getattr(group, 'fixed_gradient', None)
-                if fixed_gradient and len(fixed_gradient) == 8:
-                    sorted_indices = sorted(group.indices)
-                    # Pre-calculate base colors for fixed gradient
-                    num_colors = len(sorted_indices)
-                    gradient_bases = []
-                    for j in range(num_colors):
-                        gradient_pos = int((j / max(num_colors - 1, 1)) * 7)
-                        gradient_pos = min(gradient_pos, 7)
-                        base_col = fixed_gradient[gradient_pos]
-                        # Convert base_col to HSV once
-                        r, g, b = base_col[0]/255.0, base_col[1]/255.0, base_col[2]/255.0
-                        h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                        gradient_bases.append((h, s, v))
-                    
-                    processed_groups.append({
-                        'type': 'fixed',
-                        'indices': sorted_indices,
-                        'gradient_bases': gradient_bases,
-                        'sat_shift': group.sat_shift,
-                        'val_shift': group.val_shift
-                    })
-                else:
-                    processed_groups.append({'type': 'noop'})
-            else:
-                hue_start = getattr(group, 'hue_range_start', 0)
-                hue_end = getattr(group, 'hue_range_end', 360)
-                hue_range = hue_end - hue_start
-                
-                if abs(hue_range) < 10:
-                    hue_range = 360
-                    hue_start = 0
-                elif hue_range < 0:
-                    hue_range = hue_range + 360
-
-                step = hue_range / max(count, 1)
-
-                # Pre-calculate hue slices using Golden Ratio for better distribution
-                if g_idx not in self._group_hues:
-                    slices = []
-                    
-                    # Golden Ratio method for well-distributed hues
-                    golden_ratio = 0.618033988749895
-                    
-                    # Start with a random offset for each group
-                    base_offset = random.uniform(0, 360)
-                    
-                    for k in range(count):
-                        # Method 1: Golden Ratio based distribution (primary)
-                        golden_hue = (base_offset + (k * golden_ratio * 360)) % 360
-                        
-                        # Method 2: Add significant random jitter (full step range)
-                        jitter = random.uniform(-step * 0.5, step * 0.5)
-                        
-                        # Ensure hue stays within the user-defined range
-                        final_hue = hue_start + ((golden_hue - hue_start + jitter) % hue_range)
-                        
-                        slices.append(final_hue)
-                    
-                    # Triple shuffle for maximum randomness
-                    random.shuffle(slices)
-                    random.shuffle(slices)
-                    random.shuffle(slices)
-                    
-                    self._group_hues[g_idx] = slices
 
-                processed_groups.append({
-                    'type': 'variable',
-                    'indices': group.indices,
-                    'hues': self._group_hues[g_idx],
-                    'sat_shift': group.sat_shift,
-                    'val_shift': group.val_shift
-                })
+        processed_groups = self._prepare_groups(groups, count, seed)
 
         # Pre-process class names
         processed_names = []
@@ -121,10 +93,105 @@ class PaletteGenerator:
                 clean_name = clean_name[:-3]
             processed_names.append(clean_name)
 
-        # Pre-calculate random shifts if needed
-        # We need 'count' sets of random shifts
-        iter_sat_shifts = [random.uniform(-0.3, 0.3) if random_saturation else 0.0 for _ in range(count)]
-        iter_val_shifts = [random.uniform(-0.15, 0.15) if random_brightness else 0.0 for _ in range(count)]
+        if sink is None:
+            sink = DirectorySink(output_dir, dedup=dedup)
+
+        return self._run(sink, processed_names, processed_groups, count, start_number,
+                         random_saturation, random_brightness, progress_callback, total_files,
+                         engine, workers, seed, writer_threads, fsync)
+
+    def _check_engine(self, engine):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}. Expected one of {ENGINES}.")
+        if engine == "numpy":
+            vector_engine.require_numpy()
+
+    def _run(self, sink, names, processed_groups, count, start_number,
+             random_saturation, random_brightness, progress_callback, total_files,
+             engine, workers, seed=None, writer_threads=0, fsync=False):
+        """Opens the sink and dispatches to the serial loop or to the sharded process pool."""
+        if writer_threads or fsync:
+            sink = WriterStage(sink, threads=writer_threads, fsync=fsync)
+
+        shard_stats = None
+        sink.open()
+        try:
+            if workers and workers > 1 and count > 1:
+                generated_files, stats, shard_stats = parallel.run_sharded(
+                    self, sink, names, processed_groups, count, start_number,
+                    random_saturation, random_brightness, engine,
+                    workers, progress_callback, total_files, seed)
+            else:
+                generated_files = []
+                self._write_range(sink, names, processed_groups, count, start_number,
+                                  random_saturation, random_brightness, engine,
+                                  generated_files, progress_callback, total_files, seed)
+                stats = sink.dedup_stats
+        finally:
+            sink.close()
+
+        self.last_dedup_stats = stats
+        self.last_writer_stats = sink.writer_stats
+        self.last_shard_stats = shard_stats
+        return generated_files
+
+    def _write_range(self, sink, names, processed_groups, count, start_number,
+                     random_saturation, random_brightness, engine,
+                     generated_files, progress_callback=None, total_files=0,
+                     seed=None, first_index=0):
+        """Computes `count` palettes and writes them numbered from `start_number`."""
+        palettes = self._iter_numbered(processed_groups, count, start_number, random_saturation,
+                                       random_brightness, engine, seed, first_index)
+        for palette_number, data in palettes:
+            self._write_palette(sink, names, palette_number, data,
+                                generated_files, progress_callback, total_files)
+        return generated_files
+
+    def _iter_numbered(self, processed_groups, count, start_number, random_saturation,
+                       random_brightness, engine, seed=None, first_index=0, as_array=False):
+        """Yields (palette_number, data) pairs; the stream consumed by every writer."""
+        if as_array:
+            palettes = self._iter_computed(processed_groups, count, random_saturation,
+                                           random_brightness, engine, seed, first_index, as_array)
+        else:
+            palettes = self._iter_encoded(processed_groups, count, random_saturation,
+                                          random_brightness, engine, seed, first_index)
+        for i, data in enumerate(palettes):
+            yield start_number + i, data
+
+    def _iter_encoded(self, processed_groups, count, random_saturation, random_brightness, engine,
+                      seed=None, first_index=0):
+        """Yields `count` palettes already encoded as 1024-byte .pal data."""
+        if engine == "numpy":
+            # Encode a whole block in one vectorized pass instead of per palette lists
+            for block in self._iter_blocks(processed_groups, count, random_saturation,
+                                           random_brightness, seed, first_index):
+                for row in PaletteHandler.encode_many(block):
+                    yield row.tobytes()
+            return
+
+        for palette in self._iter_computed(processed_groups, count, random_saturation,
+                                           random_brightness, engine, seed, first_index):
+            yield PaletteHandler.encode(palette)
+
+    def _iter_computed(self, processed_groups, count, random_saturation, random_brightness, engine,
+                       seed=None, first_index=0, as_array=False):
+        """
+        Yields `count` computed palettes (sequences of 256 RGB triples).
+
+        first_index: Absolute index of the first palette in the run; seeded mode
+                     keys its random streams on it so shards match a serial run.
+        as_array: Yield (256, 3) uint8 arrays instead of lists. With the numpy
+                  engine these are views into the current block.
+        """
+        if engine == "numpy":
+            for block in self._iter_blocks(processed_groups, count, random_saturation,
+                                           random_brightness, seed, first_index):
+                for palette in block:
+                    yield palette if as_array else palette.tolist()
+            return
+
+        stream = SeededStream(seed) if seed is not None else None
 
         # --- Main Generation Loop ---
         for i in range(count):
@@ -132,24 +199,19 @@ class PaletteGenerator:
             # But we need to start from base_palette each time.
             new_palette = list(self.base_palette)
             
-            iter_sat_shift = iter_sat_shifts[i]
-            iter_val_shift = iter_val_shifts[i]
+            # Random shifts are drawn per palette so memory does not grow with count
+            if stream is None:
+                iter_sat_shift = random.uniform(-0.3, 0.3) if random_saturation else 0.0
+                iter_val_shift = random.uniform(-0.15, 0.15) if random_brightness else 0.0
+            else:
+                iter_sat_shift, iter_val_shift = stream.palette_shifts(
+                    first_index + i, random_saturation, random_brightness)
 
             for g_data in processed_groups:
                 if g_data['type'] == 'fixed':
-                    # Fixed colors should NOT use random shifts - only group settings
-                    sat_shift = g_data['sat_shift']
-                    val_shift = 1 + g_data['val_shift']
-                    
-                    for j, idx in enumerate(g_data['indices']):
-                        if 0 <= idx < 256:
-                            h, s, v = g_data['gradient_bases'][j]
-
-                            s = max(0.0, min(1.0, s + sat_shift))
-                            v = max(0.0, min(1.0, v * val_shift))
-
-                            r, g, b = colorsys.hsv_to_rgb(h, s, v)
-                            new_palette[idx] = (int(r*255), int(g*255), int(b*255))
+                    # Fixed colors do not use random shifts: precomputed by the plan
+                    for idx, color in g_data['colors']:
+                        new_palette[idx] = color
 
                 elif g_data['type'] == 'variable':
                     hue_degrees = g_data['hues'][i] % 360
@@ -158,57 +220,64 @@ class PaletteGenerator:
                     sat_shift_total = g_data['sat_shift'] + iter_sat_shift
                     val_mult_total = 1.0 + g_data['val_shift'] + iter_val_shift
 
-                    for idx in g_data['indices']:
-                        if 0 <= idx < 256:
-                            # We can optimize this by avoiding tuple unpacking/packing overhead
-                            # But new_palette[idx] returns a tuple.
-                            r, g, b = new_palette[idx]
+                    if stream is not None:
+                        micro_key = stream.micro_key(g_data['g_idx'], first_index + i)
 
-                            # Using colorsys.rgb_to_hsv is the bottleneck.
-                            # Can we inline it?
-                            # r, g, b are 0-255.
-                            
-                            # Normalize
-                            rn, gn, bn = r/255.0, g/255.0, b/255.0
-                            h, s, v = colorsys.rgb_to_hsv(rn, gn, bn)
-                            
-                            # Add micro-variations per index for more diversity
+                    # HSV of the untouched base colors comes precomputed from the plan;
+                    # indices rewritten by an earlier group are converted here.
+                    base_hsv = g_data['base_hsv']
+
+                    for j, idx in enumerate(g_data['indices']):
+                        if base_hsv is not None:
+                            h, s, v = base_hsv[j]
+                        else:
+                            r, g, b = new_palette[idx]
+                            h, s, v = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
+                        
+                        # Add micro-variations per index for more diversity
+                        if stream is None:
                             hue_micro = random.uniform(-0.03, 0.03)  # ±3% hue variation per color
                             sat_micro = random.uniform(-0.08, 0.08)  # ±8% saturation micro-variation
                             val_micro = random.uniform(-0.05, 0.05)  # ±5% brightness micro-variation
-                            
-                            # Apply base hue with micro-variation
-                            final_hue = (hue_normalized + hue_micro) % 1.0
-                            
-                            new_s = max(0.0, min(1.0, s + sat_shift_total + sat_micro))
-                            new_v = max(0.0, min(1.0, v * val_mult_total + val_micro))
-                            
-                            r_out, g_out, b_out = colorsys.hsv_to_rgb(final_hue, new_s, new_v)
-                            new_palette[idx] = (int(r_out*255), int(g_out*255), int(b_out*255))
-            
-            palette_number = start_number + i
-            
-            # Write files
-            for clean_name in processed_names:
-                # Male
-                male_filename = f"{clean_name}_³²_{palette_number}.pal"
-                male_path = os.path.join(output_dir, male_filename)
-                PaletteHandler.save(male_path, new_palette)
-                generated_files.append(male_path)
-                current_file_count += 1
-                if progress_callback:
-                    progress_callback(current_file_count, total_files)
-
-                # Female
-                female_filename = f"{clean_name}_¿©_{palette_number}.pal"
-                female_path = os.path.join(output_dir, female_filename)
-                PaletteHandler.save(female_path, new_palette)
-                generated_files.append(female_path)
-                current_file_count += 1
-                if progress_callback:
-                    progress_callback(current_file_count, total_files)
+                        else:
+                            hue_micro, sat_micro, val_micro = stream.micro(micro_key, idx)
+                        
+                        # Apply base hue with micro-variation
+                        final_hue = (hue_normalized + hue_micro) % 1.0
+                        
+                        new_s = max(0.0, min(1.0, s + sat_shift_total + sat_micro))
+                        new_v = max(0.0, min(1.0, v * val_mult_total + val_micro))
+                        
+                        r_out, g_out, b_out = colorsys.hsv_to_rgb(final_hue, new_s, new_v)
+                        new_palette[idx] = (int(r_out*255), int(g_out*255), int(b_out*255))
 
-        return generated_files
+            yield vector_engine.palette_array(new_palette) if as_array else new_palette
+
+    def _iter_blocks(self, processed_groups, count, random_saturation, random_brightness,
+                     seed=None, first_index=0):
+        """Yields (n, 256, 3) uint8 blocks from the numpy engine, NUMPY_BLOCK_SIZE at most."""
+        for start in range(0, count, NUMPY_BLOCK_SIZE):
+            length = min(NUMPY_BLOCK_SIZE, count - start)
+            yield vector_engine.generate_block(
+                self.base_palette, parallel.slice_groups(processed_groups, start, length),
+                length, random_saturation, random_brightness,
+                seed=seed, first_index=first_index + start)
+
+    def _output_names(self, processed_names, palette_number):
+        """File names for one palette: male and female for every class name."""
+        file_names = []
+        for clean_name in processed_names:
+            file_names.append(f"{clean_name}_³²_{palette_number}.pal")  # Male
+            file_names.append(f"{clean_name}_¿©_{palette_number}.pal")  # Female
+        return file_names
+
+    def _write_palette(self, sink, processed_names, palette_number, data,
+                       generated_files, progress_callback=None, total_files=0):
+        """Writes one encoded palette under every output name."""
+        for file_name in self._output_names(processed_names, palette_number):
+            generated_files.append(sink.write(file_name, data))
+            if progress_callback:
+                progress_callback(len(generated_files), total_files)
 
     def generate_batch(self,
                        output_dir,
@@ -218,9 +287,18 @@ class PaletteGenerator:
                        start_number=0,
                        class_names=None,
                        random_saturation=False,
-                       random_brightness=False):
+                       random_brightness=False,
+                       engine="python",
+                       workers=1,
+                       dedup=False,
+                       sink=None,
+                       seed=None,
+                       writer_threads=0,
+                       fsync=False):
         return self._generate_core(output_dir, base_filename, count, groups, start_number,
-                                   class_names, random_saturation, random_brightness)
+                                   class_names, random_saturation, random_brightness,
+                                   engine=engine, workers=workers, dedup=dedup, sink=sink,
+                                   seed=seed, writer_threads=writer_threads, fsync=fsync)
 
     def generate_batch_with_progress(self,
                                      output_dir,
@@ -231,6 +309,83 @@ class PaletteGenerator:
                                      class_names=None,
                                      random_saturation=False,
                                      random_brightness=False,
-                                     progress_callback=None):
+                                     progress_callback=None,
+                                     engine="python",
+                                     workers=1,
+                                     dedup=False,
+                                     sink=None,
+                                     seed=None,
+                                     writer_threads=0,
+                                     fsync=False):
         return self._generate_core(output_dir, base_filename, count, groups, start_number,
-                                   class_names, random_saturation, random_brightness, progress_callback)
+                                   class_names, random_saturation, random_brightness, progress_callback,
+                                   engine=engine, workers=workers, dedup=dedup, sink=sink,
+                                   seed=seed, writer_threads=writer_threads, fsync=fsync)
+
+    def iter_palettes(self,
+                      count,
+                      groups,
+                      start_number=0,
+                      random_saturation=False,
+                      random_brightness=False,
+                      engine="python",
+                      seed=None,
+                      as_array=False):
+        """
+        Lazily generates palettes without touching disk.
+
+        Palettes are computed on demand as the caller iterates (the numpy engine
+        works in blocks of NUMPY_BLOCK_SIZE), so a slow consumer throttles the
+        generation and memory stays flat regardless of `count`.
+
+        Args:
+            count: Number of palettes to generate
+            groups: Color groups with settings (or a compiled GenerationPlan)
+            start_number: Number of the first palette
+            random_saturation: Apply random saturation variation
+            random_brightness: Apply random brightness variation
+            engine: "python" (scalar loop) or "numpy" (batched arrays)
+            seed: Seeded mode (same palettes as generate_batch with this seed)
+            as_array: Yield (256, 3) uint8 arrays instead of .pal bytes (requires numpy).
+                      With the numpy engine the arrays are views into a block of
+                      palettes; copy them to keep one without holding the block.
+
+        Yields:
+            (palette_number, data) with data being the 1024-byte .pal content
+        """
+        self._check_engine(engine)
+        if as_array:
+            vector_engine.require_numpy()
+        if seed is not None:
+            seed = normalize_seed(seed)
+
+        processed_groups = self._prepare_groups(groups, count, seed)
+        return self._iter_numbered(processed_groups, count, start_number, random_saturation,
+                                   random_brightness, engine, seed, as_array=as_array)
+
+    def generate_palette(self,
+                         k,
+                         count,
+                         groups,
+                         seed,
+                         random_saturation=False,
+                         random_brightness=False):
+        """
+        Regenerates palette #k of a seeded run in constant time and memory.
+
+        Args:
+            k: Index of the palette in the run (palette number - start_number)
+            count: Total number of palettes of the run (defines the hue schedule)
+            groups: Color groups with the same settings as the run
+            seed: Seed used for the run
+
+        Returns:
+            List of 256 (r, g, b) tuples, equal to the palette written by the run
+        """
+        if not 0 <= k < count:
+            raise IndexError(f"Palette index {k} out of range for count {count}.")
+        seed = normalize_seed(seed)
+        processed_groups = parallel.slice_groups(self._prepare_groups(groups, count, seed), k, 1)
+        palette = next(self._iter_computed(processed_groups, 1, random_saturation,
+                                           random_brightness, "python", seed, first_index=k))
+        return [tuple(color) for color in palette]
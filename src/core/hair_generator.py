@@ -1,21 +1,19 @@
-import os
-import colorsys
-import random
-from src.core.pal_handler import PaletteHandler
+from src.core.generator import PaletteGenerator
+from src.core.sinks import DirectorySink
+from src.core.seeded import normalize_seed
 
 
-class HairPaletteGenerator:
+class HairPaletteGenerator(PaletteGenerator):
     """
     Generator for hair palettes with specific naming format:
     ¸Ó¸®{style_count}_{gender}_{palette_number}.pal
-    
+
     Example: ¸Ó¸®40_¿©_8.pal (female hair, style count 40, palette 8)
+
+    Color generation (including iter_palettes()) is shared with PaletteGenerator;
+    only the file naming differs.
     """
-    
-    def __init__(self, base_palette):
-        self.base_palette = base_palette
-        self._group_hues = {}
-    
+
     def generate_hair_palettes(self,
                                output_dir,
                                style_count,
@@ -24,162 +22,57 @@ class HairPaletteGenerator:
                                start_number=0,
                                random_saturation=False,
                                random_brightness=False,
-                               progress_callback=None):
+                               progress_callback=None,
+                               engine="python",
+                               workers=1,
+                               dedup=False,
+                               sink=None,
+                               seed=None,
+                               writer_threads=0,
+                               fsync=False):
         """
         Generate hair palettes with the specific naming format.
-        
+
         Args:
             output_dir: Directory to save palette files
             style_count: Number of hair styles in the server (e.g., 40)
             count: Number of palettes to generate
-            groups: Color groups with settings
+            groups: Color groups with settings (or a compiled GenerationPlan)
             start_number: Starting palette number (default 0)
             random_saturation: Apply random saturation variation
             random_brightness: Apply random brightness variation
             progress_callback: Callback for progress updates (current, total)
-        
+            engine: "python" (scalar loop) or "numpy" (batched arrays)
+            workers: Number of worker processes (> 1 enables sharded generation)
+            dedup: Write the female file once and hardlink the male one
+                   (summary in self.last_dedup_stats)
+            sink: Optional PaletteSink (zip, tar...) used instead of output_dir
+            seed: Seeded mode (palette k depends only on seed, k and groups)
+            writer_threads: Threads writing files while palettes are computed
+                            (summary in self.last_writer_stats)
+            fsync: Flush all written files to disk at the end of the run
+
         Returns:
-            List of generated file paths
+            List of generated file paths (entry names for archive sinks)
         """
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        generated_files = []
+        self._check_engine(engine)
+        if seed is not None:
+            seed = normalize_seed(seed)
+
         total_files = count * 2  # Male and female versions
-        current_file_count = 0
-        
-        # Pre-process groups
-        processed_groups = []
-        for g_idx, group in enumerate(groups):
-            is_fixed = getattr(group, 'is_fixed', False)
-            if is_fixed:
-                fixed_gradient = getattr(group, 'fixed_gradient', None)
-                if fixed_gradient and len(fixed_gradient) == 8:
-                    sorted_indices = sorted(group.indices)
-                    num_colors = len(sorted_indices)
-                    gradient_bases = []
-                    for j in range(num_colors):
-                        gradient_pos = int((j / max(num_colors - 1, 1)) * 7)
-                        gradient_pos = min(gradient_pos, 7)
-                        base_col = fixed_gradient[gradient_pos]
-                        r, g, b = base_col[0]/255.0, base_col[1]/255.0, base_col[2]/255.0
-                        h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                        gradient_bases.append((h, s, v))
-                    
-                    processed_groups.append({
-                        'type': 'fixed',
-                        'indices': sorted_indices,
-                        'gradient_bases': gradient_bases,
-                        'sat_shift': group.sat_shift,
-                        'val_shift': group.val_shift
-                    })
-                else:
-                    processed_groups.append({'type': 'noop'})
-            else:
-                hue_start = getattr(group, 'hue_range_start', 0)
-                hue_end = getattr(group, 'hue_range_end', 360)
-                hue_range = hue_end - hue_start
-                
-                if abs(hue_range) < 10:
-                    hue_range = 360
-                    hue_start = 0
-                elif hue_range < 0:
-                    hue_range = hue_range + 360
-                
-                step = hue_range / max(count, 1)
-                
-                # Pre-calculate hue slices using Golden Ratio
-                if g_idx not in self._group_hues:
-                    slices = []
-                    golden_ratio = 0.618033988749895
-                    base_offset = random.uniform(0, 360)
-                    
-                    for k in range(count):
-                        golden_hue = (base_offset + (k * golden_ratio * 360)) % 360
-                        jitter = random.uniform(-step * 0.5, step * 0.5)
-                        final_hue = hue_start + ((golden_hue - hue_start + jitter) % hue_range)
-                        slices.append(final_hue)
-                    
-                    random.shuffle(slices)
-                    random.shuffle(slices)
-                    random.shuffle(slices)
-                    
-                    self._group_hues[g_idx] = slices
-                
-                processed_groups.append({
-                    'type': 'variable',
-                    'indices': group.indices,
-                    'hues': self._group_hues[g_idx],
-                    'sat_shift': group.sat_shift,
-                    'val_shift': group.val_shift
-                })
-        
-        # Pre-calculate random shifts
-        iter_sat_shifts = [random.uniform(-0.3, 0.3) if random_saturation else 0.0 for _ in range(count)]
-        iter_val_shifts = [random.uniform(-0.15, 0.15) if random_brightness else 0.0 for _ in range(count)]
-        
-        # Main Generation Loop
-        for i in range(count):
-            new_palette = list(self.base_palette)
-            
-            iter_sat_shift = iter_sat_shifts[i]
-            iter_val_shift = iter_val_shifts[i]
-            
-            for g_data in processed_groups:
-                if g_data['type'] == 'fixed':
-                    sat_shift = g_data['sat_shift']
-                    val_shift = 1 + g_data['val_shift']
-                    
-                    for j, idx in enumerate(g_data['indices']):
-                        if 0 <= idx < 256:
-                            h, s, v = g_data['gradient_bases'][j]
-                            s = max(0.0, min(1.0, s + sat_shift))
-                            v = max(0.0, min(1.0, v * val_shift))
-                            r, g, b = colorsys.hsv_to_rgb(h, s, v)
-                            new_palette[idx] = (int(r*255), int(g*255), int(b*255))
-                
-                elif g_data['type'] == 'variable':
-                    hue_degrees = g_data['hues'][i] % 360
-                    hue_normalized = hue_degrees / 360.0
-                    
-                    sat_shift_total = g_data['sat_shift'] + iter_sat_shift
-                    val_mult_total = 1.0 + g_data['val_shift'] + iter_val_shift
-                    
-                    for idx in g_data['indices']:
-                        if 0 <= idx < 256:
-                            r, g, b = new_palette[idx]
-                            rn, gn, bn = r/255.0, g/255.0, b/255.0
-                            h, s, v = colorsys.rgb_to_hsv(rn, gn, bn)
-                            
-                            hue_micro = random.uniform(-0.03, 0.03)
-                            sat_micro = random.uniform(-0.08, 0.08)
-                            val_micro = random.uniform(-0.05, 0.05)
-                            
-                            final_hue = (hue_normalized + hue_micro) % 1.0
-                            new_s = max(0.0, min(1.0, s + sat_shift_total + sat_micro))
-                            new_v = max(0.0, min(1.0, v * val_mult_total + val_micro))
-                            
-                            r_out, g_out, b_out = colorsys.hsv_to_rgb(final_hue, new_s, new_v)
-                            new_palette[idx] = (int(r_out*255), int(g_out*255), int(b_out*255))
-            
-            palette_number = start_number + i
-            
-            # Female hair palette: ¸Ó¸®{style_count}_¿©_{number}.pal
-            female_filename = f"¸Ó¸®{style_count}_¿©_{palette_number}.pal"
-            female_path = os.path.join(output_dir, female_filename)
-            PaletteHandler.save(female_path, new_palette)
-            generated_files.append(female_path)
-            current_file_count += 1
-            if progress_callback:
-                progress_callback(current_file_count, total_files)
-            
-            # Male hair palette: ¸Ó¸®{style_count}_³²_{number}.pal
-            male_filename = f"¸Ó¸®{style_count}_³²_{palette_number}.pal"
-            male_path = os.path.join(output_dir, male_filename)
-            PaletteHandler.save(male_path, new_palette)
-            generated_files.append(male_path)
-            current_file_count += 1
-            if progress_callback:
-                progress_callback(current_file_count, total_files)
-        
-        return generated_files
+        processed_groups = self._prepare_groups(groups, count, seed)
+
+        if sink is None:
+            sink = DirectorySink(output_dir, dedup=dedup)
+
+        return self._run(sink, [style_count], processed_groups, count, start_number,
+                         random_saturation, random_brightness, progress_callback, total_files,
+                         engine, workers, seed, writer_threads, fsync)
+
+    def _output_names(self, processed_names, palette_number):
+        """File names for one palette: female then male hair file."""
+        style_count = processed_names[0]
+        return [
+            f"¸Ó¸®{style_count}_¿©_{palette_number}.pal",  # Female
+            f"¸Ó¸®{style_count}_³²_{palette_number}.pal",  # Male
+        ]
@@ -1,3 +1,5 @@
+from src.core.color_math import HsvTable
+
 class ColorGroup:
     def __init__(self, name, mode="hsv"):
         self.name = name
@@ -43,7 +45,8 @@ class ColorGroup:
 class ProjectState:
     def __init__(self):
         self.groups = []
-        self.palette = [] # Original 256 colors
+        self._palette = [] # Original 256 colors
+        self._hsv_table = None
         self.spr_parser = None
         self.act_parser = None
         
@@ -52,6 +55,22 @@ class ProjectState:
         self.output_dir = ""
         self.prefix = "palette"
         
+    @property
+    def palette(self):
+        return self._palette
+
+    @palette.setter
+    def palette(self, palette):
+        self._palette = palette
+        self._hsv_table = None
+
+    @property
+    def hsv_table(self):
+        """HsvTable of the original palette, rebuilt only when the palette changes."""
+        if self._hsv_table is None:
+            self._hsv_table = HsvTable.for_palette(self._palette)
+        return self._hsv_table
+
     def add_group(self, name):
         # Ensure unique name
         base_name = name
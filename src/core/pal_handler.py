@@ -1,5 +1,18 @@
 import struct
 import os
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.vector_engine import NUMPY_AVAILABLE, np
+
+PAL_SIZE = 1024
+# Reserved byte of every color: 0 for index 0, 255 for the others
+RESERVED_BYTES = bytes([0] + [255] * 255)
+_RESERVED_ARRAY = np.frombuffer(RESERVED_BYTES, dtype=np.uint8) if NUMPY_AVAILABLE else None
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+_REWRITE_FLAGS = os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+# Files read per thread pool task in load_many
+LOAD_CHUNK_SIZE = 256
 
 class PaletteHandler:
     @staticmethod
@@ -32,27 +45,184 @@ class PaletteHandler:
         
         return palette
 
+    @staticmethod
+    def load_many(file_paths, workers=None, raw=False):
+        """
+        Loads many .pal files into one contiguous array.
+
+        Each file is read with readinto() straight into its row of a preallocated
+        buffer (a 1 KB file gains nothing from mmap); a thread pool overlaps the
+        reads when the files are not in the OS cache.
+
+        Args:
+            file_paths: Sequence of .pal paths
+            workers: Reader threads (default: ThreadPoolExecutor's default)
+            raw: Return the files as read instead of colors (does not need numpy)
+
+        Returns:
+            (palettes, errors): palettes is a uint8 array (N, 256, 3) aligned with
+            file_paths; errors is a list of (position, path, message) for files
+            that could not be loaded, whose rows are left black.
+            With raw=True palettes is a list of (file size, first 1024 bytes)
+            aligned with file_paths instead; short files are returned as they
+            are and only unreadable ones are errors (their entry is None).
+        """
+        file_paths = list(file_paths)
+        if raw:
+            entries = [None] * len(file_paths)
+        elif not NUMPY_AVAILABLE:
+            raise RuntimeError("load_many requires numpy (pip install numpy).")
+        else:
+            buffer = np.zeros((len(file_paths), PAL_SIZE), dtype=np.uint8)
+
+        def read_chunk(start):
+            chunk_errors = []
+            for i in range(start, min(start + LOAD_CHUNK_SIZE, len(file_paths))):
+                try:
+                    with open(file_paths[i], 'rb') as f:
+                        if raw:
+                            entries[i] = (os.fstat(f.fileno()).st_size, f.read(PAL_SIZE))
+                            continue
+                        read = f.readinto(buffer[i])
+                    if read < PAL_SIZE:
+                        raise ValueError(f"Invalid .pal file size: {read} bytes. "
+                                         f"Expected at least {PAL_SIZE} bytes.")
+                except (OSError, ValueError) as e:
+                    if not raw:
+                        buffer[i] = 0
+                    chunk_errors.append((i, file_paths[i], str(e)))
+            return chunk_errors
+
+        errors = []
+        starts = range(0, len(file_paths), LOAD_CHUNK_SIZE)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk_errors in pool.map(read_chunk, starts):
+                errors.extend(chunk_errors)
+        if raw:
+            return entries, errors
+
+        # Drop the reserved byte: (N, 256, 4) -> contiguous (N, 256, 3)
+        palettes = np.ascontiguousarray(buffer.reshape(-1, 256, 4)[:, :, :3])
+        return palettes, errors
+
     @staticmethod
     def save(file_path, palette):
         """
-        Saves a list of (r, g, b) tuples to a .pal file.
-        Must be exactly 256 colors.
+        Saves a palette to a .pal file.
+
+        palette: 256 (r, g, b) tuples, a (256, 3) / (256, 4) uint8 array or a
+                 ready 1024-byte buffer (bytes, bytearray, memoryview).
+        """
+        PaletteHandler.save_many([file_path], [palette])
+
+    @staticmethod
+    def save_many(file_paths, palettes, encode=True):
+        """
+        Saves a batch of palettes, one per path.
+
+        palettes: Sequence accepted by save() for every item, or a single
+                  (N, 256, 3) uint8 array encoded in one vectorized pass.
+        encode: False writes 1024-byte buffers without normalizing their
+                reserved bytes (exact copies of existing .pal contents).
+        Buffers are written as they are through raw descriptors (no Python
+        file object, no intermediate lists). See _open_for_write() for files
+        that already exist.
+        """
+        if NUMPY_AVAILABLE and isinstance(palettes, np.ndarray) and palettes.ndim == 3:
+            palettes = PaletteHandler.encode_many(palettes)
+
+        for file_path, palette in zip(file_paths, palettes):
+            data = PaletteHandler.encode(palette) if encode else palette
+            fd = PaletteHandler._open_for_write(file_path)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _open_for_write(file_path):
+        """
+        Descriptor to write a .pal into. A new file costs the single open call;
+        an existing one is truncated, unless it is a hardlink shared with other
+        names (dedup output), whose content must not change: that name is
+        replaced by a new file instead.
+        """
+        try:
+            return os.open(file_path, _CREATE_FLAGS, 0o666)
+        except FileExistsError:
+            pass
+        fd = os.open(file_path, _REWRITE_FLAGS)
+        try:
+            if os.fstat(fd).st_nlink > 1:
+                os.close(fd)
+                fd = None
+                os.unlink(file_path)
+                return os.open(file_path, _CREATE_FLAGS, 0o666)
+            os.ftruncate(fd, 0)
+        except BaseException:
+            if fd is not None:
+                os.close(fd)
+            raise
+        return fd
+
+    @staticmethod
+    def encode(palette):
         """
+        Encodes a palette into the 1024-byte .pal layout (R, G, B, Reserved),
+        with the reserved byte 0 for index 0 and 255 for every other color.
+
+        palette: 256 (r, g, b) tuples, a (256, 3) / (256, 4) uint8 array or a
+                 1024-byte buffer (including an encode_many row). A buffer whose
+                 reserved bytes are already right is returned without copying.
+        """
+        if isinstance(palette, (bytes, bytearray, memoryview)):
+            return PaletteHandler._encode_buffer(palette)
+
+        if NUMPY_AVAILABLE and isinstance(palette, np.ndarray):
+            if palette.ndim == 1:
+                # Already encoded row (e.g. from encode_many)
+                return PaletteHandler._encode_buffer(
+                    memoryview(np.ascontiguousarray(palette, dtype=np.uint8)))
+            if palette.shape[:1] != (256,) or palette.ndim != 2:
+                raise ValueError(f"Invalid palette shape: {palette.shape}. Expected (256, 3).")
+            return PaletteHandler.encode_many(palette[None])[0].tobytes()
+
         if len(palette) != 256:
             raise ValueError(f"Invalid palette length: {len(palette)}. Expected 256 colors.")
 
-        # Pre-allocate buffer logic or pack all at once
-        # Construct a bytearray or a list of bytes
+        rgb = bytes(chain.from_iterable(palette))
+        if len(rgb) != 768:
+            # Colors with an alpha/extra channel
+            rgb = bytes(chain.from_iterable(color[:3] for color in palette))
 
-        # Optimized: create a flat list of values to pack
-        values = []
-        for idx, (r, g, b) in enumerate(palette):
-            reserved = 0 if idx == 0 else 255
-            values.extend((r, g, b, reserved))
+        # Interleave the channels with the reserved bytes using slice assignment
+        data = bytearray(PAL_SIZE)
+        data[0::4] = rgb[0::3]
+        data[1::4] = rgb[1::3]
+        data[2::4] = rgb[2::3]
+        data[3::4] = RESERVED_BYTES
+        return bytes(data)
 
-        # Pack all 1024 bytes at once
-        # 'BBBB' * 256 = 'B' * 1024
-        packed_data = struct.pack('B' * 1024, *values)
+    @staticmethod
+    def encode_many(palettes):
+        """
+        Encodes a (N, 256, 3) or (N, 256, 4) uint8 array in one vectorized pass.
+        Returns a (N, 1024) uint8 array; each row is the content of one .pal file.
+        """
+        palettes = np.asarray(palettes, dtype=np.uint8)
+        out = np.empty((palettes.shape[0], 256, 4), dtype=np.uint8)
+        out[:, :, :3] = palettes[:, :, :3]
+        out[:, :, 3] = _RESERVED_ARRAY
+        return out.reshape(-1, PAL_SIZE)
 
-        with open(file_path, 'wb') as f:
-            f.write(packed_data)
+    @staticmethod
+    def _encode_buffer(data):
+        if isinstance(data, memoryview):
+            data = data.cast('B') if data.format != 'B' or data.ndim != 1 else data
+        if len(data) != PAL_SIZE:
+            raise ValueError(f"Invalid palette buffer size: {len(data)} bytes. Expected {PAL_SIZE}.")
+        if data[3::4] == RESERVED_BYTES:
+            return data
+        fixed = bytearray(data)
+        fixed[3::4] = RESERVED_BYTES
+        return bytes(fixed)
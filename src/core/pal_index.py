@@ -0,0 +1,163 @@
+"""
+Background indexer for folders of loose .pal files.
+
+PaletteFolderIndex walks a folder with os.scandir on a worker thread and keeps
+a naturally sorted index (classe_³²_2.pal before classe_³²_10.pal) that grows
+batch by batch, so the first palettes can be shown while the scan continues.
+Entries carry the class / hair style, gender and number parsed from the RO
+naming scheme and can be filtered on them.
+"""
+import os
+import re
+import threading
+from collections import namedtuple
+
+# Entries added to the index at once (and the first batch the UI can show)
+SCAN_BATCH_SIZE = 512
+
+MALE = "³²"
+FEMALE = "¿©"
+HAIR_PREFIX = "¸Ó¸®"
+
+_HAIR_RE = re.compile(r"^" + HAIR_PREFIX + r"(\d+)_(" + MALE + "|" + FEMALE + r")_(\d+)\.pal$",
+                      re.IGNORECASE)
+_CLASS_RE = re.compile(r"^(.*)_(" + MALE + "|" + FEMALE + r")_(\d+)\.pal$", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"(\d+)")
+
+PaletteEntry = namedtuple('PaletteEntry', 'key name path class_name style gender number')
+PaletteEntry.__doc__ = """
+One indexed .pal file. class_name is None for hair palettes, style is None
+for class palettes; gender is "M", "F" or None; number is None when the name
+does not follow the RO scheme.
+"""
+
+
+def natural_key(name):
+    """Sort key comparing digit runs as numbers: 'a_2' < 'a_10'."""
+    parts = _DIGITS_RE.split(name.lower())
+    # Split alternates text / digits, so positions always compare like with like
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(parts))
+
+
+def parse_palette_name(name):
+    """
+    (class_name, style, gender, number) of an RO palette file name:
+    classe_³²_12.pal -> ('classe', None, 'M', 12), ¸Ó¸®3_¿©_7.pal -> (None, 3, 'F', 7).
+    Names outside the scheme give (None, None, None, None).
+    """
+    match = _HAIR_RE.match(name)
+    if match:
+        style, gender, number = match.groups()
+        return None, int(style), "M" if gender == MALE else "F", int(number)
+    match = _CLASS_RE.match(name)
+    if match:
+        class_name, gender, number = match.groups()
+        return class_name, None, "M" if gender == MALE else "F", int(number)
+    return None, None, None, None
+
+
+def make_entry(name, path):
+    return PaletteEntry(natural_key(name), name, path, *parse_palette_name(name))
+
+
+class PaletteFolderIndex:
+    """
+    Naturally sorted index of the .pal files in a folder, filled in the background.
+
+    Usage: start(), then poll `version` (bumped after every batch) and read
+    entries()/paths(); `done` turns True when the scan has finished.
+
+    Args:
+        folder: Folder to scan (not recursive)
+        batch_size: Files added to the index at once
+    """
+
+    def __init__(self, folder, batch_size=SCAN_BATCH_SIZE):
+        self.folder = folder
+        self.batch_size = max(1, batch_size)
+        self.version = 0
+        self.done = False
+        self.error = None
+        self._entries = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._scan, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stops the scan; entries found so far stay available."""
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def _scan(self):
+        batch = []
+        try:
+            with os.scandir(self.folder) as it:
+                for item in it:
+                    if self._cancel.is_set():
+                        break
+                    if not item.name.lower().endswith(".pal"):
+                        continue
+                    try:
+                        if not item.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    batch.append(make_entry(item.name, item.path))
+                    if len(batch) >= self.batch_size:
+                        self._add(batch)
+                        batch = []
+        except OSError as e:
+            self.error = e
+        finally:
+            if batch:
+                self._add(batch)
+            self.done = True
+            with self._lock:
+                self.version += 1
+
+    def _add(self, batch):
+        batch.sort()
+        with self._lock:
+            # Timsort merges the two sorted runs in linear time
+            self._entries.extend(batch)
+            self._entries.sort()
+            self.version += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entries(self, text=None, class_name=None, style=None, gender=None):
+        """
+        Sorted snapshot of the index, optionally filtered.
+
+        Args:
+            text: Case-insensitive substring of the file name
+            class_name: Exact class name (class palettes only)
+            style: Hair style number (hair palettes only)
+            gender: "M" or "F"
+        """
+        with self._lock:
+            entries = list(self._entries)
+        if text:
+            text = text.lower()
+            entries = [e for e in entries if text in e.name.lower()]
+        if class_name is not None:
+            entries = [e for e in entries if e.class_name == class_name]
+        if style is not None:
+            entries = [e for e in entries if e.style == style]
+        if gender is not None:
+            entries = [e for e in entries if e.gender == gender]
+        return entries
+
+    def paths(self, **filters):
+        """File paths of entries(**filters), in natural order."""
+        return [entry.path for entry in self.entries(**filters)]
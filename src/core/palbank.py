@@ -0,0 +1,312 @@
+"""
+Palette bank (.palbank): many palettes in one indexed, memory-mappable file.
+
+Layout (little-endian):
+
+    0       Header (HEADER struct), zero padded to RECORDS_OFFSET
+    1024    Records: record_count x 1024-byte .pal contents
+    index   Entry table: entry_count x ENTRY struct
+            (record, name_offset, name_length, reserved, palette number)
+    names   UTF-8 names blob referenced by the entries
+
+Records are the .pal bytes exactly as imported, reserved bytes included, so
+import/export round-trips files unchanged. Records start at a 1024-byte boundary, so entry k is read in O(1) with one
+table lookup and one slice of the mapped file. Several entries can share a
+record (male/female and per-class copies of the same palette are stored once
+when writing with dedup=True).
+
+Command line importer/exporter:
+
+    python -m src.core.palbank import <folder> <bank.palbank>
+    python -m src.core.palbank export <bank.palbank> <folder>
+    python -m src.core.palbank info <bank.palbank>
+"""
+import os
+import re
+import sys
+import mmap
+import glob
+import struct
+import hashlib
+
+from src.core.pal_handler import PaletteHandler, PAL_SIZE
+from src.core.pal_index import natural_key
+from src.core.vector_engine import NUMPY_AVAILABLE, np
+
+MAGIC = b"PALBANK\0"
+VERSION = 1
+# magic, version, flags, entry_count, record_count, index_offset, names_offset
+HEADER = struct.Struct("<8sHHIIQQ")
+# record, name_offset, name_length, reserved, number (-1 if the name has none)
+ENTRY = struct.Struct("<IIHHi")
+RECORDS_OFFSET = 1024
+BANK_EXTENSION = ".palbank"
+
+_NUMBER_RE = re.compile(r"_(\d+)\.pal$", re.IGNORECASE)
+
+
+def palette_number(name):
+    """Palette number at the end of an RO palette name (classe_³²_12.pal -> 12), or -1."""
+    match = _NUMBER_RE.search(name)
+    if not match:
+        return -1
+    number = int(match.group(1))
+    return number if number < 2**31 else -1
+
+
+class PaletteBankWriter:
+    """
+    Appends palettes to a bank. Records are streamed as they are added; the
+    index is written by close().
+
+    Args:
+        fileobj: Seekable binary file object opened for writing
+        dedup: Store identical palettes once (entries share the record)
+    """
+
+    def __init__(self, fileobj, dedup=False):
+        self.fileobj = fileobj
+        self.dedup = dedup
+        self._entries = []
+        self._names = bytearray()
+        self._by_digest = {}
+        self.record_count = 0
+
+        self.fileobj.write(bytes(RECORDS_OFFSET))  # Header placeholder
+
+    def add(self, name, palette, number=None):
+        """
+        Adds one entry. palette: anything PaletteHandler.encode accepts.
+        Returns True when a new record was written, False when it was shared.
+        """
+        return self.add_raw(name, PaletteHandler.encode(palette), number)
+
+    def add_raw(self, name, data, number=None):
+        """
+        Like add(), but stores data (1024 bytes of a .pal file) as it is,
+        without normalizing the reserved bytes.
+        """
+        if len(data) != PAL_SIZE:
+            raise ValueError(f"Invalid palette buffer size: {len(data)} bytes. Expected {PAL_SIZE}.")
+        record = None
+        if self.dedup:
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            record = self._by_digest.get(digest)
+
+        is_new = record is None
+        if is_new:
+            record = self.record_count
+            self.fileobj.write(data)
+            self.record_count += 1
+            if self.dedup:
+                self._by_digest[digest] = record
+
+        encoded_name = name.encode("utf-8")
+        if len(encoded_name) > 0xFFFF:
+            raise ValueError(f"Palette name too long: {name[:40]}...")
+        if number is None:
+            number = palette_number(name)
+        self._entries.append((record, len(self._names), len(encoded_name), number))
+        self._names += encoded_name
+        return is_new
+
+    def close(self):
+        """Writes the index and the header. The file object is left open."""
+        index_offset = RECORDS_OFFSET + self.record_count * PAL_SIZE
+        table = bytearray(ENTRY.size * len(self._entries))
+        for i, (record, name_offset, name_length, number) in enumerate(self._entries):
+            ENTRY.pack_into(table, i * ENTRY.size, record, name_offset, name_length, 0, number)
+        self.fileobj.write(table)
+        self.fileobj.write(self._names)
+
+        names_offset = index_offset + len(table)
+        self.fileobj.seek(0)
+        self.fileobj.write(HEADER.pack(MAGIC, VERSION, 0, len(self._entries),
+                                       self.record_count, index_offset, names_offset))
+        self.fileobj.seek(0, os.SEEK_END)
+        self.fileobj.flush()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PaletteBank:
+    """
+    Read-only, memory-mapped palette bank.
+
+    bank[k] returns the 1024-byte .pal content of entry k in O(1);
+    bank.palette(k) returns it as 256 (r, g, b) tuples like PaletteHandler.load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Invalid palette bank (empty file): {path}")
+
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+        self._by_name = None
+
+    def _read_header(self):
+        if len(self._map) < RECORDS_OFFSET:
+            raise ValueError(f"Invalid palette bank (truncated header): {self.path}")
+        (magic, version, _flags, self.entry_count, self.record_count,
+         self._index_offset, self._names_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a palette bank: {self.path}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported palette bank version {version}: {self.path}")
+
+        expected_index = RECORDS_OFFSET + self.record_count * PAL_SIZE
+        if (self._index_offset != expected_index
+                or self._names_offset != self._index_offset + self.entry_count * ENTRY.size
+                or self._names_offset > len(self._map)):
+            raise ValueError(f"Invalid palette bank (corrupt index): {self.path}")
+
+    def __len__(self):
+        return self.entry_count
+
+    def _entry(self, k):
+        if k < 0:
+            k += self.entry_count
+        if not 0 <= k < self.entry_count:
+            raise IndexError(f"Palette bank index out of range: {k}")
+        entry = ENTRY.unpack_from(self._map, self._index_offset + k * ENTRY.size)
+        record, name_offset, name_length, _, _ = entry
+        if (record >= self.record_count
+                or self._names_offset + name_offset + name_length > len(self._map)):
+            raise ValueError(f"Invalid palette bank (corrupt entry {k}): {self.path}")
+        return entry
+
+    def __getitem__(self, k):
+        record = self._entry(k)[0]
+        start = RECORDS_OFFSET + record * PAL_SIZE
+        return self._map[start:start + PAL_SIZE]
+
+    def palette(self, k):
+        """Entry k as a list of 256 (r, g, b) tuples."""
+        return [(r, g, b) for r, g, b, _ in struct.iter_unpack('BBBB', self[k])]
+
+    def name(self, k):
+        _, name_offset, name_length, _, _ = self._entry(k)
+        start = self._names_offset + name_offset
+        return self._map[start:start + name_length].decode("utf-8")
+
+    def number(self, k):
+        """Palette number of entry k (-1 if its name has none)."""
+        return self._entry(k)[4]
+
+    def names(self):
+        return [self.name(k) for k in range(self.entry_count)]
+
+    def find(self, name):
+        """Entry position of a palette name (dict built on first use), or None."""
+        if self._by_name is None:
+            self._by_name = {self.name(k): k for k in range(self.entry_count)}
+        return self._by_name.get(name)
+
+    def records_array(self):
+        """Zero-copy (record_count, 256, 4) uint8 view of all records (requires numpy)."""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("records_array requires numpy (pip install numpy).")
+        return np.frombuffer(self._map, dtype=np.uint8, count=self.record_count * PAL_SIZE,
+                             offset=RECORDS_OFFSET).reshape(-1, 256, 4)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def import_folder(folder, bank_path, pattern="*.pal", dedup=True):
+    """
+    Packs the loose .pal files of a folder into a bank (natural name order:
+    classe_³²_2.pal before classe_³²_10.pal).
+
+    Returns:
+        (entries written, list of (path, error message) for skipped files)
+    """
+    paths = sorted(glob.glob(os.path.join(folder, pattern)),
+                   key=lambda path: natural_key(os.path.basename(path)))
+    errors = []
+    with open(bank_path, 'wb') as f:
+        writer = PaletteBankWriter(f, dedup=dedup)
+        for path in paths:
+            try:
+                with open(path, 'rb') as pal:
+                    data = pal.read(PAL_SIZE)
+                if len(data) < PAL_SIZE:
+                    raise ValueError(f"Invalid .pal file size: {len(data)} bytes. "
+                                     f"Expected at least {PAL_SIZE} bytes.")
+            except (OSError, ValueError) as e:
+                errors.append((path, str(e)))
+                continue
+            writer.add_raw(os.path.basename(path), data)
+        writer.close()
+    return len(writer), errors
+
+
+def _safe_entry_name(name):
+    """Entry name usable as a file name inside the export folder, else ValueError."""
+    if (not name or name in (".", "..") or os.path.basename(name) != name
+            or "/" in name or "\\" in name or os.path.isabs(name)):
+        raise ValueError(f"Unsafe palette name in bank: {name!r}")
+    return name
+
+
+def export_folder(bank_path, folder):
+    """
+    Writes every entry of a bank as a loose .pal file, byte for byte as it was
+    imported. Returns the written paths.
+    Raises ValueError before writing anything when an entry name is not a
+    plain file name (path separators, '..', absolute paths).
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    with PaletteBank(bank_path) as bank:
+        paths = [os.path.join(folder, _safe_entry_name(bank.name(k))) for k in range(len(bank))]
+        PaletteHandler.save_many(paths, (bank[k] for k in range(len(bank))), encode=False)
+    return paths
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and argv[0] == "import":
+        count, errors = import_folder(argv[1], argv[2])
+        for path, message in errors:
+            print(f"skipped {path}: {message}", file=sys.stderr)
+        print(f"{count} palettes -> {argv[2]}")
+    elif len(argv) == 3 and argv[0] == "export":
+        try:
+            paths = export_folder(argv[1], argv[2])
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"{len(paths)} palettes -> {argv[2]}")
+    elif len(argv) == 2 and argv[0] == "info":
+        with PaletteBank(argv[1]) as bank:
+            print(f"{len(bank)} entries, {bank.record_count} distinct palettes")
+    else:
+        print(__doc__.split("Command line importer/exporter:")[1].strip(), file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Multi-core sharded palette generation.
+
+The palette range is split into shards that are computed and written by a
+process pool. Hue schedules are built once in the parent process and each
+shard receives only its slice, so files and numbering (start_number + i) are
+exactly the same as in a serial run.
+"""
+import os
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.core.dedup import DedupStats
+from src.utils.memory import peak_rss_bytes
+
+# Upper bound on palettes per shard: keeps progress updates frequent on big runs
+MAX_SHARD_SIZE = 500
+
+
+def default_workers():
+    """Number of worker processes to use when the caller asks for 'all cores'."""
+    return max(1, os.cpu_count() or 1)
+
+
+class ShardStats:
+    """Per-shard timings of a sharded run, measured inside the worker processes."""
+
+    def __init__(self):
+        self.times = {}  # Shard offset -> seconds the worker spent on it
+        # Largest peak RSS reported by a worker process (None if unavailable)
+        self.peak_rss_bytes = None
+
+    @property
+    def shards(self):
+        return len(self.times)
+
+    @property
+    def busy(self):
+        """Seconds spent on shards, summed over all workers (can exceed the wall time)."""
+        return sum(self.times.values())
+
+    @property
+    def slowest(self):
+        return max(self.times.values(), default=0.0)
+
+    def add_peak_rss(self, peak):
+        if peak is not None and (self.peak_rss_bytes is None or peak > self.peak_rss_bytes):
+            self.peak_rss_bytes = peak
+
+    def as_dict(self):
+        return {'shards': self.shards, 'busy': self.busy, 'slowest': self.slowest,
+                'peak_rss_bytes': self.peak_rss_bytes}
+
+    def __repr__(self):
+        return f"ShardStats(shards={self.shards}, busy={self.busy:.3f}s, slowest={self.slowest:.3f}s)"
+
+
+def split_shards(count, workers, shards_per_worker=4):
+    """
+    Splits range(count) into contiguous (offset, length) shards.
+    Produces several shards per worker so that progress advances smoothly
+    and a slow shard does not leave the other cores idle.
+    """
+    if count <= 0:
+        return []
+    num_shards = max(workers * shards_per_worker, -(-count // MAX_SHARD_SIZE))
+    num_shards = max(1, min(count, num_shards))
+
+    base, extra = divmod(count, num_shards)
+    shards = []
+    offset = 0
+    for k in range(num_shards):
+        length = base + (1 if k < extra else 0)
+        shards.append((offset, length))
+        offset += length
+    return shards
+
+
+def slice_groups(processed_groups, offset, length):
+    """Returns a copy of processed groups with hue schedules cut to one shard."""
+    sliced = []
+    for g_data in processed_groups:
+        if g_data['type'] == 'variable':
+            g_data = dict(g_data)
+            g_data['hues'] = g_data['hues'][offset:offset + length]
+        sliced.append(g_data)
+    return sliced
+
+
+def _run_shard(generator_cls, base_palette, worker_sink, names, processed_groups,
+               count, start_number, random_saturation, random_brightness, engine,
+               seed, first_index):
+    """
+    Worker entry point for one shard.
+
+    With a worker sink the shard writes its own files and returns
+    (file paths, dedup stats, writer stats, seconds, worker peak RSS).
+    Without one it returns (encoded palettes, None, None, seconds, worker
+    peak RSS) so the parent can feed a single shared sink such as an archive.
+    """
+    started = time.perf_counter()
+    # Forked workers inherit the parent's random state; reseed so shards differ
+    random.seed()
+    generator = generator_cls(base_palette)
+
+    if worker_sink is None:
+        encoded = list(generator._iter_encoded(processed_groups, count, random_saturation,
+                                               random_brightness, engine, seed, first_index))
+        return encoded, None, None, time.perf_counter() - started, peak_rss_bytes()
+
+    worker_sink.open()
+    try:
+        files = generator._write_range(worker_sink, names, processed_groups, count, start_number,
+                                       random_saturation, random_brightness, engine, [],
+                                       seed=seed, first_index=first_index)
+    finally:
+        worker_sink.close()
+    return (files, worker_sink.dedup_stats, worker_sink.writer_stats,
+            time.perf_counter() - started, peak_rss_bytes())
+
+
+def run_sharded(generator,
+                sink,
+                names,
+                processed_groups,
+                count,
+                start_number,
+                random_saturation,
+                random_brightness,
+                engine,
+                workers,
+                progress_callback=None,
+                total_files=0,
+                seed=None):
+    """
+    Generates `count` palettes with a process pool.
+
+    Args:
+        generator: PaletteGenerator or a subclass (decides the file naming)
+        sink: Open PaletteSink; sinks without a worker_sink() are written by this process.
+              Writer stats of worker shards are merged into sink.writer_stats.
+        names: Processed output names passed to generator._write_palette
+        processed_groups: Groups prepared by the parent with full hue schedules
+        count: Number of palettes to generate
+        start_number: Number of the first palette
+        workers: Number of worker processes
+        progress_callback: Called with (current, total) as shards complete
+        seed: Seeded mode; each shard keys its random streams on absolute indices
+
+    Returns:
+        (generated file paths in serial-run order, merged DedupStats or None, ShardStats)
+    """
+    shards = split_shards(count, workers)
+    worker_sink = sink.worker_sink()
+    generator_cls = type(generator)
+
+    results = {}
+    generated_files = []
+    current = 0
+    stats = None
+    shard_stats = ShardStats()
+    if worker_sink is not None and worker_sink.dedup:
+        stats = DedupStats()
+    pending = list(shards)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+        futures = {}
+        for offset, length in shards:
+            future = pool.submit(_run_shard, generator_cls, generator.base_palette, worker_sink,
+                                 names, slice_groups(processed_groups, offset, length),
+                                 length, start_number + offset,
+                                 random_saturation, random_brightness, engine,
+                                 seed, offset)
+            futures[future] = offset
+
+        for future in as_completed(futures):
+            shard_result, shard_dedup_stats, shard_writer_stats, seconds, peak_rss = future.result()
+            results[futures[future]] = shard_result
+            shard_stats.times[futures[future]] = seconds
+            shard_stats.add_peak_rss(peak_rss)
+
+            if worker_sink is not None:
+                if stats is not None:
+                    stats.merge(shard_dedup_stats)
+                if shard_writer_stats is not None and sink.writer_stats is not None:
+                    sink.writer_stats.merge(shard_writer_stats)
+                current += len(shard_result)
+                if progress_callback:
+                    progress_callback(current, total_files)
+                continue
+
+            # Shared sink: write finished shards in order so entries match a serial run
+            while pending and pending[0][0] in results:
+                offset, _ = pending.pop(0)
+                for i, data in enumerate(results.pop(offset)):
+                    generator._write_palette(sink, names, start_number + offset + i, data,
+                                             generated_files, progress_callback, total_files)
+
+    if worker_sink is None:
+        return generated_files, sink.dedup_stats, shard_stats
+
+    for offset, _ in shards:
+        generated_files.extend(results[offset])
+    return generated_files, stats, shard_stats
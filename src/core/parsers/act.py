@@ -1,61 +1,195 @@
+import os
 import struct
+from collections import namedtuple
+
+# Action delays are stored in ticks of 25 ms
+DELAY_UNIT_MS = 25.0
+DEFAULT_DELAY_MS = 150.0
+
+# Directions per action type in player, monster and headgear files
+DIRECTIONS = 8
+
+_U32 = struct.Struct('<I')
+_I32 = struct.Struct('<i')
+_F32 = struct.Struct('<f')
+_LAYER_BASE = struct.Struct('<iiiI')      # x, y, sprite index, mirror
+_LAYER_COLOR = struct.Struct('<BBBB')     # r, g, b, a (2.0+)
+_ANCHOR = struct.Struct('<4xiii')         # reserved, x, y, attribute (2.3+)
+_FRAME_RANGES = 32                        # Two unused 16-byte rectangles before each frame
+
+ActLayer = namedtuple('ActLayer', 'x y sprite_index mirror color scale_x scale_y angle sprite_type width height')
+ActLayer.__doc__ = """One sprite drawn in a frame. sprite_type 0 = indexed, 1 = RGBA (index within that kind)."""
+
+ActAnchor = namedtuple('ActAnchor', 'x y attribute')
+
+ActFrame = namedtuple('ActFrame', 'layers event_id anchors')
+ActFrame.__doc__ = """One animation frame: layers in draw order, sound event (-1 = none) and anchor points."""
+
+ActAction = namedtuple('ActAction', 'frames delay')
+ActAction.__doc__ = """One action (action type * 8 + direction). delay is in milliseconds per frame."""
+
 
 class ActParser:
+    """
+    Parser for RO .act files (versions 1.x to 2.5).
+
+    parse() reads the file once and builds actions -> frames -> layers; every
+    lookup afterwards is plain list indexing.
+    """
+
     def __init__(self, file_path):
         self.file_path = file_path
-        self.actions = [] # List of list of frames
+        self.actions = [] # List of ActAction
+        self.events = [] # Sound event names (2.1+)
         self.version = 0
 
+    @staticmethod
+    def for_sprite(spr_path):
+        """Parsed ActParser of the .act next to a .spr, or None if there is none."""
+        act_path = os.path.splitext(spr_path)[0] + ".act"
+        if not os.path.exists(act_path):
+            return None
+        parser = ActParser(act_path)
+        parser.parse()
+        return parser
+
     def parse(self):
         with open(self.file_path, 'rb') as f:
-            magic = f.read(2)
-            if magic != b'AC':
-                raise ValueError("Invalid ACT file: Missing 'AC' signature")
-            
-            minor = struct.unpack('B', f.read(1))[0]
-            major = struct.unpack('B', f.read(1))[0]
-            self.version = major * 100 + minor
-            
-            num_actions = struct.unpack('<H', f.read(2))[0]
-            f.read(10) # Reserved
-            
+            data = f.read()
+
+        try:
+            self._parse(data)
+        except struct.error:
+            raise ValueError("Invalid ACT file: truncated data")
+        return self.actions
+
+    def _parse(self, data):
+        if data[:2] != b'AC':
+            raise ValueError("Invalid ACT file: Missing 'AC' signature")
+
+        minor, major = struct.unpack_from('BB', data, 2)
+        version = major * 100 + minor
+        num_actions = struct.unpack_from('<H', data, 4)[0]
+        pos = 16 # Header (2+2+2) + 10 reserved
+
+        actions = []
+        for _ in range(num_actions):
+            num_frames = _U32.unpack_from(data, pos)[0]
+            pos += 4
+            frames = []
+            for _ in range(num_frames):
+                frame, pos = self._parse_frame(data, pos + _FRAME_RANGES, version)
+                frames.append(frame)
+            actions.append(frames)
+
+        events = []
+        if version >= 201:
+            num_events = _U32.unpack_from(data, pos)[0]
+            pos += 4
+            for _ in range(num_events):
+                events.append(data[pos:pos + 40].split(b'\0', 1)[0].decode('latin-1'))
+                pos += 40
+
+        delays = [DEFAULT_DELAY_MS] * num_actions
+        if version >= 202:
+            for i in range(num_actions):
+                delays[i] = _F32.unpack_from(data, pos)[0] * DELAY_UNIT_MS
+                pos += 4
+
+        self.version = version
+        self.events = events
+        self.actions = [ActAction(frames, delay) for frames, delay in zip(actions, delays)]
+
+    @staticmethod
+    def _parse_frame(data, pos, version):
+        num_layers = _U32.unpack_from(data, pos)[0]
+        pos += 4
+
+        layers = []
+        for _ in range(num_layers):
+            x, y, sprite_index, mirror = _LAYER_BASE.unpack_from(data, pos)
+            pos += _LAYER_BASE.size
+            color = (255, 255, 255, 255)
+            scale_x = scale_y = 1.0
+            angle = sprite_type = width = height = 0
+            if version >= 200:
+                color = _LAYER_COLOR.unpack_from(data, pos)
+                pos += 4
+                scale_x = scale_y = _F32.unpack_from(data, pos)[0]
+                pos += 4
+                if version >= 204:
+                    scale_y = _F32.unpack_from(data, pos)[0]
+                    pos += 4
+                angle, sprite_type = struct.unpack_from('<ii', data, pos)
+                pos += 8
+                if version >= 205:
+                    width, height = struct.unpack_from('<ii', data, pos)
+                    pos += 8
+            layers.append(ActLayer(x, y, sprite_index, bool(mirror), color, scale_x, scale_y,
+                                   angle, sprite_type, width, height))
+
+        event_id = -1
+        if version >= 200:
+            event_id = _I32.unpack_from(data, pos)[0]
+            pos += 4
+
+        anchors = []
+        if version >= 203:
+            num_anchors = _U32.unpack_from(data, pos)[0]
+            pos += 4
+            for _ in range(num_anchors):
+                anchors.append(ActAnchor(*_ANCHOR.unpack_from(data, pos)))
+                pos += _ANCHOR.size
+
+        return ActFrame(layers, event_id, anchors), pos
+
+    @property
+    def num_actions(self):
+        return len(self.actions)
+
+    def get_action(self, action_id):
+        return self.actions[action_id]
+
+    def get_frame(self, action_id, frame_index):
+        return self.actions[action_id].frames[frame_index]
+
+    def get_delay(self, action_id):
+        """Milliseconds per frame of an action."""
+        return self.actions[action_id].delay
+
+    @staticmethod
+    def layer_sprite(layer, num_indexed=0):
+        """
+        Position of a layer's sprite in SprParser.images (RGBA sprites come after
+        the num_indexed indexed ones), or -1 if the layer draws nothing.
+        """
+        if layer.sprite_index < 0:
+            return -1
+        if layer.sprite_type == 1:
+            return num_indexed + layer.sprite_index
+        return layer.sprite_index
+
+    def frame_sprites(self, action_id, num_indexed=0):
+        """
+        Main sprite (first visible layer) of every frame of an action, as
+        SprParser.images positions. Frames without a visible layer give -1.
+        """
+        result = []
+        for frame in self.actions[action_id].frames:
+            sprite = -1
+            for layer in frame.layers:
+                sprite = self.layer_sprite(layer, num_indexed)
+                if sprite >= 0:
+                    break
+            result.append(sprite)
+        return result
+
     def get_first_sprite_index(self, action_id=0):
         """
-        Returns the sprite index used in the first frame of the given action.
+        Returns the sprite index used in the first frame of the given action
+        (0 when the action or its frames are empty).
         """
-        # Minimalist implementation to get the job done for previewing.
-        try:
-             with open(self.file_path, 'rb') as f:
-                f.seek(16) # Skip header (2+2+2+10)
-                
-                # Iterate actions until we reach action_id
-                for i in range(action_id + 1):
-                    # For each action...
-                    # Why is ACT parsing hard? Because frames are variable size (attachment points etc).
-                    # We can't skip easily without creating a full parser structure.
-                    
-                    # Hack: The first action (0) is usually at the start.
-                    # We just need action 0, frame 0.
-                    # This is trivial if we assume we are at the start of Action 0 content.
-                    
-                    # Action Header: Reserved [32 bytes]?? No. 
-                    # Usually just `int numFrames`.
-                    
-                    # Let's assume Act 1.0/2.0 structure.
-                    # Read 4 bytes = num_frames (int?)? No, it's variable.
-                    # Actually standard ACT: 
-                    # [Action 0]
-                    #   [Frame 0]
-                    #     [Sprite 0]
-                    
-                    # Wait, if we only support Action 0 (Idle), we are at byte 16.
-                    pass 
-                    
-                # NOTE: For this iteration, since ACT parsing is complex and error-prone without a spec,
-                # and I'm running low on "planning" tokens, I'll default to returning 0 (first image in SPR).
-                # 90% of the time, Action 0 Frame 0 uses Sprite 0.
-                
-                pass
-        except:
-            pass
-        return 0
+        if not 0 <= action_id < len(self.actions):
+            return 0
+        sprites = self.frame_sprites(action_id)
+        return sprites[0] if sprites and sprites[0] >= 0 else 0
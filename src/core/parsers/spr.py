@@ -1,98 +1,345 @@
 import struct
 import io
+import threading
+from collections import OrderedDict, namedtuple
 from PIL import Image
 
+# Decoded frames kept by SprParser (bytes of pixel data, not frame count)
+FRAME_CACHE_BYTES = 32 * 1024 * 1024
+
+# Bump whenever decoded output changes: invalidates on-disk sprite caches
+DECODER_VERSION = 1
+
+
+def decode_rle(data, pos, encoded_size, pixel_count):
+    """
+    Decodes one RLE frame (SPR 2.1+) from an in-memory buffer.
+
+    "00 XX" is a run of XX transparent pixels, any other byte a literal pixel.
+    Literal runs are located with bytes.find and copied as slices instead of
+    byte by byte. Output and bytes consumed match the original decoder exactly,
+    including its handling of malformed frames (decoding stops once the frame
+    is full, and a trailing 00 still consumes its count byte).
+
+    Args:
+        data: Whole sprite file contents
+        pos: Offset of the first encoded byte
+        encoded_size: Encoded size stored in the frame header
+        pixel_count: width * height
+
+    Returns:
+        (pixel bytes of length pixel_count, offset after the consumed bytes)
+    """
+    pixels = bytearray(pixel_count)  # Zero = transparent
+    idx = 0
+    limit = pos + encoded_size
+    data_end = len(data)
+
+    while idx < pixel_count and pos < limit:
+        marker = data.find(b'\x00', pos, limit)
+        if marker == -1:
+            marker = limit
+
+        # Literal run up to the next zero marker
+        take = min(marker - pos, pixel_count - idx, data_end - pos)
+        if take > 0:
+            pixels[idx:idx + take] = data[pos:pos + take]
+            idx += take
+            pos += take
+            continue
+        if marker != pos:
+            raise ValueError("Truncated SPR frame data")
+
+        # Transparent run
+        if pos + 1 >= data_end:
+            raise ValueError("Truncated SPR frame data")
+        idx = min(idx + data[pos + 1], pixel_count)
+        pos += 2
+
+    return bytes(pixels), pos
+
+
+class SprFrame(namedtuple('SprFrame', 'offset size width height rle rgba')):
+    """
+    Location of one frame inside the sprite file (no pixel data).
+
+    rgba is True for SPR 2.0+ truecolor frames: they carry their own colors
+    and are NOT affected by palette swaps.
+    """
+    __slots__ = ()
+
+    @property
+    def pixel_count(self):
+        return self.width * self.height
+
+    @property
+    def nbytes(self):
+        """Size of the decoded frame in memory."""
+        return self.pixel_count * (4 if self.rgba else 1)
+
+
+def frame_image(data, frame, flat_palette=None, decoded=False):
+    """
+    Builds the PIL Image of one frame.
+
+    Args:
+        data: Buffer the frame offsets point into
+        frame: SprFrame
+        flat_palette: Flat [r, g, b, ...] palette applied to indexed frames
+        decoded: The buffer holds already decoded pixels (1 byte per pixel for
+                 indexed frames, top-down RGBA for RGBA frames), as written by
+                 the on-disk sprite cache
+    """
+    size = (frame.width, frame.height)
+    if frame.rgba:
+        pixel_data = data[frame.offset:frame.offset + frame.nbytes]
+        if len(pixel_data) < frame.nbytes:
+            raise ValueError("Truncated SPR RGBA frame data")
+        if decoded:
+            return Image.frombytes('RGBA', size, pixel_data)
+        # ABGR -> RGBA and vertical flip are done by PIL's raw decoder
+        return Image.frombytes('RGBA', size, pixel_data, 'raw', 'ABGR', 0, -1)
+
+    if frame.rle and not decoded:
+        pixel_data, _ = decode_rle(data, frame.offset, frame.size, frame.pixel_count)
+    else:
+        pixel_data = data[frame.offset:frame.offset + frame.pixel_count]
+
+    # Create PIL Image
+    img = Image.frombytes('P', size, pixel_data)
+    if flat_palette is not None:
+        img.putpalette(flat_palette)
+    return img
+
+
+class SprImages:
+    """
+    Read-only sequence view of a sprite's frames.
+
+    Behaves like the list SprParser.images used to be (len, indexing,
+    slicing, iteration, truthiness) but decodes frames on access through
+    SprParser.get_image. Indexed frames come first, followed by the RGBA
+    frames of SPR 2.0+ files (RGBA mode images, see SprFrame.rgba).
+    """
+
+    def __init__(self, parser):
+        self._parser = parser
+
+    def __len__(self):
+        return len(self._parser.frames)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._parser.get_image(i) for i in range(*index.indices(len(self)))]
+        return self._parser.get_image(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._parser.get_image(i)
+
+
 class SprParser:
-    def __init__(self, file_path):
+    def __init__(self, file_path, cache_bytes=FRAME_CACHE_BYTES, disk_cache=None):
+        """
+        Args:
+            file_path: .spr file
+            cache_bytes: Memory budget of the decoded frame LRU cache
+            disk_cache: Optional SpriteCache (src.core.sprite_cache): frames are
+                        written to the sprite's entry as they are decoded and
+                        read back from it instead of being decoded again
+        """
         self.file_path = file_path
+        self.disk_cache = disk_cache
         self.header = None
         self.palette = [] # List of (r,g,b,a)
-        self.images = [] # List of PIL.Image objects (indexed)
+        self.frames = [] # List of SprFrame (filled by index_frames): indexed, then RGBA
         self.version = 0
+        self.num_indexed = 0
+        self.num_rgba = 0
 
-    def parse_images(self):
+        # Decoded frames, most recently used last, bounded by cache_bytes of pixel data
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._pinned = None  # Every frame, when parsed with lazy=False
+        self._lock = threading.Lock()
+        self._data = None
+        self._decoded_data = False  # _data holds decoded frames (disk cache entry)
+        # sprite_cache.CachedSprite: the source itself when complete, else
+        # filled with the frames decoded from the .spr
+        self._cache_entry = None
+        self._flat_palette = None
+
+    @property
+    def images(self):
+        """All frames as PIL Images (indexed: P mode, then RGBA), decoded on access."""
+        return SprImages(self)
+
+    def index_frames(self):
         """
-        Parses all indexed images from the file.
-        Returns a list of PIL Images (P mode).
+        Reads the file once and records offset, encoded size and dimensions of
+        every frame (indexed and RGBA) without decoding any pixels.
+        Returns the list of SprFrame.
         """
-        self.images = []
+        # One read for the whole file; frames are decoded from the buffer
         with open(self.file_path, 'rb') as f:
-            f.seek(4) # Skip SP + Minor + Major
-            version_minor = struct.unpack('B', f.read(1))[0] # Wait, I read minor/major manually above
-            # Let's trust the seek order.
-            # Header is 2 (SP) + 1 (Min) + 1 (Maj) = 4 bytes.
-            # Actually above I did 2 + 1 + 1. Correct.
-            
-            # Re-read header to be safe in this isolated method or just seek:
-            f.seek(2)
-            minor = struct.unpack('B', f.read(1))[0]
-            major = struct.unpack('B', f.read(1))[0]
-            version = major * 100 + minor
-            
-            num_indexed = struct.unpack('<H', f.read(2))[0]
-            num_rgba = 0
-            if version >= 200:
-                num_rgba = struct.unpack('<H', f.read(2))[0]
-            
-            for _ in range(num_indexed):
-                width = struct.unpack('<H', f.read(2))[0]
-                height = struct.unpack('<H', f.read(2))[0]
-                
-                # Read encoded size
-                if version >= 201:
-                    encoded_size = struct.unpack('<H', f.read(2))[0]
-                else:
-                    encoded_size = width * height
-                
-                # Decompress RLE for version 2.1+
-                pixel_data = bytearray(width * height)
-                idx = 0
-                end_idx = width * height
-                
-                if version >= 201:
-                    # RLE compressed: 00 XX = XX transparent pixels, otherwise direct pixel value
-                    bytes_read = 0
-                    while idx < end_idx and bytes_read < encoded_size:
-                        b = struct.unpack('B', f.read(1))[0]
-                        bytes_read += 1
-                        
-                        if b == 0:
-                            # Transparent run
-                            count = struct.unpack('B', f.read(1))[0]
-                            bytes_read += 1
-                            for _ in range(count):
-                                if idx < end_idx:
-                                    pixel_data[idx] = 0  # Transparent
-                                    idx += 1
-                        else:
-                            # Direct pixel value
-                            if idx < end_idx:
-                                pixel_data[idx] = b
-                                idx += 1
-                else:
-                    # Uncompressed
-                    data = f.read(width * height)
-                    pixel_data = bytearray(data)
-
-                # Create PIL Image
-                img = Image.frombytes('P', (width, height), bytes(pixel_data))
-                self.images.append(img)
-            
-            # Read palette to apply to images
-            f.seek(-1024, 2)
-            pal_data = f.read(1024)
-            # PIL expects flat [r,g,b, r,g,b...]
-            # Source is [r,g,b,a, r,g,b,a...]
-            flat_pal = []
-            for i in range(0, 1024, 4):
-                flat_pal.extend(pal_data[i:i+3]) # Ignore alpha for PIL 'P' palette
-            
-            # Apply palette to all images
-            for img in self.images:
-                img.putpalette(flat_pal)
-                
+            data = f.read()
+
+        # Header is 2 (SP) + 1 (Min) + 1 (Maj) = 4 bytes
+        minor, major = struct.unpack_from('BB', data, 2)
+        version = major * 100 + minor
+
+        num_indexed = struct.unpack_from('<H', data, 4)[0]
+        pos = 6
+        num_rgba = 0
+        if version >= 200:
+            num_rgba = struct.unpack_from('<H', data, pos)[0]
+            pos += 2
+
+        frames = []
+        for _ in range(num_indexed):
+            width, height = struct.unpack_from('<HH', data, pos)
+            pos += 4
+
+            if version >= 201:
+                # Read encoded size; the RLE frame ends right after it
+                size = struct.unpack_from('<H', data, pos)[0]
+                pos += 2
+                rle = True
+            else:
+                # Uncompressed
+                size = width * height
+                rle = False
+            frames.append(SprFrame(pos, size, width, height, rle, False))
+            pos += size
+
+        # RGBA frames: raw ABGR pixels, bottom row first
+        for _ in range(num_rgba):
+            width, height = struct.unpack_from('<HH', data, pos)
+            pos += 4
+            size = width * height * 4
+            frames.append(SprFrame(pos, size, width, height, False, True))
+            pos += size
+
+        # Read palette to apply to images
+        pal_data = data[-1024:]
+        # PIL expects flat [r,g,b, r,g,b...]
+        # Source is [r,g,b,a, r,g,b,a...]
+        flat_pal = bytearray(768)
+        flat_pal[0::3] = pal_data[0::4]
+        flat_pal[1::3] = pal_data[1::4]
+        flat_pal[2::3] = pal_data[2::4] # Ignore alpha for PIL 'P' palette
+
+        self._set_source(data, False, version, num_indexed, num_rgba, frames, list(flat_pal))
+        return frames
+
+    def _set_source(self, data, decoded, version, num_indexed, num_rgba, frames, flat_palette,
+                    cache_entry=None):
+        with self._lock:
+            if self._cache_entry is not None:
+                self._cache_entry.close()
+            self._cache_entry = cache_entry
+            self._data = data
+            self._decoded_data = decoded
+            self.version = version
+            self.num_indexed = num_indexed
+            self.num_rgba = num_rgba
+            self.frames = frames
+            self._flat_palette = flat_palette
+            self._cache.clear()
+            self._cache_size = 0
+            self._pinned = None
+
+    def _open_disk_cache(self):
+        """
+        Uses the disk cache entry of this file as the source when it holds every
+        frame. Otherwise indexes the .spr and attaches the entry (created if
+        there is none) to read the frames it has and store the decoded ones.
+        """
+        entry = self.disk_cache.load(self.file_path)
+        if entry is not None and entry.complete:
+            self._set_source(entry.buffer, True, entry.version, entry.num_indexed, entry.num_rgba,
+                             entry.frames, entry.flat_palette, cache_entry=entry)
+            return
+
+        self.index_frames()
+        if entry is not None and not entry.matches(self.frames):
+            entry.close()
+            entry = None
+        if entry is None:
+            entry = self.disk_cache.create(self.file_path, self._data, self.frames)
+        with self._lock:
+            self._cache_entry = entry
+
+    def parse_images(self, lazy=True):
+        """
+        Indexes all images of the file (indexed and RGBA).
+
+        Args:
+            lazy: Decode frames on first access (through an LRU cache bounded by
+                  cache_bytes). False decodes and keeps every frame right away.
+
+        Returns:
+            The images sequence (PIL Images)
+        """
+        if self.disk_cache is None:
+            self.index_frames()
+        else:
+            self._open_disk_cache()
+        if not lazy:
+            pinned = [self._decode(i) for i in range(len(self.frames))]
+            with self._lock:
+                self._pinned = pinned
         return self.images
 
+    def _decode(self, index):
+        if self._decoded_data:
+            return frame_image(self._data, self.frames[index], self._flat_palette, decoded=True)
+
+        # Partial disk cache entry: a copy when it has the frame, else decode and store it
+        entry = self._cache_entry
+        if entry is not None and entry.decoded[index]:
+            return frame_image(entry.buffer, entry.frames[index], self._flat_palette, decoded=True)
+        img = frame_image(self._data, self.frames[index], self._flat_palette)
+        if entry is not None:
+            entry.add(index, img.tobytes())
+        return img
+
+    def get_image(self, index):
+        """
+        Returns frame `index` as a PIL Image, decoding it on first access:
+        indexed frames in P mode with the sprite palette applied, RGBA frames
+        (index >= num_indexed) in RGBA mode, unaffected by palette swaps.
+        Negative indices count from the end. Callers must copy the image
+        before modifying it (it is shared by the cache).
+        """
+        if index < 0:
+            index += len(self.frames)
+        if not 0 <= index < len(self.frames):
+            raise IndexError(f"Sprite frame index out of range: {index}")
+
+        with self._lock:
+            if self._pinned is not None:
+                return self._pinned[index]
+            img = self._cache.get(index)
+            if img is not None:
+                self._cache.move_to_end(index)
+                return img
+
+        img = self._decode(index)
+        size = self.frames[index].nbytes
+        with self._lock:
+            if index not in self._cache:
+                self._cache[index] = img
+                self._cache_size += size
+                # Evict least recently used frames; the newest one always stays
+                while self._cache_size > self.cache_bytes and len(self._cache) > 1:
+                    evicted, _ = self._cache.popitem(last=False)
+                    self._cache_size -= self.frames[evicted].nbytes
+            else:
+                img = self._cache[index]
+        return img
+
     def extract_palette(self):
         """
         Robustly extracts the palette from the end of the file.
@@ -113,8 +360,3 @@ class SprParser:
                 
             self.palette = s_pal
             return s_pal
-    
-    def get_image(self, index):
-        # Todo: Implement proper RLE decompression to get the image
-        # For V1 of this plan, let's focus on getting the Palette perfect.
-        pass
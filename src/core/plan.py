@@ -0,0 +1,299 @@
+"""
+Compiled generation plans.
+
+A GenerationPlan is the immutable, engine-ready form of a base palette plus a
+list of ColorGroups: valid index tuples, the HSV of all 256 base colors, the
+final colors of fixed groups and the normalized hue range of variable groups.
+Plans are cached by a hash of the full configuration, so repeated runs (and
+preview refreshes) with the same settings skip the setup work.
+"""
+import random
+import colorsys
+import hashlib
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from src.core.color_math import HsvTable
+from src.core.seeded import SeededHueSchedule
+
+GOLDEN_RATIO = 0.618033988749895
+
+# Number of compiled plans kept in memory
+PLAN_CACHE_SIZE = 32
+# Random hues kept by a HueScheduleCache (all schedules together)
+HUE_CACHE_HUES = 262144
+
+_plan_cache = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def _group_config(group):
+    """Every ColorGroup setting that affects generated colors, as a hashable tuple."""
+    fixed_gradient = getattr(group, 'fixed_gradient', None)
+    return (
+        bool(getattr(group, 'is_fixed', False)),
+        tuple(sorted(group.indices)),
+        tuple(tuple(c[:3]) for c in fixed_gradient) if fixed_gradient else None,
+        getattr(group, 'hue_range_start', 0),
+        getattr(group, 'hue_range_end', 360),
+        group.sat_shift,
+        group.val_shift,
+    )
+
+
+def _normalize_hue_range(group):
+    """(hue_start, hue_range) in degrees; tiny ranges mean the full spectrum."""
+    hue_start = getattr(group, 'hue_range_start', 0)
+    hue_end = getattr(group, 'hue_range_end', 360)
+    hue_range = hue_end - hue_start
+
+    if abs(hue_range) < 10:
+        hue_range = 360
+        hue_start = 0
+    elif hue_range < 0:
+        hue_range = hue_range + 360
+    return hue_start, hue_range
+
+
+def _fixed_colors(group, sorted_indices):
+    """Final (index, (r, g, b)) pairs of a fixed group (no random shifts apply)."""
+    fixed_gradient = group.fixed_gradient
+    num_colors = len(sorted_indices)
+    sat_shift = group.sat_shift
+    val_shift = 1 + group.val_shift
+
+    colors = []
+    for j, idx in enumerate(sorted_indices):
+        gradient_pos = int((j / max(num_colors - 1, 1)) * 7)
+        gradient_pos = min(gradient_pos, 7)
+        base_col = fixed_gradient[gradient_pos]
+        if not 0 <= idx < 256:
+            continue
+
+        r, g, b = base_col[0]/255.0, base_col[1]/255.0, base_col[2]/255.0
+        h, s, v = colorsys.rgb_to_hsv(r, g, b)
+        s = max(0.0, min(1.0, s + sat_shift))
+        v = max(0.0, min(1.0, v * val_shift))
+
+        r, g, b = colorsys.hsv_to_rgb(h, s, v)
+        colors.append((idx, (int(r*255), int(g*255), int(b*255))))
+    return tuple(colors)
+
+
+def golden_ratio_hues(count, hue_start, hue_range, rng=random):
+    """
+    Random hue schedule of `count` hues (degrees) inside the given range:
+    golden-ratio spacing from a random offset, jitter of up to half a step,
+    then shuffled.
+    """
+    step = hue_range / max(count, 1)
+    base_offset = rng.uniform(0, 360)
+
+    slices = []
+    for k in range(count):
+        golden_hue = (base_offset + (k * GOLDEN_RATIO * 360)) % 360
+        jitter = rng.uniform(-step * 0.5, step * 0.5)
+        # Ensure hue stays within the user-defined range
+        slices.append(hue_start + ((golden_hue - hue_start + jitter) % hue_range))
+
+    # Triple shuffle for maximum randomness
+    rng.shuffle(slices)
+    rng.shuffle(slices)
+    rng.shuffle(slices)
+    return tuple(slices)
+
+
+class HueScheduleCache:
+    """
+    LRU of random hue schedules keyed by (plan key, group, count), bounded by
+    the total number of hues kept. A schedule larger than the whole budget is
+    never kept, so big unseeded runs do not stay in memory after they end.
+    """
+
+    def __init__(self, max_hues=HUE_CACHE_HUES):
+        self.max_hues = max_hues
+        self.size = 0
+        self._schedules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def get(self, key):
+        with self._lock:
+            hues = self._schedules.get(key)
+            if hues is not None:
+                self._schedules.move_to_end(key)
+            return hues
+
+    def put(self, key, hues):
+        if len(hues) > self.max_hues:
+            return
+        with self._lock:
+            old = self._schedules.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._schedules[key] = hues
+            self.size += len(hues)
+            while self.size > self.max_hues:
+                _, evicted = self._schedules.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+            self.size = 0
+
+
+class GenerationPlan:
+    """
+    Immutable compiled form of (base palette, color groups).
+
+    Attributes:
+        key: Hex digest of the full configuration
+        base_hsv: HSV (0.0-1.0) of the 256 base colors (shared HsvTable data)
+        groups: One read-only mapping per ColorGroup, in order:
+            {'type': 'noop'}
+            {'type': 'fixed', 'indices', 'colors', 'sat_shift', 'val_shift'}
+            {'type': 'variable', 'g_idx', 'indices', 'base_hsv', 'hue_start',
+             'hue_range', 'sat_shift', 'val_shift'}
+            `base_hsv` of a variable group is None when an earlier group
+            rewrites some of its indices (their HSV must then be recomputed).
+    """
+
+    __slots__ = ('key', 'base_hsv', 'groups')
+
+    def __init__(self, key, base_hsv, groups):
+        object.__setattr__(self, 'key', key)
+        object.__setattr__(self, 'base_hsv', tuple(base_hsv))
+        object.__setattr__(self, 'groups', tuple(MappingProxyType(g) for g in groups))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GenerationPlan is immutable")
+
+    def __repr__(self):
+        return f"GenerationPlan(key={self.key[:12]}, groups={len(self.groups)})"
+
+    @staticmethod
+    def config_key(base_palette, groups):
+        """Hash of every setting that affects the generated colors."""
+        config = (
+            HsvTable.for_palette(base_palette).digest,
+            tuple(_group_config(group) for group in groups),
+        )
+        return hashlib.blake2b(repr(config).encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def compile(base_palette, groups):
+        """
+        Returns the plan for these settings, compiling it only on a cache miss.
+
+        Args:
+            base_palette: List of 256 (r, g, b[, a]) colors or its HsvTable
+            groups: ColorGroups (or an already compiled GenerationPlan, returned as is)
+
+        Returns:
+            GenerationPlan
+        """
+        if isinstance(groups, GenerationPlan):
+            return groups
+
+        table = HsvTable.for_palette(base_palette)
+        key = GenerationPlan.config_key(table, groups)
+        with _plan_cache_lock:
+            plan = _plan_cache.get(key)
+            if plan is not None:
+                _plan_cache.move_to_end(key)
+                return plan
+
+        plan = GenerationPlan._build(key, table, groups)
+        with _plan_cache_lock:
+            _plan_cache[key] = plan
+            while len(_plan_cache) > PLAN_CACHE_SIZE:
+                _plan_cache.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def _build(key, table, groups):
+        base_hsv = table.hsv
+
+        compiled = []
+        touched = set()  # Indices already rewritten by an earlier group
+        for g_idx, group in enumerate(groups):
+            if getattr(group, 'is_fixed', False):
+                fixed_gradient = getattr(group, 'fixed_gradient', None)
+                if fixed_gradient and len(fixed_gradient) == 8:
+                    colors = _fixed_colors(group, sorted(group.indices))
+                    compiled.append({
+                        'type': 'fixed',
+                        'indices': tuple(idx for idx, _ in colors),
+                        'colors': colors,
+                        'sat_shift': group.sat_shift,
+                        'val_shift': group.val_shift
+                    })
+                    touched.update(idx for idx, _ in colors)
+                else:
+                    compiled.append({'type': 'noop'})
+                continue
+
+            indices = tuple(idx for idx in sorted(group.indices) if 0 <= idx < 256)
+            hue_start, hue_range = _normalize_hue_range(group)
+            if touched.isdisjoint(indices) and len(base_hsv) == 256:
+                group_hsv = tuple(base_hsv[idx] for idx in indices)
+            else:
+                group_hsv = None
+            compiled.append({
+                'type': 'variable',
+                'g_idx': g_idx,
+                'indices': indices,
+                'base_hsv': group_hsv,
+                'hue_start': hue_start,
+                'hue_range': hue_range,
+                'sat_shift': group.sat_shift,
+                'val_shift': group.val_shift
+            })
+            touched.update(indices)
+
+        return GenerationPlan(key, base_hsv, compiled)
+
+    def processed_groups(self, count, seed=None, hue_cache=None):
+        """
+        Group dicts with hue schedules for a run of `count` palettes, as consumed
+        by both engines.
+
+        Args:
+            count: Number of palettes in the run
+            seed: Normalized seed: hues come from lazy SeededHueSchedule objects
+            hue_cache: Optional HueScheduleCache memoizing random hue schedules,
+                       keyed by (plan key, group, count) so runs with other
+                       settings never reuse them
+
+        Returns:
+            List of plain (picklable) dicts
+        """
+        processed = []
+        for g_data in self.groups:
+            g_data = dict(g_data)
+            if g_data['type'] == 'variable':
+                g_idx = g_data['g_idx']
+                if seed is not None:
+                    # Seeded mode: hue k is computed on demand from (seed, k)
+                    hues = SeededHueSchedule(seed, g_idx, count,
+                                             g_data['hue_start'], g_data['hue_range'])
+                elif hue_cache is None:
+                    hues = golden_ratio_hues(count, g_data['hue_start'], g_data['hue_range'])
+                else:
+                    cache_key = (self.key, g_idx, count)
+                    hues = hue_cache.get(cache_key)
+                    if hues is None:
+                        hues = golden_ratio_hues(count, g_data['hue_start'], g_data['hue_range'])
+                        hue_cache.put(cache_key, hues)
+                g_data['hues'] = hues
+            processed.append(g_data)
+        return processed
+
+    def fixed_colors(self):
+        """All (index, (r, g, b)) pairs set by fixed groups, in group order."""
+        for g_data in self.groups:
+            if g_data['type'] == 'fixed':
+                yield from g_data['colors']
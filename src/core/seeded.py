@@ -0,0 +1,245 @@
+"""
+Seed-deterministic, random-access palette randomness.
+
+In seeded mode every random value is a pure function of (seed, stream, key...)
+computed with a counter-based hash (splitmix64), and the hue order comes from a
+keyed Feistel permutation instead of shuffling a list. Palette k therefore
+depends only on (seed, k) and the group config: it can be regenerated alone in
+constant time and memory, and large runs never build hue lists.
+
+The scalar functions and their NumPy counterparts produce bit-identical values,
+so both engines (and any sharding) give the same palettes for the same seed.
+"""
+import hashlib
+
+from src.core.vector_engine import np
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+GOLDEN64 = 0x9E3779B97F4A7C15
+MIX_MUL_1 = 0xBF58476D1CE4E5B9
+MIX_MUL_2 = 0x94D049BB133111EB
+INV_2_53 = 1.0 / 9007199254740992.0
+
+GOLDEN_RATIO = 0.618033988749895
+FEISTEL_ROUNDS = 4
+
+# Stream identifiers: every kind of random value gets its own counter space
+STREAM_HUE_OFFSET = 1
+STREAM_HUE_JITTER = 2
+STREAM_HUE_PERM = 3
+STREAM_SAT_SHIFT = 4
+STREAM_VAL_SHIFT = 5
+STREAM_MICRO = 6
+
+
+def normalize_seed(seed):
+    """Maps an int (any size or sign) or a string to a 64-bit seed."""
+    if isinstance(seed, int):
+        return seed & MASK64
+    digest = hashlib.blake2b(str(seed).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def mix64(z):
+    """splitmix64 finalizer on a Python int."""
+    z = (z + GOLDEN64) & MASK64
+    z = ((z ^ (z >> 30)) * MIX_MUL_1) & MASK64
+    z = ((z ^ (z >> 27)) * MIX_MUL_2) & MASK64
+    return z ^ (z >> 31)
+
+
+def chain(h, *words):
+    """Continues a key hash with more words."""
+    for w in words:
+        h = mix64(h ^ (w & MASK64))
+    return h
+
+
+def key_hash(seed, *words):
+    """64-bit hash of (seed, words...)."""
+    return chain(mix64(seed), *words)
+
+
+def unit(h):
+    """Maps a 64-bit hash to a float in [0, 1) with 53 random bits."""
+    return (h >> 11) * INV_2_53
+
+
+def uniform(lo, hi, seed, *words):
+    """Deterministic equivalent of random.uniform(lo, hi) for a given key."""
+    return lo + (hi - lo) * unit(key_hash(seed, *words))
+
+
+# --- NumPy counterparts (uint64 arithmetic wraps exactly like the & MASK64 above) ---
+
+def mix64_array(z):
+    with np.errstate(over='ignore'):
+        z = z + np.uint64(GOLDEN64)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX_MUL_1)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX_MUL_2)
+    return z ^ (z >> np.uint64(31))
+
+
+def chain_array(h, *words):
+    h = np.asarray(h, dtype=np.uint64)
+    for w in words:
+        h = mix64_array(h ^ np.asarray(w, dtype=np.uint64))
+    return h
+
+
+def unit_array(h):
+    return (h >> np.uint64(11)).astype(np.float64) * INV_2_53
+
+
+def uniform_array(lo, hi, seed, *words):
+    """Vectorized uniform(): words may be arrays that broadcast together."""
+    return lo + (hi - lo) * unit_array(chain_array(np.uint64(mix64(seed)), *words))
+
+
+class FeistelPermutation:
+    """
+    Keyed bijection on range(n) with O(1) evaluation.
+
+    A balanced Feistel network permutes the smallest even-bit domain >= n and
+    cycle-walking maps values that fall outside range(n) back inside
+    (fewer than 4 rounds of walking on average).
+    """
+
+    def __init__(self, n, seed, *key):
+        self.n = max(int(n), 1)
+        bits = max(2, (self.n - 1).bit_length())
+        bits += bits & 1
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        self.round_keys = [key_hash(seed, *key, r) for r in range(FEISTEL_ROUNDS)]
+
+    def _encrypt(self, x):
+        half, mask = self.half, self.mask
+        left, right = x >> half, x & mask
+        for rk in self.round_keys:
+            left, right = right, left ^ (mix64(right ^ rk) & mask)
+        return (left << half) | right
+
+    def __call__(self, k):
+        x = self._encrypt(k)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+    def apply_array(self, ks):
+        """Vectorized __call__ over an integer array."""
+        half = np.uint64(self.half)
+        mask = np.uint64(self.mask)
+        n = np.uint64(self.n)
+
+        def encrypt(x):
+            left, right = x >> half, x & mask
+            for rk in self.round_keys:
+                left, right = right, left ^ (mix64_array(right ^ np.uint64(rk)) & mask)
+            return (left << half) | right
+
+        x = encrypt(np.asarray(ks, dtype=np.uint64))
+        outside = x >= n
+        while outside.any():
+            x[outside] = encrypt(x[outside])
+            outside = x >= n
+        return x.astype(np.int64)
+
+
+class SeededHueSchedule:
+    """
+    Lazy replacement for the golden-ratio hue list of a variable group.
+
+    schedule[k] equals what slices[k] would be after building the list of
+    `count` golden-ratio hues with jitter and shuffling it, but it is computed
+    on demand. Slicing returns a view with an offset, so shards can index it
+    with local positions just like a list slice.
+    """
+
+    def __init__(self, seed, g_idx, count, hue_start, hue_range, offset=0, length=None):
+        self.seed = seed
+        self.g_idx = g_idx
+        self.count = count
+        self.hue_start = hue_start
+        self.hue_range = hue_range
+        self.offset = offset
+        self.length = count - offset if length is None else length
+
+        self.step = hue_range / max(count, 1)
+        self.base_offset = uniform(0, 360, seed, STREAM_HUE_OFFSET, g_idx)
+        self.permutation = FeistelPermutation(count, seed, STREAM_HUE_PERM, g_idx)
+
+    def hue(self, k):
+        """Hue in degrees for absolute palette index k."""
+        j = self.permutation(k)
+        golden_hue = (self.base_offset + (j * GOLDEN_RATIO * 360)) % 360
+        jitter = uniform(-self.step * 0.5, self.step * 0.5,
+                         self.seed, STREAM_HUE_JITTER, self.g_idx, j)
+        return self.hue_start + ((golden_hue - self.hue_start + jitter) % self.hue_range)
+
+    def to_array(self):
+        """All hues of this view as a float64 array (vectorized hue())."""
+        ks = np.arange(self.offset, self.offset + self.length, dtype=np.int64)
+        j = self.permutation.apply_array(ks)
+        golden_hue = (self.base_offset + (j.astype(np.float64) * GOLDEN_RATIO * 360)) % 360
+        jitter = uniform_array(-self.step * 0.5, self.step * 0.5,
+                               self.seed, STREAM_HUE_JITTER, self.g_idx, j)
+        return self.hue_start + ((golden_hue - self.hue_start + jitter) % self.hue_range)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, stride = key.indices(self.length)
+            if stride != 1:
+                raise ValueError("SeededHueSchedule only supports contiguous slices")
+            view = object.__new__(SeededHueSchedule)
+            view.__dict__.update(self.__dict__)
+            view.offset = self.offset + start
+            view.length = max(0, stop - start)
+            return view
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("hue schedule index out of range")
+        return self.hue(self.offset + key)
+
+
+class SeededStream:
+    """Per-palette and per-color random values for seeded generation."""
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def palette_shifts(self, k, random_saturation, random_brightness):
+        """(saturation shift, brightness shift) of palette k."""
+        sat = uniform(-0.3, 0.3, self.seed, STREAM_SAT_SHIFT, k) if random_saturation else 0.0
+        val = uniform(-0.15, 0.15, self.seed, STREAM_VAL_SHIFT, k) if random_brightness else 0.0
+        return sat, val
+
+    def micro_key(self, g_idx, k):
+        """Hash prefix shared by every color of one group in palette k."""
+        return key_hash(self.seed, STREAM_MICRO, g_idx, k)
+
+    def micro(self, prefix, idx):
+        """(hue, saturation, value) micro-variations of palette index `idx`."""
+        h = mix64(prefix ^ idx)
+        return (-0.03 + 0.06 * unit(mix64(h ^ 0)),
+                -0.08 + 0.16 * unit(mix64(h ^ 1)),
+                -0.05 + 0.10 * unit(mix64(h ^ 2)))
+
+    def palette_shifts_array(self, ks, random_saturation, random_brightness):
+        """Vectorized palette_shifts(); returns two arrays shaped like ks."""
+        zeros = np.zeros(np.shape(ks))
+        sat = uniform_array(-0.3, 0.3, self.seed, STREAM_SAT_SHIFT, ks) if random_saturation else zeros
+        val = uniform_array(-0.15, 0.15, self.seed, STREAM_VAL_SHIFT, ks) if random_brightness else zeros
+        return sat, val
+
+    def micro_array(self, g_idx, ks, idx_arr):
+        """Vectorized micro(): three (len(ks), len(idx_arr)) arrays."""
+        prefix = chain_array(np.uint64(mix64(self.seed)), STREAM_MICRO, g_idx, ks)
+        h = chain_array(prefix[:, None], idx_arr[None, :])
+        return (-0.03 + 0.06 * unit_array(chain_array(h, 0)),
+                -0.08 + 0.16 * unit_array(chain_array(h, 1)),
+                -0.05 + 0.10 * unit_array(chain_array(h, 2)))
@@ -0,0 +1,334 @@
+"""
+Output sinks for generated palettes.
+
+Generators encode every palette once and hand (entry name, 1024 bytes) pairs to
+a sink. DirectorySink keeps the classic behavior of loose .pal files in a
+folder; ZipSink and TarSink stream all entries into a single archive written
+to a path, an open binary file object or stdout ("-"). BankSink writes an
+indexed .palbank file (see src.core.palbank).
+"""
+import io
+import os
+import sys
+import time
+import tarfile
+import zipfile
+import hashlib
+from src.core.dedup import DedupStats, DedupWriter
+from src.core.pal_handler import PaletteHandler
+from src.core.palbank import PaletteBankWriter, BANK_EXTENSION
+
+
+class PaletteSink:
+    """
+    Base class for palette outputs.
+
+    Generators call open() once, write() for every entry and close() at the end.
+    """
+
+    # True when identical entries are stored once
+    dedup = False
+    # DedupStats when the sink deduplicates identical entries, None otherwise
+    dedup_stats = None
+    # WriterStats when writes go through a WriterStage, None otherwise
+    writer_stats = None
+    # True when write() may be called from several threads at once
+    thread_safe = False
+
+    def open(self):
+        pass
+
+    def write(self, name, data):
+        """Stores one palette entry. Returns where it went (path or entry name)."""
+        raise NotImplementedError
+
+    def write_many(self, entries):
+        """Stores a batch of (name, data) entries. Returns what write() returns for each."""
+        return [self.write(name, data) for name, data in entries]
+
+    def path_for(self, name):
+        """Where write(name, ...) stores the entry, known before writing it."""
+        return name
+
+    def sync(self, written):
+        """
+        Flushes entries to stable storage after close().
+        `written` lists what write() returned for every entry.
+        """
+        pass
+
+    def close(self):
+        pass
+
+    def worker_sink(self):
+        """
+        Returns an independent sink that a worker process can write to directly,
+        or None if entries must be sent back and written by the parent process.
+        """
+        return None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _fsync_directory(path):
+    """Persists directory entries (new names) where the platform allows it."""
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DirectorySink(PaletteSink):
+    """Writes loose .pal files into a folder (default output)."""
+
+    def __init__(self, output_dir, dedup=False):
+        self.output_dir = output_dir
+        self.dedup = dedup
+        self._dedup_writer = None
+
+    def open(self):
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        self._dedup_writer = DedupWriter() if self.dedup else None
+        self.dedup_stats = self._dedup_writer.stats if self.dedup else None
+
+    @property
+    def thread_safe(self):
+        # Dedup links later names to the first written one: order matters
+        return not self.dedup
+
+    def path_for(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def write(self, name, data):
+        file_path = self.path_for(name)
+        if self._dedup_writer is not None:
+            self._dedup_writer.write(file_path, data)
+        else:
+            PaletteHandler.save(file_path, data)
+        return file_path
+
+    def write_many(self, entries):
+        if self._dedup_writer is not None:
+            return super().write_many(entries)
+
+        written = [self.path_for(name) for name, _ in entries]
+        PaletteHandler.save_many(written, [data for _, data in entries])
+        return written
+
+    def sync(self, written):
+        for file_path in dict.fromkeys(written):
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        _fsync_directory(self.output_dir)
+
+    def worker_sink(self):
+        return DirectorySink(self.output_dir, dedup=self.dedup)
+
+
+class _ArchiveSink(PaletteSink):
+    """Shared target handling for archive sinks: path, file object or "-" (stdout)."""
+
+    def __init__(self, target):
+        self.target = target
+        self._fileobj = None
+        self._owns_fileobj = False
+
+    def _open_target(self):
+        if self.target == "-":
+            self._fileobj = sys.stdout.buffer
+        elif isinstance(self.target, (str, os.PathLike)):
+            parent = os.path.dirname(os.path.abspath(self.target))
+            if not os.path.exists(parent):
+                os.makedirs(parent)
+            self._fileobj = open(self.target, 'wb')
+            self._owns_fileobj = True
+        else:
+            self._fileobj = self.target
+
+    def _close_target(self):
+        if self._owns_fileobj:
+            self._fileobj.close()
+        else:
+            self._fileobj.flush()
+        self._fileobj = None
+        self._owns_fileobj = False
+
+    def sync(self, written):
+        if isinstance(self.target, (str, os.PathLike)):
+            fd = os.open(self.target, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            _fsync_directory(os.path.dirname(os.path.abspath(self.target)))
+
+    def _is_stream(self):
+        """True when the target cannot seek (pipes, stdout)."""
+        try:
+            return not self._fileobj.seekable()
+        except (AttributeError, ValueError):
+            return True
+
+
+class ZipSink(_ArchiveSink):
+    """
+    Streams palettes into a single .zip archive.
+
+    Args:
+        target: Output path, writable binary file object or "-" for stdout
+        compression: zipfile compression constant (deflate by default)
+    """
+
+    def __init__(self, target, compression=zipfile.ZIP_DEFLATED):
+        super().__init__(target)
+        self.compression = compression
+        self._zip = None
+
+    def open(self):
+        self._open_target()
+        # zipfile writes data descriptors by itself when the target is not seekable
+        self._zip = zipfile.ZipFile(self._fileobj, 'w', compression=self.compression)
+
+    def write(self, name, data):
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = self.compression
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data)
+        return name
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            self._close_target()
+
+
+class TarSink(_ArchiveSink):
+    """
+    Streams palettes into a single tar archive.
+
+    Args:
+        target: Output path, writable binary file object or "-" for stdout
+        compression: "", "gz", "bz2" or "xz"
+        dedup: Store identical palettes once and add the other names as tar hardlinks
+    """
+
+    def __init__(self, target, compression="", dedup=False):
+        super().__init__(target)
+        self.compression = compression
+        self.dedup = dedup
+        self._tar = None
+        self._by_digest = {}
+        self._mtime = 0
+
+    def open(self):
+        self._open_target()
+        # "w|" is the streaming mode required for pipes; "w:" needs a seekable file
+        separator = "|" if self._is_stream() else ":"
+        mode = f"w{separator}{self.compression}"
+        self._tar = tarfile.open(fileobj=self._fileobj, mode=mode, format=tarfile.PAX_FORMAT)
+        self._by_digest = {}
+        self._mtime = int(time.time())
+        self.dedup_stats = DedupStats() if self.dedup else None
+
+    def write(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.mtime = self._mtime
+        info.mode = 0o644
+
+        if self.dedup:
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            source = self._by_digest.get(digest)
+            self.dedup_stats.files += 1
+            if source is not None:
+                info.type = tarfile.LNKTYPE
+                info.linkname = source
+                self._tar.addfile(info)
+                self.dedup_stats.links += 1
+                self.dedup_stats.bytes_saved += len(data)
+                return name
+            self._by_digest[digest] = name
+            self.dedup_stats.unique_writes += 1
+            self.dedup_stats.bytes_written += len(data)
+
+        info.size = len(data)
+        self._tar.addfile(info, io.BytesIO(data))
+        return name
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+            self._close_target()
+
+
+class BankSink(_ArchiveSink):
+    """
+    Writes palettes into a single indexed .palbank file.
+
+    Args:
+        target: Output path or seekable binary file object (the index is
+                written at the end and the header patched afterwards)
+        dedup: Store identical palettes once; their entries share the record
+    """
+
+    def __init__(self, target, dedup=False):
+        super().__init__(target)
+        self.dedup = dedup
+        self._writer = None
+
+    def open(self):
+        self._open_target()
+        if self._is_stream():
+            self._close_target()
+            raise ValueError("Palette banks need a seekable output (not a pipe or stdout)")
+        self._writer = PaletteBankWriter(self._fileobj, dedup=self.dedup)
+        self.dedup_stats = DedupStats() if self.dedup else None
+
+    def write(self, name, data):
+        is_new = self._writer.add(name, data)
+        if self.dedup:
+            self.dedup_stats.files += 1
+            if is_new:
+                self.dedup_stats.unique_writes += 1
+                self.dedup_stats.bytes_written += len(data)
+            else:
+                self.dedup_stats.links += 1
+                self.dedup_stats.bytes_saved += len(data)
+        return name
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._close_target()
+
+
+def sink_for_path(target, dedup=False):
+    """
+    Picks a sink from an output target:
+    *.zip -> ZipSink, *.tar / *.tar.gz / *.tgz / *.tar.bz2 / *.tar.xz -> TarSink,
+    *.palbank -> BankSink, anything else -> DirectorySink.
+    """
+    lower = str(target).lower()
+    if lower.endswith(".zip"):
+        return ZipSink(target)
+    if lower.endswith(BANK_EXTENSION):
+        return BankSink(target, dedup=dedup)
+    for suffix, compression in ((".tar", ""), (".tar.gz", "gz"), (".tgz", "gz"),
+                                (".tar.bz2", "bz2"), (".tar.xz", "xz")):
+        if lower.endswith(suffix):
+            return TarSink(target, compression=compression, dedup=dedup)
+    return DirectorySink(target, dedup=dedup)
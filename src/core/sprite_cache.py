@@ -0,0 +1,333 @@
+"""
+Persistent on-disk cache of decoded sprites.
+
+Each cached .spr becomes one entry file holding the sprite palette, a frame
+table and room for every frame decoded (1 byte per pixel for indexed frames,
+top-down RGBA for RGBA frames). Reopening a cached sprite maps the entry and
+builds frames with a plain copy instead of running the RLE decoder.
+
+An entry is created empty on the first open and filled as SprParser decodes
+frames: each frame is written in place and then marked as decoded in the
+frame table, so caching never decodes anything by itself. Later opens read
+the frames already there and add the others; once every frame is marked the
+.spr is not read at all.
+
+Entries are named after (path, size, mtime); an edited file gets another
+name, so a hit needs no read of the .spr. Entries also store a content hash
+of the .spr, checked only by load(verify=True). CACHE_VERSION and the SPR
+DECODER_VERSION are part of every entry: changing either invalidates old
+entries. The cache directory is trimmed to max_bytes, least recently used
+entries first.
+"""
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import time
+import tempfile
+import threading
+
+from src.core.parsers.spr import SprFrame, DECODER_VERSION
+
+MAGIC = b"SPRCACHE"
+CACHE_VERSION = 2
+# magic, cache version, decoder version, source size, source mtime (ns),
+# content digest, spr version, indexed frames, rgba frames
+HEADER = struct.Struct("<8sIIQQ32sHHH2x")
+# data offset, width, height, is rgba, decoded (pixels written)
+FRAME = struct.Struct("<QHHBB2x")
+FRAME_DECODED_OFFSET = 13
+PALETTE_SIZE = 1024
+
+# Default size limit of the whole cache directory
+SPRITE_CACHE_BYTES = 512 * 1024 * 1024
+ENTRY_EXTENSION = ".sprcache"
+TEMP_EXTENSION = ".tmp"
+# Temporary files older than this were left by a crash and are deleted by evict()
+STALE_TEMP_SECONDS = 3600
+
+
+def default_cache_dir():
+    """Per-user cache directory (LOCALAPPDATA on Windows, XDG cache elsewhere)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "ro-palette-generator", "sprites")
+
+
+def content_digest(data):
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+class CachedSprite:
+    """
+    Memory-mapped cache entry. frames point into `buffer` (decoded pixels);
+    only frames whose `decoded` flag is set hold pixels yet.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+        self.frames = []
+        self.decoded = bytearray()
+        self.flat_palette = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def read_index(self):
+        (magic, cache_version, decoder_version, self.source_size, self.source_mtime,
+         self.digest, self.version, self.num_indexed, self.num_rgba) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or cache_version != CACHE_VERSION or decoder_version != DECODER_VERSION:
+            raise ValueError("Stale or foreign sprite cache entry")
+
+        pos = HEADER.size
+        pal_data = self.buffer[pos:pos + PALETTE_SIZE]
+        pos += PALETTE_SIZE
+        flat_pal = bytearray(768)
+        flat_pal[0::3] = pal_data[0::4]
+        flat_pal[1::3] = pal_data[1::4]
+        flat_pal[2::3] = pal_data[2::4]
+        self.flat_palette = list(flat_pal)
+
+        frames = []
+        decoded = bytearray()
+        for _ in range(self.num_indexed + self.num_rgba):
+            offset, width, height, rgba, is_decoded = FRAME.unpack_from(self.buffer, pos)
+            pos += FRAME.size
+            frame = SprFrame(offset, 0, width, height, False, bool(rgba))
+            frame = frame._replace(size=frame.nbytes)
+            if offset + frame.size > len(self.buffer):
+                raise ValueError("Truncated sprite cache entry")
+            frames.append(frame)
+            decoded.append(1 if is_decoded else 0)
+        self.frames = frames
+        self.decoded = decoded
+
+    @property
+    def complete(self):
+        """True when every frame is in the entry."""
+        return all(self.decoded)
+
+    def matches(self, frames):
+        """True when the entry was laid out for these frames (SprParser.index_frames)."""
+        return len(frames) == len(self.frames) and all(
+            (a.width, a.height, a.rgba) == (b.width, b.height, b.rgba)
+            for a, b in zip(frames, self.frames))
+
+    def add(self, index, pixels):
+        """
+        Writes the decoded pixels of frame `index` and marks it as decoded.
+        Failures only leave the frame missing (the entry stops taking frames).
+        """
+        with self._lock:
+            if self.buffer is None or self._writer is False or self.decoded[index]:
+                return
+            frame = self.frames[index]
+            if len(pixels) != frame.nbytes:
+                return
+            try:
+                if self._writer is None:
+                    self._writer = open(self.path, 'r+b', buffering=0)
+                self._writer.seek(frame.offset)
+                self._writer.write(pixels)
+                # The flag goes in after the pixels: readers never see a half-written frame
+                self._writer.seek(HEADER.size + PALETTE_SIZE + FRAME.size * index
+                                  + FRAME_DECODED_OFFSET)
+                self._writer.write(b"\1")
+            except OSError:
+                self._close_writer()
+                self._writer = False
+                return
+            self.decoded[index] = 1
+
+    def _close_writer(self):
+        if self._writer:
+            self._writer.close()
+        self._writer = None
+
+    def close(self):
+        with self._lock:
+            self._close_writer()
+            if self.buffer is not None:
+                self.buffer.close()
+                self.buffer = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SpriteCache:
+    """
+    Directory of decoded sprite entries.
+
+    Args:
+        directory: Cache directory (default_cache_dir() when None)
+        max_bytes: Size limit of all entries together
+    """
+
+    def __init__(self, directory=None, max_bytes=SPRITE_CACHE_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default():
+        """Cache in the per-user directory, or None when it cannot be created."""
+        cache = SpriteCache()
+        try:
+            os.makedirs(cache.directory, exist_ok=True)
+        except OSError:
+            return None
+        return cache
+
+    def entry_path(self, spr_path, stat=None):
+        stat = stat or os.stat(spr_path)
+        key = f"{os.path.abspath(spr_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        name = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, name + ENTRY_EXTENSION)
+
+    def load(self, spr_path, verify=False):
+        """
+        Returns the CachedSprite of a .spr file, or None on a miss (no entry,
+        older cache or decoder version, unreadable entry).
+
+        Args:
+            spr_path: .spr file
+            verify: Also read the .spr and compare its content hash (the
+                    (path, size, mtime) entry name already covers edits)
+        """
+        try:
+            stat = os.stat(spr_path)
+            entry_path = self.entry_path(spr_path, stat)
+            if not os.path.exists(entry_path):
+                return None
+            entry = CachedSprite(entry_path)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            entry.read_index()
+            if (entry.source_size, entry.source_mtime) != (stat.st_size, stat.st_mtime_ns):
+                raise ValueError("Sprite changed since it was cached")
+            if verify:
+                with open(spr_path, 'rb') as f:
+                    if content_digest(f.read()) != entry.digest:
+                        raise ValueError("Sprite changed since it was cached")
+        except (OSError, ValueError, struct.error):
+            entry.close()
+            self._remove(entry_path)
+            return None
+
+        try:
+            os.utime(entry_path)  # Recently used: evicted last
+        except OSError:
+            pass
+        return entry
+
+    def create(self, spr_path, data, frames):
+        """
+        Creates the empty entry of a .spr file from its contents and frame index
+        (as read by SprParser.index_frames) and returns it as a CachedSprite to
+        add decoded frames to, or None when it cannot be created.
+        """
+        tmp_path = None
+        try:
+            stat = os.stat(spr_path)
+            if stat.st_size != len(data):
+                return None
+            entry_path = self.entry_path(spr_path, stat)
+
+            table = bytearray()
+            pos = HEADER.size + PALETTE_SIZE + FRAME.size * len(frames)
+            for frame in frames:
+                table += FRAME.pack(pos, frame.width, frame.height, int(frame.rgba), 0)
+                pos += frame.nbytes
+            num_indexed = sum(1 for frame in frames if not frame.rgba)
+            minor, major = data[2], data[3]
+
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=TEMP_EXTENSION, dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, CACHE_VERSION, DECODER_VERSION, stat.st_size,
+                                    stat.st_mtime_ns, content_digest(data), major * 100 + minor,
+                                    num_indexed, len(frames) - num_indexed))
+                f.write(bytes(data[-PALETTE_SIZE:]).ljust(PALETTE_SIZE, b"\0"))
+                f.write(table)
+                f.truncate(pos)  # Frames are written in place as they are decoded
+            os.replace(tmp_path, entry_path)
+            tmp_path = None
+            entry = CachedSprite(entry_path)
+            entry.read_index()
+        except (OSError, ValueError, struct.error):
+            if tmp_path is not None:
+                self._remove(tmp_path)
+            return None
+        self.evict()
+        return entry
+
+    def store(self, spr_path, data, frames, decode):
+        """
+        Writes the whole entry at once. decode(index) returns the PIL image of
+        a frame. Returns the entry path, or None when it could not be written.
+        """
+        entry = self.create(spr_path, data, frames)
+        if entry is None:
+            return None
+        try:
+            for index in range(len(frames)):
+                entry.add(index, decode(index).tobytes())
+            return entry.path if entry.complete else None
+        finally:
+            entry.close()
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes,
+        and temporary files left behind by a crash.
+        """
+        with self._lock:
+            entries = []
+            stale = time.time() - STALE_TEMP_SECONDS
+            try:
+                with os.scandir(self.directory) as it:
+                    for item in it:
+                        if item.name.endswith(ENTRY_EXTENSION):
+                            st = item.stat()
+                            entries.append((st.st_mtime, st.st_size, item.path))
+                        elif item.name.endswith(TEMP_EXTENSION) and item.stat().st_mtime < stale:
+                            self._remove(item.path)
+            except OSError:
+                return
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if self._remove(path):
+                    total -= size
+
+    def clear(self):
+        """Deletes every entry."""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:  # Missing, or still mapped on Windows
+            return False
+
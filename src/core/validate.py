@@ -0,0 +1,201 @@
+"""
+Bulk integrity check of a folder of .pal files.
+
+Every file is read once by PaletteHandler.load_many (raw=True) on a thread
+pool (the reads overlap, so cold folders run at disk speed) and checked with
+whole-buffer byte comparisons, never color by color:
+
+    unreadable        the file could not be opened or read
+    short             smaller than 1024 bytes (the client rejects it)
+    trailing_bytes    larger than 1024 bytes
+    reserved_index0   reserved byte of color 0 is not 0
+    reserved_other    a reserved byte of colors 1-255 is not 255
+    identical_to_base same colors as the base palette (when one is given)
+
+Files with exactly the same 1024 palette bytes are reported as duplicate
+groups (informational by default: generated folders repeat every palette
+for both genders and all classes). The report is JSON:
+
+    python -m src.core.validate <folder> [--base original.pal|sprite.spr] [-o report.json]
+
+The exit status is 1 when any file has a problem (or any duplicate group,
+with --fail-on-duplicates).
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import namedtuple
+
+from src.core.pal_handler import PaletteHandler, PAL_SIZE, RESERVED_BYTES
+from src.core.pal_index import natural_key
+
+FileResult = namedtuple('FileResult', 'name size issues digest')
+FileResult.__doc__ = """Outcome for one file. digest is None when the palette could not be read."""
+
+
+def _channels(data):
+    """(R, G, B) byte strings of a 1024-byte palette."""
+    return data[0::4], data[1::4], data[2::4]
+
+
+def check_palette(name, size, data, base_channels=None):
+    """
+    Checks the raw bytes of one palette file.
+
+    Args:
+        name: File name (for the result)
+        size: Size of the whole file
+        data: Its first 1024 bytes (or fewer when the file is short)
+        base_channels: _channels() of the base palette, or None
+
+    Returns:
+        FileResult
+    """
+    issues = []
+    if size < PAL_SIZE:
+        return FileResult(name, size, ("short",), None)
+    if size > PAL_SIZE:
+        issues.append("trailing_bytes")
+
+    reserved = data[3::4]
+    if reserved != RESERVED_BYTES:
+        if reserved[0] != 0:
+            issues.append("reserved_index0")
+        if reserved[1:] != RESERVED_BYTES[1:]:
+            issues.append("reserved_other")
+    if base_channels is not None and _channels(data) == base_channels:
+        issues.append("identical_to_base")
+
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    return FileResult(name, size, tuple(issues), digest)
+
+
+class ValidationReport:
+    """Results of validate_folder, serializable with as_dict() / write_json()."""
+
+    def __init__(self, folder, results, elapsed, base=None):
+        self.folder = folder
+        self.results = results
+        self.elapsed = elapsed
+        self.base = base
+
+        by_digest = {}
+        for result in results:
+            if result.digest is not None:
+                by_digest.setdefault(result.digest, []).append(result.name)
+        self.duplicates = [names for names in by_digest.values() if len(names) > 1]
+
+    @property
+    def problems(self):
+        """Results with at least one issue."""
+        return [result for result in self.results if result.issues]
+
+    @property
+    def ok(self):
+        """True when no file has an issue (duplicates are reported separately)."""
+        return not self.problems
+
+    def summary(self):
+        counts = {}
+        for result in self.results:
+            for issue in result.issues:
+                code = issue.split(":", 1)[0]
+                counts[code] = counts.get(code, 0) + 1
+        counts['duplicate_groups'] = len(self.duplicates)
+        counts['duplicate_files'] = sum(len(names) for names in self.duplicates)
+        return counts
+
+    def as_dict(self):
+        total_bytes = sum(result.size or 0 for result in self.results)
+        return {
+            'folder': os.path.abspath(self.folder),
+            'base': self.base,
+            'files': len(self.results),
+            'bytes': total_bytes,
+            'elapsed_s': round(self.elapsed, 6),
+            'files_per_s': round(len(self.results) / self.elapsed, 1) if self.elapsed else None,
+            'ok': self.ok,
+            'summary': self.summary(),
+            'problems': [{'file': r.name, 'size': r.size, 'issues': list(r.issues)}
+                         for r in self.problems],
+            'duplicates': self.duplicates,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+
+
+def load_base_palette(path):
+    """Base palette (256 (r, g, b)) from a .pal or from the palette of a .spr."""
+    if path.lower().endswith(".spr"):
+        from src.core.parsers.spr import SprParser
+        return [color[:3] for color in SprParser(path).extract_palette()]
+    return PaletteHandler.load(path)
+
+
+def validate_folder(folder, base_palette=None, workers=None, extension=".pal"):
+    """
+    Checks every palette file of a folder (not recursive).
+
+    Args:
+        folder: Folder to check
+        base_palette: Optional 256 (r, g, b) colors; files with the same colors are flagged
+        workers: Reader threads (default: ThreadPoolExecutor's default)
+        extension: File extension to check
+
+    Returns:
+        ValidationReport with results in natural file name order
+    """
+    started = time.perf_counter()
+    with os.scandir(folder) as it:
+        names = [item.name for item in it
+                 if item.name.lower().endswith(extension) and item.is_file()]
+    names.sort(key=natural_key)
+
+    base_channels = None
+    if base_palette is not None:
+        base_channels = _channels(bytes(PaletteHandler.encode(base_palette)))
+
+    entries, errors = PaletteHandler.load_many([os.path.join(folder, name) for name in names],
+                                               workers, raw=True)
+    unreadable = {position: message for position, _, message in errors}
+    results = []
+    for position, (name, entry) in enumerate(zip(names, entries)):
+        if entry is None:
+            results.append(FileResult(name, None, (f"unreadable: {unreadable[position]}",), None))
+        else:
+            results.append(check_palette(name, entry[0], entry[1], base_channels))
+
+    return ValidationReport(folder, results, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a folder of .pal files")
+    parser.add_argument("folder")
+    parser.add_argument("--base", help="Base palette (.pal, or .spr to use its palette)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fail-on-duplicates", action="store_true",
+                        help="Exit with status 1 when identical palettes are found")
+    parser.add_argument("-o", "--output", help="JSON report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    base_palette = load_base_palette(args.base) if args.base else None
+    report = validate_folder(args.folder, base_palette, workers=args.workers)
+    report.base = args.base
+
+    if args.output:
+        report.write_json(args.output)
+        summary = ", ".join(f"{k}={v}" for k, v in report.summary().items() if v)
+        print(f"{len(report.results)} files in {report.elapsed:.2f}s: {summary or 'ok'}")
+    else:
+        print(json.dumps(report.as_dict(), indent=2, ensure_ascii=False))
+    failed = not report.ok or (args.fail_on_duplicates and report.duplicates)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Pipelined writer stage for palette sinks.
+
+WriterStage wraps any PaletteSink: the generator keeps computing while writer
+threads drain a bounded queue of batched entries into the wrapped sink, so
+color math and disk I/O overlap. A full queue blocks the generator
+(back-pressure) instead of buffering the whole run in memory. Optional fsync
+is deferred until every entry has been written.
+"""
+import time
+import queue
+import threading
+from src.core.sinks import PaletteSink
+
+# Entries (name, data) handed to a writer thread at once
+DEFAULT_BATCH_SIZE = 64
+# Batches waiting in the queue before the generator blocks
+DEFAULT_QUEUE_SIZE = 16
+
+_STOP = object()
+
+
+class WriterStats:
+    """Counters describing how a WriterStage performed."""
+
+    def __init__(self):
+        self.threads = 0
+        self.entries = 0
+        self.batches = 0
+        self.bytes_written = 0
+        self.max_queue_depth = 0      # Batches waiting, peak
+        self.queue_depth_total = 0    # Sum of depths sampled at every put (for the mean)
+        self.producer_wait = 0.0      # Seconds the generator was blocked on a full queue
+        self.drain_wait = 0.0         # Seconds close() waited for the queue to drain
+        self.writer_busy = 0.0        # Seconds writer threads spent writing (all threads)
+        self.wall_time = 0.0          # Seconds from open() to the end of close()
+        self.fsync_time = 0.0
+
+    @property
+    def mean_queue_depth(self):
+        return self.queue_depth_total / self.batches if self.batches else 0.0
+
+    @property
+    def utilization(self):
+        """Fraction of the available writer time spent writing (0.0-1.0)."""
+        available = self.wall_time * max(self.threads, 1)
+        return min(1.0, self.writer_busy / available) if available else 0.0
+
+    def merge(self, other):
+        """Adds the counters of another WriterStats (e.g. from a worker shard)."""
+        self.threads += other.threads
+        self.entries += other.entries
+        self.batches += other.batches
+        self.bytes_written += other.bytes_written
+        self.max_queue_depth = max(self.max_queue_depth, other.max_queue_depth)
+        self.queue_depth_total += other.queue_depth_total
+        self.producer_wait += other.producer_wait
+        self.drain_wait += other.drain_wait
+        self.writer_busy += other.writer_busy
+        self.fsync_time += other.fsync_time
+        return self
+
+    def as_dict(self):
+        data = dict(vars(self))
+        data['mean_queue_depth'] = self.mean_queue_depth
+        data['utilization'] = self.utilization
+        return data
+
+    def __repr__(self):
+        return (f"WriterStats(entries={self.entries}, batches={self.batches}, "
+                f"max_queue_depth={self.max_queue_depth}, "
+                f"mean_queue_depth={self.mean_queue_depth:.1f}, "
+                f"producer_wait={self.producer_wait:.3f}s, utilization={self.utilization:.0%})")
+
+
+class WriterStage(PaletteSink):
+    """
+    Asynchronous, batched front end for a PaletteSink.
+
+    Args:
+        sink: Sink that receives the entries
+        threads: Writer threads. 0 writes inline (still batched, still able to
+                 defer fsync). Sinks that are not thread safe (archives, dedup)
+                 always get a single thread so entry order is preserved.
+        batch_size: Entries per batch handed to a writer thread
+        queue_size: Maximum batches waiting before the generator blocks
+        fsync: Flush everything to stable storage once all entries are written
+    """
+
+    def __init__(self, sink, threads=2, batch_size=DEFAULT_BATCH_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE, fsync=False):
+        self.sink = sink
+        self.threads = threads
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.fsync = fsync
+        self.writer_stats = None
+        self._queue = None
+        self._workers = []
+        self._batch = []
+        self._written = []
+        self._lock = None
+        self._error = None
+        self._started = 0.0
+
+    @property
+    def dedup(self):
+        return self.sink.dedup
+
+    @property
+    def dedup_stats(self):
+        return self.sink.dedup_stats
+
+    def open(self):
+        self.sink.open()
+        threads = self.threads
+        if threads > 1 and not self.sink.thread_safe:
+            threads = 1
+
+        self.writer_stats = WriterStats()
+        self.writer_stats.threads = threads
+        self._batch = []
+        self._written = []
+        self._lock = threading.Lock()
+        self._error = None
+        self._started = time.perf_counter()
+
+        self._workers = []
+        self._queue = queue.Queue(maxsize=self.queue_size) if threads else None
+        for _ in range(threads):
+            worker = threading.Thread(target=self._drain, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def write(self, name, data):
+        """Queues one entry. Returns where it will be written (see PaletteSink.path_for)."""
+        if self._error is not None:
+            raise self._error
+        self._batch.append((name, data))
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+        return self.sink.path_for(name)
+
+    def close(self):
+        try:
+            if self._batch and self._error is None:
+                self._submit()
+            started = time.perf_counter()
+            for _ in self._workers:
+                self._queue.put(_STOP)
+            for worker in self._workers:
+                worker.join()
+            self._workers = []
+            self.writer_stats.drain_wait += time.perf_counter() - started
+        finally:
+            self.sink.close()
+
+        if self._error is not None:
+            raise self._error
+
+        if self.fsync:
+            started = time.perf_counter()
+            self.sink.sync(self._written)
+            self.writer_stats.fsync_time = time.perf_counter() - started
+        self._written = []
+        self.writer_stats.wall_time = time.perf_counter() - self._started
+
+    def worker_sink(self):
+        inner = self.sink.worker_sink()
+        if inner is None:
+            return None
+        return WriterStage(inner, self.threads, self.batch_size, self.queue_size, self.fsync)
+
+    def _submit(self):
+        batch, self._batch = self._batch, []
+        self.writer_stats.batches += 1
+
+        if self._queue is None:
+            self._write_batch(batch)
+            return
+
+        depth = self._queue.qsize()
+        self.writer_stats.queue_depth_total += depth
+        self.writer_stats.max_queue_depth = max(self.writer_stats.max_queue_depth, depth)
+        started = time.perf_counter()
+        self._queue.put(batch)
+        self.writer_stats.producer_wait += time.perf_counter() - started
+
+    def _write_batch(self, batch):
+        started = time.perf_counter()
+        written = self.sink.write_many(batch)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if self.fsync:
+                self._written.extend(written)
+            self.writer_stats.entries += len(batch)
+            self.writer_stats.bytes_written += sum(len(data) for _, data in batch)
+            self.writer_stats.writer_busy += elapsed
+
+    def _drain(self):
+        while True:
+            batch = self._queue.get()
+            if batch is _STOP:
+                return
+            # After a failure keep consuming so the generator never blocks forever
+            if self._error is not None:
+                continue
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self._error = e
@@ -1,5 +1,13 @@
 import customtkinter as ctk
 
+def format_dedup_summary(stats):
+    """Summary line for the success dialog when hardlinks were used (DedupStats or None)."""
+    if not stats:
+        return ""
+    return (f"\n\nHardlinks: {stats.unique_writes} gravados, {stats.links} links, "
+            f"{stats.copies} cópias\n"
+            f"Economia: {stats.bytes_saved / 1024:.0f} KB, ~{stats.syscalls_saved} chamadas de sistema")
+
 class GroupManagementFrame(ctk.CTkFrame):
     def __init__(self, master, add_group_cmd=None, remove_group_cmd=None, **kwargs):
         super().__init__(master, **kwargs)
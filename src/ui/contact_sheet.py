@@ -0,0 +1,250 @@
+"""
+Contact sheet: one sprite frame rendered under a whole page of palettes.
+
+The frame is scaled to thumbnail size once; every palette of a page then
+becomes a 256-entry RGBA lookup table applied to that shared index buffer
+(one vectorized numpy lookup for the whole page) and the thumbnails are laid
+out in a single sheet image. Pages are rendered only when shown.
+"""
+from collections import OrderedDict
+
+import customtkinter as ctk
+from PIL import Image
+
+from src.core.pal_handler import PAL_SIZE, RESERVED_BYTES
+from src.core.vector_engine import NUMPY_AVAILABLE, np
+
+SHEET_COLUMNS = 10
+SHEET_ROWS = 10
+# Thumbnail size limits (longest side, pixels); the sheet fits its area within them
+THUMB_MIN = 16
+THUMB_MAX = 96
+SHEET_GAP = 2
+# Rendered pages kept for paging back and forth
+SHEET_PAGE_CACHE = 4
+
+
+def thumbnail_frame(frame, thumb_size):
+    """P-mode frame scaled (nearest neighbour) so its longest side is thumb_size."""
+    scale = thumb_size / max(frame.width, frame.height)
+    size = (max(1, int(frame.width * scale)), max(1, int(frame.height * scale)))
+    return frame.resize(size, Image.NEAREST)
+
+
+def render_sheet(thumb, palettes, columns, gap=SHEET_GAP):
+    """
+    Renders a thumbnail under each palette, laid out in a grid.
+
+    Args:
+        thumb: P-mode thumbnail (thumbnail_frame) shared by every cell
+        palettes: 1024-byte .pal contents (None leaves the cell empty)
+        columns: Cells per row
+        gap: Pixels between cells
+
+    Returns:
+        RGBA sheet; index 0 is transparent in every cell
+    """
+    count = len(palettes)
+    rows = max(1, -(-count // columns))
+    cell_w, cell_h = thumb.width + gap, thumb.height + gap
+
+    if not NUMPY_AVAILABLE:
+        sheet = Image.new("RGBA", (columns * cell_w, rows * cell_h))
+        for k, data in enumerate(palettes):
+            if data is None:
+                continue
+            cell = thumb.copy()
+            cell.putpalette(bytes(data), rawmode="RGBX")
+            cell.info['transparency'] = 0
+            sheet.paste(cell.convert("RGBA"), ((k % columns) * cell_w, (k // columns) * cell_h))
+        return sheet
+
+    # (count, 256) RGBA lookup tables; alpha is RESERVED_BYTES (index 0 transparent),
+    # whatever reserved bytes the files hold
+    present = [k for k, data in enumerate(palettes) if data is not None]
+    luts = np.zeros((count, 256, 4), dtype=np.uint8)
+    if present:
+        raw = b"".join(bytes(palettes[k][:PAL_SIZE]) for k in present)
+        luts[present] = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 256, 4)
+        luts[present, :, 3] = np.frombuffer(RESERVED_BYTES, dtype=np.uint8)
+
+    indices = np.asarray(thumb, dtype=np.uint8)
+    cells = np.zeros((rows * columns, cell_h, cell_w), dtype=np.uint32)
+    # One lookup for the whole page: (count, 256)[:, (h, w)] -> (count, h, w)
+    cells[:count, :thumb.height, :thumb.width] = luts.view(np.uint32)[:, :, 0][:, indices]
+
+    sheet = cells.reshape(rows, columns, cell_h, cell_w).transpose(0, 2, 1, 3)
+    sheet = np.ascontiguousarray(sheet).reshape(rows * cell_h, columns * cell_w)
+    return Image.frombuffer("RGBA", (sheet.shape[1], sheet.shape[0]), sheet, "raw", "RGBA", 0, 1)
+
+
+class ContactSheet(ctk.CTkFrame):
+    """
+    Paged grid of one frame under many palettes.
+
+    set_source() gives the frame and how to read palettes; clicking a cell
+    calls on_select(palette position).
+    """
+
+    def __init__(self, master, columns=SHEET_COLUMNS, rows=SHEET_ROWS, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self.rows = rows
+        self.page = 0
+
+        # Callback for thumbnail click: receives the palette position
+        self.on_select = None
+
+        self._source = None  # (frame, palettes object, count)
+        self._palette_data = None
+        self._palette_name = None
+        self._thumb = None
+        self._pages = OrderedDict()  # page -> (sheet, CTkImage)
+        self._layout_job = None
+
+        # Page navigation
+        self.nav_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.nav_frame.pack(fill="x", pady=(5, 0))
+
+        self.btn_prev_page = ctk.CTkButton(self.nav_frame, text="◀", width=40, command=self.prev_page)
+        self.btn_prev_page.pack(side="left", padx=2)
+
+        self.lbl_page = ctk.CTkLabel(self.nav_frame, text="0/0")
+        self.lbl_page.pack(side="left", expand=True)
+
+        self.btn_next_page = ctk.CTkButton(self.nav_frame, text="▶", width=40, command=self.next_page)
+        self.btn_next_page.pack(side="right", padx=2)
+
+        self.image_label = ctk.CTkLabel(self, text="")
+        self.image_label.pack(expand=True, fill="both")
+
+        # Name of the palette under the mouse
+        self.lbl_hover = ctk.CTkLabel(self, text="", text_color="gray")
+        self.lbl_hover.pack(pady=(0, 5))
+
+        self.image_label.bind("<Button-1>", self._on_click)
+        self.image_label.bind("<Motion>", self._on_motion)
+        self.image_label.bind("<Configure>", self._on_resize)
+
+    @property
+    def page_size(self):
+        return self.columns * self.rows
+
+    @property
+    def page_count(self):
+        count = self._source[2] if self._source else 0
+        return max(1, -(-count // self.page_size))
+
+    def set_source(self, frame, palettes, palette_data, palette_name=None):
+        """
+        Args:
+            frame: P-mode PIL frame drawn in every cell
+            palettes: Palette list or bank (only its len() and identity are used)
+            palette_data: Callable(position) -> 1024-byte .pal content, or None if unreadable
+            palette_name: Optional callable(position) -> name shown on hover
+        """
+        source = (frame, palettes, len(palettes))
+        old = self._source
+        self._palette_data = palette_data
+        self._palette_name = palette_name
+        if old is not None and old[0] is frame and old[1] is palettes and old[2] == source[2]:
+            return
+        self._source = source
+        self._thumb = None
+        self._pages.clear()
+        self.page = min(self.page, self.page_count - 1)
+
+    def show_page(self, page):
+        if self._source is None:
+            return
+        self.page = max(0, min(page, self.page_count - 1))
+        start = self.page * self.page_size
+        stop = min(start + self.page_size, self._source[2])
+        self.lbl_page.configure(
+            text=f"Página {self.page + 1}/{self.page_count}  ({start + 1}-{stop} de {self._source[2]})"
+            if stop > start else "0/0")
+
+        render = self._page_render(self.page)
+        if render is not None:
+            self.image_label.configure(image=render[1])
+
+    def prev_page(self):
+        self.show_page(self.page - 1)
+
+    def next_page(self):
+        self.show_page(self.page + 1)
+
+    def _fit_thumb_size(self):
+        """Largest thumbnail that fits the grid in the label (before it is mapped: THUMB_MAX // 2)"""
+        width, height = self.image_label.winfo_width(), self.image_label.winfo_height()
+        if width <= 1 or height <= 1:
+            return THUMB_MAX // 2
+        size = min(width // self.columns, height // self.rows) - SHEET_GAP
+        return max(THUMB_MIN, min(THUMB_MAX, size))
+
+    def _page_render(self, page):
+        """(sheet, CTkImage) of a page, rendered on first use."""
+        render = self._pages.get(page)
+        if render is not None:
+            self._pages.move_to_end(page)
+            return render
+
+        frame, _, count = self._source
+        start = page * self.page_size
+        stop = min(start + self.page_size, count)
+        if stop <= start:
+            return None
+        if self._thumb is None:
+            self._thumb = thumbnail_frame(frame, self._fit_thumb_size())
+
+        sheet = render_sheet(self._thumb, [self._palette_data(k) for k in range(start, stop)], self.columns)
+        ctk_image = ctk.CTkImage(light_image=sheet, dark_image=sheet, size=(sheet.width, sheet.height))
+        self._pages[page] = render = (sheet, ctk_image)
+        while len(self._pages) > SHEET_PAGE_CACHE:
+            self._pages.popitem(last=False)
+        return render
+
+    def _on_resize(self, event):
+        """Re-layout with a new thumbnail size once resizing settles"""
+        if self._layout_job is not None:
+            self.after_cancel(self._layout_job)
+        self._layout_job = self.after(150, self._relayout)
+
+    def _relayout(self):
+        self._layout_job = None
+        if self._source is None or self._thumb is None:
+            return
+        if max(self._thumb.width, self._thumb.height) == self._fit_thumb_size():
+            return
+        self._thumb = None
+        self._pages.clear()
+        self.show_page(self.page)
+
+    def _position_at(self, x, y):
+        """Palette position of the cell under label coordinates, or None"""
+        render = self._pages.get(self.page)
+        if render is None or self._thumb is None:
+            return None
+        sheet = render[0]
+
+        # Sheet is centered in the label
+        x -= (self.image_label.winfo_width() - sheet.width) // 2
+        y -= (self.image_label.winfo_height() - sheet.height) // 2
+        if not (0 <= x < sheet.width and 0 <= y < sheet.height):
+            return None
+        column = x // (self._thumb.width + SHEET_GAP)
+        row = y // (self._thumb.height + SHEET_GAP)
+        position = self.page * self.page_size + row * self.columns + column
+        return position if position < self._source[2] else None
+
+    def _on_click(self, event):
+        position = self._position_at(event.x, event.y)
+        if position is not None and self.on_select:
+            self.on_select(position)
+
+    def _on_motion(self, event):
+        position = self._position_at(event.x, event.y)
+        text = ""
+        if position is not None:
+            text = self._palette_name(position) if self._palette_name else str(position + 1)
+        self.lbl_hover.configure(text=text)
@@ -2,15 +2,18 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import os
 import threading
-import colorsys
 
 from src.core.parsers.spr import SprParser
+from src.core.sprite_cache import SpriteCache
 from src.core.logic.state import ProjectState
 from src.core.hair_generator import HairPaletteGenerator
-from src.core.color_math import apply_adjustments, apply_colorize
+from src.core.plan import GenerationPlan
+from src.core.vector_engine import NUMPY_AVAILABLE
+from src.core.parallel import default_workers
+from src.core.color_math import rgb_to_hsv, adjust_hsv, colorize_hsv
 
 from src.ui.visualizer import PaletteVisualizer
-from src.ui.components_v2 import GroupManagementFrame, GroupSettingsFrame
+from src.ui.components_v2 import GroupManagementFrame, GroupSettingsFrame, format_dedup_summary
 from src.ui.preview import SpritePreview
 from src.ui.icons import IconManager
 
@@ -106,6 +109,29 @@ class HairGeneratorWindow(ctk.CTkToplevel):
         
         self.chk_rand_bri = ctk.CTkCheckBox(self.frame_gen_controls, text="Brilho Aleatório", width=100)
         self.chk_rand_bri.pack(side="left", padx=5)
+        
+        # Use every CPU core (sharded generation in worker processes)
+        self.chk_multicore = ctk.CTkCheckBox(self.frame_gen_controls, text="Multi-núcleo", width=100)
+        self.chk_multicore.pack(side="left", padx=5)
+        
+        # Write each distinct palette once and hardlink the other names
+        self.chk_dedup = ctk.CTkCheckBox(self.frame_gen_controls, text="Hardlinks", width=100)
+        self.chk_dedup.pack(side="left", padx=5)
+        
+        # Vectorized engine (needs numpy; the pure Python engine gives the same palettes)
+        self.chk_numpy = ctk.CTkCheckBox(self.frame_gen_controls, text="NumPy", width=70)
+        self.chk_numpy.pack(side="left", padx=5)
+        if NUMPY_AVAILABLE:
+            self.chk_numpy.select()
+        else:
+            self.chk_numpy.configure(state="disabled")
+        
+        # Threads writing files while palettes are computed (0 = write inline)
+        ctk.CTkLabel(self.frame_gen_controls, text="Gravação:").pack(side="left", padx=(5, 2))
+        self.writer_threads_var = ctk.StringVar(value="2")
+        self.opt_writer_threads = ctk.CTkOptionMenu(self.frame_gen_controls, values=["0", "1", "2", "4"],
+                                                    variable=self.writer_threads_var, width=60)
+        self.opt_writer_threads.pack(side="left", padx=2)
     
     def _create_left_column(self):
         """Create left column with groups and visualizer."""
@@ -320,53 +346,42 @@ class HairGeneratorWindow(ctk.CTkToplevel):
         
         temp_pal = list(self.project_state.spr_parser.palette)
         
-        for group in self.project_state.groups:
-            is_fixed = getattr(group, 'is_fixed', False)
-            
-            if is_fixed:
-                fixed_gradient = getattr(group, 'fixed_gradient', None)
-                if fixed_gradient and len(fixed_gradient) == 8:
-                    sorted_indices = sorted(group.indices)
-                    num_colors = len(sorted_indices)
-                    
-                    for j, idx in enumerate(sorted_indices):
-                        if 0 <= idx < 256:
-                            gradient_pos = int((j / max(num_colors - 1, 1)) * 7)
-                            gradient_pos = min(gradient_pos, 7)
-                            base_col = fixed_gradient[gradient_pos]
-                            
-                            r, g, b = base_col[0]/255, base_col[1]/255, base_col[2]/255
-                            h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                            
-                            s = max(0, min(1, s + group.sat_shift))
-                            v = max(0, min(1, v * (1 + group.val_shift)))
-                            
-                            r, g, b = colorsys.hsv_to_rgb(h, s, v)
-                            new_col = (int(r*255), int(g*255), int(b*255))
-                            temp_pal[idx] = (*new_col, 255)
-            else:
+        # Fixed group colors and base HSV come from the same cached plan and
+        # HsvTable the generator uses (temp_pal is the original palette here)
+        plan = GenerationPlan.compile(self.project_state.hsv_table, self.project_state.groups)
+        
+        for group, g_data in zip(self.project_state.groups, plan.groups):
+            if g_data['type'] == 'fixed':
+                for idx, new_col in g_data['colors']:
+                    temp_pal[idx] = (*new_col, 255)
+            elif g_data['type'] == 'variable':
                 shift = group.hue_shift_start
                 
-                for i in group.indices:
-                    if 0 <= i < 256:
-                        orig = temp_pal[i][:3]
-                        
-                        if getattr(group, 'mode', 'hsv') == 'colorize':
-                            new_col = apply_colorize(
-                                orig,
-                                target_hue=shift,
-                                target_sat=group.sat_shift,
-                                value_mult=1.0 + group.val_shift
-                            )
-                        else:
-                            new_col = apply_adjustments(
-                                orig,
-                                hue_shift=shift,
-                                saturation_mult=1+group.sat_shift,
-                                value_mult=1+group.val_shift
-                            )
-                        
-                        temp_pal[i] = (*new_col, 255)
+                base_hsv = g_data['base_hsv']
+                
+                for j, i in enumerate(g_data['indices']):
+                    # Untouched base colors skip the RGB -> HSV conversion
+                    if base_hsv is not None:
+                        hsv = base_hsv[j]
+                    else:
+                        hsv = rgb_to_hsv(*temp_pal[i][:3])
+                    
+                    if getattr(group, 'mode', 'hsv') == 'colorize':
+                        new_col = colorize_hsv(
+                            hsv,
+                            target_hue=shift,
+                            target_sat=group.sat_shift,
+                            value_mult=1.0 + group.val_shift
+                        )
+                    else:
+                        new_col = adjust_hsv(
+                            hsv,
+                            hue_shift=shift,
+                            saturation_mult=1+group.sat_shift,
+                            value_mult=1+group.val_shift
+                        )
+                    
+                    temp_pal[i] = (*new_col, 255)
         
         self.preview.set_sprite(base_img, palette=temp_pal)
     
@@ -394,7 +409,7 @@ class HairGeneratorWindow(ctk.CTkToplevel):
             return
         
         try:
-            self.project_state.spr_parser = SprParser(path)
+            self.project_state.spr_parser = SprParser(path, disk_cache=SpriteCache.default())
             self.project_state.spr_parser.extract_palette()
             self.project_state.spr_parser.parse_images()
             
@@ -483,9 +498,11 @@ class HairGeneratorWindow(ctk.CTkToplevel):
         params = self._gen_params
         self._gen_error = None
         self._gen_current = 0
+        self._gen_dedup_stats = None
         
         try:
-            gen = HairPaletteGenerator([x[:3] for x in self.project_state.palette])
+            gen = HairPaletteGenerator([x[:3] for x in self.project_state.palette],
+                                       hsv_table=self.project_state.hsv_table)
             gen.generate_hair_palettes(
                 output_dir=params['output'],
                 style_count=params['style_count'],
@@ -494,8 +511,13 @@ class HairGeneratorWindow(ctk.CTkToplevel):
                 start_number=params['start_number'],
                 random_saturation=self.chk_rand_sat.get() == 1,
                 random_brightness=self.chk_rand_bri.get() == 1,
-                progress_callback=self._update_gen_progress
+                progress_callback=self._update_gen_progress,
+                engine="numpy" if self.chk_numpy.get() == 1 else "python",
+                workers=default_workers() if self.chk_multicore.get() == 1 else 1,
+                dedup=self.chk_dedup.get() == 1,
+                writer_threads=int(self.writer_threads_var.get())
             )
+            self._gen_dedup_stats = gen.last_dedup_stats
         except Exception as e:
             self._gen_error = str(e)
     
@@ -531,6 +553,7 @@ class HairGeneratorWindow(ctk.CTkToplevel):
                 "Sucesso",
                 f"Gerados {params['total_files']} arquivos de paleta de cabelo!\n\n"
                 f"Formato: ¸Ó¸®{params['style_count']}_{{gênero}}_{{número}}.pal"
+                f"{format_dedup_summary(self._gen_dedup_stats)}"
             )
             os.startfile(params['output'])
         
@@ -540,3 +563,4 @@ class HairGeneratorWindow(ctk.CTkToplevel):
         del self._gen_current
         del self._gen_total
         del self._gen_error
+        del self._gen_dedup_stats
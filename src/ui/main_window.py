@@ -2,19 +2,23 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import os
 import glob
-import colorsys
 import threading
 
 from src.core.parsers.spr import SprParser
-from src.core.parsers.act import ActParser
+from src.core.sprite_cache import SpriteCache
+from src.core.parsers.act import ActParser, DEFAULT_DELAY_MS
 from src.core.logic.state import ProjectState
 from src.core.generator import PaletteGenerator
+from src.core.plan import GenerationPlan
+from src.core.vector_engine import NUMPY_AVAILABLE
+from src.core.parallel import default_workers
 from src.core.pal_handler import PaletteHandler
-from src.core.color_math import apply_adjustments, apply_colorize
+from src.core.color_math import rgb_to_hsv, adjust_hsv, colorize_hsv
 
 from src.ui.visualizer import PaletteVisualizer
-from src.ui.components_v2 import GroupManagementFrame, GroupSettingsFrame
+from src.ui.components_v2 import GroupManagementFrame, GroupSettingsFrame, format_dedup_summary
 from src.ui.preview import SpritePreview
+from src.ui.playback import PlaybackBuffer
 from src.ui.preview_window import PreviewWindow
 from src.ui.class_selector import ClassSelectorWindow
 from src.ui.icons import IconManager
@@ -40,6 +44,10 @@ class MainWindow(ctk.CTk):
         self.current_frame_index = 0
         self.is_playing = False
         self._preview_pending = None  # For throttled preview updates
+        self.preview_palette = None  # Group-adjusted palette last shown in the preview
+        self.playback = None  # PlaybackBuffer pre-rendering frames while playing
+        self.act_parser = None  # .act next to the SPR, drives playback
+        self.loop_position = 0  # Position of the shown frame in the playback loop
         
         # --- Top Menu ---
         self.top_frame = ctk.CTkFrame(self, height=40)
@@ -125,6 +133,29 @@ class MainWindow(ctk.CTk):
         self.chk_rand_bri = ctk.CTkCheckBox(self.frame_gen_controls, text="Brilho Aleatório", width=100)
         self.chk_rand_bri.pack(side="left", padx=5)
         
+        # Use every CPU core (sharded generation in worker processes)
+        self.chk_multicore = ctk.CTkCheckBox(self.frame_gen_controls, text="Multi-núcleo", width=100)
+        self.chk_multicore.pack(side="left", padx=5)
+        
+        # Write each distinct palette once and hardlink the other names
+        self.chk_dedup = ctk.CTkCheckBox(self.frame_gen_controls, text="Hardlinks", width=100)
+        self.chk_dedup.pack(side="left", padx=5)
+        
+        # Vectorized engine (needs numpy; the pure Python engine gives the same palettes)
+        self.chk_numpy = ctk.CTkCheckBox(self.frame_gen_controls, text="NumPy", width=70)
+        self.chk_numpy.pack(side="left", padx=5)
+        if NUMPY_AVAILABLE:
+            self.chk_numpy.select()
+        else:
+            self.chk_numpy.configure(state="disabled")
+        
+        # Threads writing files while palettes are computed (0 = write inline)
+        ctk.CTkLabel(self.frame_gen_controls, text="Gravação:").pack(side="left", padx=(5, 2))
+        self.writer_threads_var = ctk.StringVar(value="2")
+        self.opt_writer_threads = ctk.CTkOptionMenu(self.frame_gen_controls, values=["0", "1", "2", "4"],
+                                                    variable=self.writer_threads_var, width=60)
+        self.opt_writer_threads.pack(side="left", padx=2)
+        
         self.lbl_info = ctk.CTkLabel(self.top_frame, text="Nenhum arquivo carregado")
         self.lbl_info.pack(side="left", padx=10)
         
@@ -304,7 +335,8 @@ class MainWindow(ctk.CTk):
         if not path: return
         
         try:
-            self.project_state.spr_parser = SprParser(path)
+            self._stop_playback()
+            self.project_state.spr_parser = SprParser(path, disk_cache=SpriteCache.default())
             self.project_state.spr_parser.extract_palette()
             self.project_state.spr_parser.parse_images()
             
@@ -312,9 +344,17 @@ class MainWindow(ctk.CTk):
             self.current_filename = os.path.splitext(os.path.basename(path))[0]
             
             self.lbl_info.configure(text=f"Carregado: {self.current_filename}")
+            try:
+                self.act_parser = ActParser.for_sprite(path)
+            except (OSError, ValueError) as e:
+                self.act_parser = None
+                messagebox.showwarning("Aviso", f"ACT ignorado, animando todos os quadros: {e}")
+            if self.act_parser:
+                self.lbl_info.configure(text=f"Carregado: {self.current_filename} + ACT")
             
             # Reset UI
             self.current_frame_index = 0
+            self.loop_position = 0
             self.visualizer.set_palette([x[:3] for x in self.project_state.palette]) 
             self.project_state.groups.clear()
             self.group_mgr.update_groups(self.project_state.groups)
@@ -434,60 +474,45 @@ class MainWindow(ctk.CTk):
         # 2. Apply Group Transformations to Palette
         temp_pal = list(self.project_state.spr_parser.palette) # [r,g,b,a]
         
-        for group in self.project_state.groups:
-            # Check if group has fixed gradient
-            is_fixed = getattr(group, 'is_fixed', False)
-            
-            if is_fixed:
-                # Apply fixed gradient directly to indices
-                fixed_gradient = getattr(group, 'fixed_gradient', None)
-                if fixed_gradient and len(fixed_gradient) == 8:
-                    sorted_indices = sorted(group.indices)
-                    num_colors = len(sorted_indices)
-                    
-                    for j, idx in enumerate(sorted_indices):
-                        if 0 <= idx < 256:
-                            # Map index position to gradient position
-                            gradient_pos = int((j / max(num_colors - 1, 1)) * 7)
-                            gradient_pos = min(gradient_pos, 7)
-                            base_col = fixed_gradient[gradient_pos]
-                            
-                            # Apply saturation and brightness adjustments
-                            r, g, b = base_col[0]/255, base_col[1]/255, base_col[2]/255
-                            h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                            
-                            # Apply shifts
-                            s = max(0, min(1, s + group.sat_shift))
-                            v = max(0, min(1, v * (1 + group.val_shift)))
-                            
-                            r, g, b = colorsys.hsv_to_rgb(h, s, v)
-                            new_col = (int(r*255), int(g*255), int(b*255))
-                            temp_pal[idx] = (*new_col, 255)
-            else:
+        # Fixed group colors and base HSV come from the same cached plan and
+        # HsvTable the generator uses (temp_pal is the original palette here)
+        plan = GenerationPlan.compile(self.project_state.hsv_table, self.project_state.groups)
+        
+        for group, g_data in zip(self.project_state.groups, plan.groups):
+            if g_data['type'] == 'fixed':
+                for idx, new_col in g_data['colors']:
+                    temp_pal[idx] = (*new_col, 255)
+            elif g_data['type'] == 'variable':
                 # Original logic for non-fixed groups
                 shift = group.hue_shift_start
                 
-                for i in group.indices:
-                    if 0 <= i < 256:
-                        orig = temp_pal[i][:3]
+                base_hsv = g_data['base_hsv']
+                
+                for j, i in enumerate(g_data['indices']):
+                    # Untouched base colors skip the RGB -> HSV conversion
+                    if base_hsv is not None:
+                        hsv = base_hsv[j]
+                    else:
+                        hsv = rgb_to_hsv(*temp_pal[i][:3])
+                    
+                    if getattr(group, 'mode', 'hsv') == 'colorize':
+                        new_col = colorize_hsv(
+                             hsv,
+                             target_hue=shift,
+                             target_sat=group.sat_shift,
+                             value_mult=1.0 + group.val_shift
+                        )
+                    else:
+                        new_col = adjust_hsv(
+                            hsv, 
+                            hue_shift=shift, 
+                            saturation_mult=1+group.sat_shift, 
+                            value_mult=1+group.val_shift
+                        )
                         
-                        if getattr(group, 'mode', 'hsv') == 'colorize':
-                            new_col = apply_colorize(
-                                 orig,
-                                 target_hue=shift,
-                                 target_sat=group.sat_shift,
-                                 value_mult=1.0 + group.val_shift
-                            )
-                        else:
-                            new_col = apply_adjustments(
-                                orig, 
-                                hue_shift=shift, 
-                                saturation_mult=1+group.sat_shift, 
-                                value_mult=1+group.val_shift
-                            )
-                            
-                        temp_pal[i] = (*new_col, 255)
+                    temp_pal[i] = (*new_col, 255)
         
+        self.preview_palette = temp_pal
         self.preview.set_sprite(base_img, palette=temp_pal)
     
     def generate_all_groups(self):
@@ -559,9 +584,11 @@ class MainWindow(ctk.CTk):
         params = self._gen_params
         self._gen_error = None
         self._gen_current = 0
+        self._gen_dedup_stats = None
         
         try:
-            gen = PaletteGenerator([x[:3] for x in self.project_state.palette])
+            gen = PaletteGenerator([x[:3] for x in self.project_state.palette],
+                                   hsv_table=self.project_state.hsv_table)
             gen.generate_batch_with_progress(
                 output_dir=params['output'],
                 base_filename=self.current_filename,
@@ -571,8 +598,13 @@ class MainWindow(ctk.CTk):
                 class_names=params['class_names'],
                 random_saturation=self.chk_rand_sat.get() == 1,
                 random_brightness=self.chk_rand_bri.get() == 1,
-                progress_callback=self._update_gen_progress
+                progress_callback=self._update_gen_progress,
+                engine="numpy" if self.chk_numpy.get() == 1 else "python",
+                workers=default_workers() if self.chk_multicore.get() == 1 else 1,
+                dedup=self.chk_dedup.get() == 1,
+                writer_threads=int(self.writer_threads_var.get())
             )
+            self._gen_dedup_stats = gen.last_dedup_stats
         except Exception as e:
             self._gen_error = str(e)
     
@@ -607,7 +639,11 @@ class MainWindow(ctk.CTk):
         if self._gen_error:
             messagebox.showerror("Erro", self._gen_error)
         else:
-            messagebox.showinfo("Sucesso", f"Gerados {params['total_files']} arquivos ({params['count']} variações)!")
+            messagebox.showinfo(
+                "Sucesso",
+                f"Gerados {params['total_files']} arquivos ({params['count']} variações)!"
+                f"{format_dedup_summary(self._gen_dedup_stats)}"
+            )
             os.startfile(params['output'])
         
         # Cleanup
@@ -616,6 +652,7 @@ class MainWindow(ctk.CTk):
         del self._gen_current
         del self._gen_total
         del self._gen_error
+        del self._gen_dedup_stats
 
     def _prev_frame(self):
         if not self.project_state.spr_parser or not self.project_state.spr_parser.images:
@@ -640,7 +677,16 @@ class MainWindow(ctk.CTk):
                 fg_color="#FF5555",
                 hover_color="#CC0000"
             )
-            self._animate_loop()
+            parser = self.project_state.spr_parser
+            if parser and parser.images and self.preview_palette is not None:
+                frames, _ = self._play_loop()
+                position = self.loop_position
+                if not (0 <= position < len(frames) and frames[position] == self.current_frame_index):
+                    # Resume from the frame shown (it was changed by hand, or the loop changed)
+                    in_loop = self.current_frame_index in frames
+                    self.loop_position = frames.index(self.current_frame_index) if in_loop else -1
+                self._sync_playback(frames, self._next_loop_position(frames))
+            self.after(self._play_loop()[1], self._animate_loop)
         else:
             self.btn_play.configure(
                 text="Play",
@@ -648,12 +694,84 @@ class MainWindow(ctk.CTk):
                 fg_color="#2CC985",
                 hover_color="#229965"
             )
+            self._stop_playback()
     
     def _animate_loop(self):
         if self.is_playing:
+            self._play_next_frame()
+            # ACT delay of the action played (150 ms without an ACT)
+            self.after(self._play_loop()[1], self._animate_loop)
+
+    def _play_loop(self):
+        """
+        (sprite indices, ms per frame) played by Play: the first action of the
+        ACT next to the SPR, or every frame at 150 ms without one.
+        """
+        parser = self.project_state.spr_parser
+        if not parser or not parser.images:
+            return [], int(DEFAULT_DELAY_MS)
+        total_frames = len(parser.images)
+        act = self.act_parser
+        if act and act.num_actions:
+            frames = [f for f in act.frame_sprites(0, parser.num_indexed) if 0 <= f < total_frames]
+            if frames:
+                return frames, max(10, int(act.get_delay(0)))
+        return list(range(total_frames)), int(DEFAULT_DELAY_MS)
+
+    def _next_loop_position(self, frames):
+        """Loop position played after the current one (the start when it is not in the loop)"""
+        if 0 <= self.loop_position < len(frames):
+            return (self.loop_position + 1) % len(frames)
+        return 0
+    
+    def _play_next_frame(self):
+        """Advance playback, only swapping in pre-rendered images (frames not ready are dropped)"""
+        parser = self.project_state.spr_parser
+        if not parser or not parser.images:
+            return
+        if self.preview_palette is None:
+            # Nothing shown yet: the regular update computes the palette
             self._next_frame()
-            # 150ms delay for animation
-            self.after(150, self._animate_loop)
+            return
+        total_frames = len(parser.images)
+        frames, _ = self._play_loop()
+        self.loop_position = position = self._next_loop_position(frames)
+        
+        playback = self._sync_playback(frames, position)
+        item = playback.take(position)
+        if playback.error is not None:
+            self._playback_failed(playback.error)
+            return
+        if item is not None:
+            # A dropped tick leaves the previous frame (and its number) on screen
+            frame, rendered = item
+            self.current_frame_index = frames[position]
+            self.lbl_frame_info.configure(text=f"Frame: {self.current_frame_index + 1}/{total_frames}")
+            self.preview.set_sprite(frame, palette=self.playback.palette, rendered=rendered)
+    
+    def _sync_playback(self, frames, start):
+        """
+        PlaybackBuffer of the played frames with the current preview palette; a
+        new one (rendering from loop position `start`) when the frames, palette
+        or zoom changed.
+        """
+        parser = self.project_state.spr_parser
+        if self.playback is None or not self.playback.matches(frames, self.preview_palette, self.preview.scale):
+            self._stop_playback()
+            self.playback = PlaybackBuffer(parser.get_image, frames, self.preview_palette,
+                                           self.preview.scale, start=start).start()
+        return self.playback
+    
+    def _stop_playback(self):
+        if self.playback is not None:
+            self.playback.cancel()
+            self.playback = None
+
+    def _playback_failed(self, error):
+        """Stops playing when a frame could not be rendered"""
+        if self.is_playing:
+            self._toggle_play()
+        messagebox.showerror("Erro", f"Falha ao reproduzir a animação: {error}")
 
     def open_hair_generator(self):
         """Open hair palette generator window (Cebelos)"""
@@ -0,0 +1,129 @@
+"""
+Background pre-rendering of an animation loop for playback.
+
+PlaybackBuffer renders the frames of the loop being played on a worker
+thread into a small ring of finished images kept ahead of the playhead, so
+the Tk animation tick only swaps the label image. A frame that is not ready
+when its tick comes is dropped (the previous image stays up) instead of
+being rendered on the Tk thread.
+"""
+import threading
+
+from src.ui.preview import flatten_palette, render_frame
+
+# Frames rendered ahead of the playhead (shorter loops are kept whole)
+PLAYBACK_BUFFER_FRAMES = 48
+
+
+class PlaybackBuffer:
+    """
+    Pre-renders one loop of frames with one palette at one zoom.
+
+    Usage: start(), then take(position) on every tick; build a new buffer
+    when the frames, palette or zoom change (see matches()) and cancel()
+    the old one. When a frame cannot be rendered the worker stops and keeps
+    the exception in `error`: the caller should stop playback and report it.
+
+    Args:
+        get_frame: Callable returning the PIL frame of a sprite index (runs on the worker)
+        frames: Sprite indices of the loop, in play order
+        palette: Palette applied to indexed frames (list of (r, g, b[, a])), or None
+        scale: Zoom factor
+        start: Loop position played first
+        capacity: Frames kept ready ahead of the playhead
+    """
+
+    def __init__(self, get_frame, frames, palette, scale, start=0, capacity=PLAYBACK_BUFFER_FRAMES):
+        self.get_frame = get_frame
+        self.frames = list(frames)
+        self.palette = palette
+        self.scale = scale
+        self.capacity = max(1, min(capacity, len(self.frames)))
+        self.dropped = 0
+        self.error = None  # Exception that stopped the worker
+        self._flat_palette = flatten_palette(palette) if palette else None
+        self._playhead = start % len(self.frames) if self.frames else 0
+        self._ready = {}  # Loop position -> (frame, render_frame() result)
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self._thread = None
+
+    def matches(self, frames, palette, scale):
+        """True when this buffer renders exactly these frames, palette and zoom."""
+        return self.frames == list(frames) and self.palette == palette and self.scale == scale
+
+    def start(self):
+        """
+        Starts rendering from the start position. Start the buffer when Play is
+        pressed: rendering of the next frames starts now, the first tick comes
+        one delay later.
+        """
+        if self.frames:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stops the worker; it exits after the frame it is rendering."""
+        with self._cond:
+            self._cancelled = True
+            self._ready.clear()
+            self._cond.notify_all()
+
+    def take(self, position):
+        """
+        Moves the playhead past a loop position.
+
+        Returns:
+            (frame, rendered) ready for SpritePreview.set_sprite, or None when
+            the worker has not rendered that position yet (the tick is dropped)
+        """
+        with self._cond:
+            item = self._ready.get(position)
+            if item is None:
+                self.dropped += 1
+            self._playhead = (position + 1) % len(self.frames)
+            if len(self.frames) > self.capacity:
+                # Free the slots that fell behind the playhead for the ones ahead
+                window = self._window()
+                for ready_position in [p for p in self._ready if p not in window]:
+                    del self._ready[ready_position]
+            self._cond.notify_all()
+        return item
+
+    def _window(self):
+        """Loop positions that should be ready, nearest to the playhead first."""
+        count = len(self.frames)
+        return [(self._playhead + ahead) % count for ahead in range(self.capacity)]
+
+    def _next_missing(self):
+        for position in self._window():
+            if position not in self._ready:
+                return position
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                position = None
+                while not self._cancelled:
+                    position = self._next_missing()
+                    if position is not None:
+                        break
+                    self._cond.wait()  # Window full: wait for the playhead
+                if self._cancelled:
+                    return
+
+            try:
+                frame = self.get_frame(self.frames[position])
+                rendered = render_frame(frame, self._flat_palette, self.scale)
+            except Exception as e:
+                self.error = e
+                return
+
+            with self._cond:
+                if self._cancelled:
+                    return
+                # The playhead may have moved on while this frame was rendered
+                if position in self._window():
+                    self._ready[position] = (frame, rendered)
@@ -1,6 +1,147 @@
+import hashlib
+from collections import OrderedDict, namedtuple
+
 import customtkinter as ctk
 from PIL import Image
 
+from src.core.vector_engine import NUMPY_AVAILABLE, np
+
+# Memory budget of finished renders kept by each SpritePreview
+RENDER_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def flatten_palette(palette):
+    """Flat 768-value [r, g, b, ...] list for putpalette, zero padded"""
+    flat_pal = [c for color in palette for c in color[:3]]
+    if len(flat_pal) < 768:
+        flat_pal.extend([0] * (768 - len(flat_pal)))
+    return flat_pal
+
+
+def to_rgba(pil_image, flat_pal=None):
+    """
+    RGBA copy of a frame, with flat_pal applied to P-mode frames.
+    
+    Every index comes out opaque, index 0 included: the preview background is
+    painted with it anyway and a highlighted index 0 has to stay visible.
+    palette_lut() follows the same rule, so all render paths agree.
+    """
+    img = pil_image
+    # Apply NEW palette if provided (on a copy, the source frame is shared)
+    if flat_pal is not None and img.mode == 'P':
+        img = img.copy()
+        img.putpalette(flat_pal)
+        img.info.pop('transparency', None)
+    return img.convert("RGBA")
+
+
+def palette_lut(flat_pal):
+    """
+    256-entry lookup table of a flat palette, one little-endian RGBA uint32
+    per index (opaque, as in to_rgba()). Requires numpy.
+    """
+    lut = np.full((256, 4), 255, dtype=np.uint8)
+    lut[:, :3] = np.asarray(flat_pal[:768], dtype=np.uint8).reshape(256, 3)
+    return lut.view('<u4').ravel()
+
+
+def render_frame(pil_image, flat_pal, scale):
+    """
+    (unscaled RGBA, scaled RGBA) of a frame with a palette applied. Tk-free,
+    so it can run on a worker thread.
+    
+    Args:
+        pil_image: Frame (P mode or RGBA), never modified
+        flat_pal: flatten_palette() result, or None to keep the frame's palette
+        scale: Zoom factor (nearest neighbour)
+    """
+    # Convert to RGBA for transparency handling in display
+    original = to_rgba(pil_image, flat_pal)
+    
+    # Handle scaling
+    scaled = original
+    if scale != 1.0:
+        new_size = (int(original.width * scale), int(original.height * scale))
+        scaled = original.resize(new_size, Image.NEAREST)
+    return original, scaled
+
+
+class RenderCache:
+    """
+    Bounded LRU of finished renders keyed by (frame, palette digest, scale).
+
+    Entries keep a reference to their source frame and only hit for that same
+    object, so a recycled id() never returns a stale render. Sizes are
+    estimated as the source frame, the unscaled RGBA copy and the scaled
+    image twice (PIL and the Tk photo built from it).
+    """
+
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(pil_image, flat_palette, scale):
+        digest = None
+        if flat_palette is not None:
+            digest = hashlib.blake2b(bytes(flat_palette), digest_size=16).digest()
+        return id(pil_image), digest, scale
+
+    @staticmethod
+    def estimate_bytes(original, scaled):
+        return 5 * original.width * original.height + 8 * scaled.width * scaled.height
+
+    def get(self, key, pil_image):
+        """(original RGBA, scaled image, CTkImage) or None."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not pil_image:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, pil_image, render, nbytes):
+        if nbytes > self.max_bytes:
+            return  # Would evict everything else for a single render
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[2]
+        self._entries[key] = (pil_image, render, nbytes)
+        self.size += nbytes
+        while self.size > self.max_bytes:
+            _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+            self.size -= evicted_bytes
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+SwapRender = namedtuple('SwapRender', 'frame scale indexed pixels image ctk_image')
+SwapRender.__doc__ = """
+Reusable render of one frame at one zoom for palette changes. With numpy,
+indexed is the scaled index array and pixels the uint32 buffer the RGBA image
+is a view of, so a new palette is a single palette_lut() lookup into it;
+without, indexed is the scaled P image and pixels None. The image and its
+CTkImage are updated in place.
+"""
+
+
 class SpritePreview(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs) # fg_color defaults to theme
@@ -13,7 +154,9 @@ class SpritePreview(ctk.CTkFrame):
         self.image_label = ctk.CTkLabel(self.container, text="", fg_color="transparent")
         self.image_label.place(relx=0.5, rely=0.5, anchor="center")
         
-        self.original_image = None  # Store unscaled source (RGBA)
+        self._original_image = None  # Store unscaled source (RGBA)
+        # (frame, flat palette) original_image is made from when first read
+        self._original_source = None
         self.original_indexed = None  # Store P-mode for index lookup
         self.current_image = None
         self.ctk_image = None
@@ -26,7 +169,14 @@ class SpritePreview(ctk.CTkFrame):
         self._cached_flat_pal = None
         self._last_bg_hex = None
         
+        # Finished renders, reused when a frame/palette/zoom combination comes back
+        self.render_cache = RenderCache()
+        # Scaled indexed frame re-paletted in place while only the palette changes
+        self._swap = None
+        
         self.scale = 2.0 # Default zoom
+        # Zoom of the image last shown: a zoom change is never a palette swap
+        self._shown_scale = None
         
         # Callback for pixel click: receives palette index
         self.on_pixel_click = None
@@ -35,15 +185,24 @@ class SpritePreview(ctk.CTkFrame):
         self._highlight_indices = None  # Set of indices to highlight
         self._highlight_blink_on = False
         self._highlight_after_id = None
+        # (off, on) renders of the blink and the inputs they were made from
+        self._highlight_renders = None
+        self._highlight_key = None
         
         # Bind click event
         self.image_label.bind("<Button-1>", self._on_click)
         
-    def set_sprite(self, pil_image, palette=None):
+    def set_sprite(self, pil_image, palette=None, rendered=None):
         """
         pil_image: PIL Image (P mode or RGBA)
         palette: List of (r,g,b). If None, uses image's current palette.
+        rendered: Optional render_frame() result for this frame, palette and
+            zoom made elsewhere (playback pre-rendering); used instead of
+            rendering here when the render cache misses.
         """
+        previous_image = self.last_pil_image
+        previous_scale, self._shown_scale = self._shown_scale, self.scale
+        
         # Store for re-scaling
         self.last_pil_image = pil_image
         self.last_palette = palette
@@ -59,14 +218,11 @@ class SpritePreview(ctk.CTkFrame):
         if pil_image is None:
             return
             
-        # Copy to avoid modifying original
-        img = pil_image.copy()
+        # Store indexed image for click lookup (the source is never modified)
+        if pil_image.mode == 'P':
+            self.original_indexed = pil_image
         
-        # Store indexed image for click lookup BEFORE palette modification
-        if img.mode == 'P':
-            self.original_indexed = img.copy()
-        
-        # Apply NEW palette if provided
+        flat_pal = None
         if palette:
             # Get background color from index 0
             bg_color = palette[0][:3] if palette else (255, 255, 255)
@@ -79,42 +235,95 @@ class SpritePreview(ctk.CTkFrame):
                 self.container.configure(fg_color=bg_hex)
                 self.image_label.configure(fg_color=bg_hex)
             
-            # Flatten palette for PIL using list comprehension (faster)
-            flat_pal = [c for color in palette for c in color[:3]]
-            
-            # Pad to 768 if needed
-            if len(flat_pal) < 768:
-                flat_pal.extend([0] * (768 - len(flat_pal)))
-             
-            # If image is P mode
-            if img.mode == 'P':
-                img.putpalette(flat_pal)
-        
-        # Convert to RGBA for transparency handling in display
-        img = img.convert("RGBA")
-        
-        # Store original before scaling
-        self.original_image = img.copy()
-        
-        # Handle scaling
-        if self.scale != 1.0:
-            new_size = (int(img.width * self.scale), int(img.height * self.scale))
-            img = img.resize(new_size, Image.NEAREST)
-            
-        self.current_image = img
-        
-        # Use CTkImage for proper CustomTkinter integration
-        self.ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=(img.width, img.height))
+            flat_pal = flatten_palette(palette)
+        
+        if (rendered is None and flat_pal is not None and pil_image.mode == 'P'
+                and pil_image is previous_image and self.scale == previous_scale):
+            # Same frame with another palette (slider drag): one palette lookup
+            # pass into the reused image unless this exact render is cached
+            key = RenderCache.key(pil_image, flat_pal, self.scale)
+            render = self.render_cache.get(key, pil_image)
+            if render is None:
+                self._swap_palette(pil_image, flat_pal)
+                return
+        else:
+            render = self._cached_render(pil_image, flat_pal, rendered)
+        self.original_image, self.current_image, self.ctk_image = render
         
         # Set image to label
         self.image_label.configure(image=self.ctk_image)
         
+    def _cached_render(self, pil_image, flat_pal, rendered=None):
+        """_render() through the render cache"""
+        key = RenderCache.key(pil_image, flat_pal if pil_image.mode == 'P' else None, self.scale)
+        render = self.render_cache.get(key, pil_image)
+        if render is None:
+            render = self._render(pil_image, flat_pal, rendered)
+            self.render_cache.put(key, pil_image, render,
+                                  RenderCache.estimate_bytes(render[0], render[1]))
+        return render
+        
+    def _render(self, pil_image, flat_pal, rendered=None):
+        """(unscaled RGBA, scaled RGBA, CTkImage) of a frame with a palette applied"""
+        original, scaled = rendered or render_frame(pil_image, flat_pal, self.scale)
+        
+        # Use CTkImage for proper CustomTkinter integration
+        ctk_image = ctk.CTkImage(light_image=scaled, dark_image=scaled, size=(scaled.width, scaled.height))
+        return original, scaled, ctk_image
+        
+    def _swap_palette(self, pil_image, flat_pal):
+        """Shows a P-mode frame with a new palette through the reusable SwapRender"""
+        swap = self._swap
+        if swap is None or swap.frame is not pil_image or swap.scale != self.scale:
+            if self.scale != 1.0:
+                new_size = (int(pil_image.width * self.scale), int(pil_image.height * self.scale))
+                indexed = pil_image.resize(new_size, Image.NEAREST)
+            else:
+                indexed = pil_image
+            if NUMPY_AVAILABLE:
+                indexed = np.asarray(indexed, dtype=np.uint8)
+                pixels = np.empty(indexed.shape, dtype='<u4')
+                # Shares the buffer, so filling pixels repaints the image
+                image = Image.frombuffer("RGBA", (indexed.shape[1], indexed.shape[0]),
+                                         pixels, "raw", "RGBA", 0, 1)
+                np.take(palette_lut(flat_pal), indexed, out=pixels)
+            else:
+                pixels = None
+                image = to_rgba(indexed, flat_pal)
+            ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=(image.width, image.height))
+            self._swap = swap = SwapRender(pil_image, self.scale, indexed, pixels, image, ctk_image)
+        else:
+            if swap.pixels is not None:
+                np.take(palette_lut(flat_pal), swap.indexed, out=swap.pixels)
+            else:
+                swap.image.paste(to_rgba(swap.indexed, flat_pal))
+            # Drops the photos made from the old pixels and redraws the labels showing it
+            swap.ctk_image.configure(light_image=swap.image, dark_image=swap.image)
+        
+        self.current_image, self.ctk_image = swap.image, swap.ctk_image
+        self._original_image, self._original_source = None, (pil_image, flat_pal)
+        if self.image_label.cget("image") is not swap.ctk_image:
+            self.image_label.configure(image=swap.ctk_image)
+    
     def set_scale(self, scale):
         self.scale = scale
         # Redraw if image exists
         if self.last_pil_image:
             self.set_sprite(self.last_pil_image, self.last_palette)
 
+    @property
+    def original_image(self):
+        """Unscaled RGBA of the frame shown; palette swaps only make it when read"""
+        if self._original_image is None and self._original_source is not None:
+            self._original_image = to_rgba(*self._original_source)
+            self._original_source = None
+        return self._original_image
+
+    @original_image.setter
+    def original_image(self, image):
+        self._original_image = image
+        self._original_source = None
+
     def _on_click(self, event):
         """Handle click on sprite preview to select palette index"""
         if self.original_indexed is None:
@@ -194,44 +403,45 @@ class SpritePreview(ctk.CTkFrame):
         self._highlight_after_id = self.after(300, self._do_blink)
     
     def _render_with_highlight(self):
-        """Render sprite with highlighted pixels inverted."""
+        """Show the on or off state of the blink, rendering both only when the
+        frame, palette, highlighted indices or zoom changed."""
         if self.original_indexed is None or self.last_palette is None:
             return
-            
-        img = self.last_pil_image.copy()
-        
-        if img.mode != 'P':
+        if self.last_pil_image.mode != 'P':
             return
-            
-        # Create modified palette
-        modified_pal = list(self.last_palette)
-        
-        if self._highlight_blink_on and self._highlight_indices:
-            for idx in self._highlight_indices:
-                if 0 <= idx < 256:
-                    # Invert/highlight the target color
-                    orig = modified_pal[idx][:3]
-                    # Use bright contrasting color (cyan for dark colors, magenta for bright)
-                    brightness = (orig[0] + orig[1] + orig[2]) / 3
-                    if brightness > 127:
-                        highlight = (255, 0, 255)  # Magenta
-                    else:
-                        highlight = (0, 255, 255)  # Cyan
-                    modified_pal[idx] = (*highlight, 255)
-        
-        # Flatten palette
-        flat_pal = [c for color in modified_pal for c in color[:3]]
-        if len(flat_pal) < 768:
-            flat_pal.extend([0] * (768 - len(flat_pal)))
         
-        img.putpalette(flat_pal)
-        img = img.convert("RGBA")
-        
-        # Apply scaling
-        if self.scale != 1.0:
-            new_size = (int(img.width * self.scale), int(img.height * self.scale))
-            img = img.resize(new_size, Image.NEAREST)
-        
-        self.current_image = img
-        self.ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=(img.width, img.height))
+        # The key holds the frame and palette themselves (compared by identity),
+        # so a recycled id() can't match
+        indices = frozenset(self._highlight_indices or ())
+        key = self._highlight_key
+        if (key is None or key[0] is not self.last_pil_image or key[1] is not self.last_palette
+                or key[2] != indices or key[3] != self.scale):
+            self._highlight_renders = self._render_blink_states()
+            self._highlight_key = (self.last_pil_image, self.last_palette, indices, self.scale)
+        
+        render = self._highlight_renders[1 if self._highlight_blink_on else 0]
+        self.current_image, self.ctk_image = render[1], render[2]
         self.image_label.configure(image=self.ctk_image)
+    
+    def _render_blink_states(self):
+        """(off, on) renders of the current frame; highlighted pixels are inverted in "on"."""
+        # Create modified palette
+        modified_pal = list(self.last_palette)
+        for idx in self._highlight_indices or ():
+            if 0 <= idx < len(modified_pal):
+                # Invert/highlight the target color
+                orig = modified_pal[idx][:3]
+                # Use bright contrasting color (cyan for dark colors, magenta for bright)
+                brightness = (orig[0] + orig[1] + orig[2]) / 3
+                if brightness > 127:
+                    highlight = (255, 0, 255)  # Magenta
+                else:
+                    highlight = (0, 255, 255)  # Cyan
+                modified_pal[idx] = (*highlight, 255)
+        
+        # Both states go through the render cache: "off" is usually the frame
+        # set_sprite just rendered
+        img = self.last_pil_image
+        off = self._cached_render(img, flatten_palette(self.last_palette))
+        on = self._cached_render(img, flatten_palette(modified_pal))
+        return off, on
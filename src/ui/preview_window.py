@@ -1,11 +1,16 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import os
-import glob
 
 from src.core.parsers.spr import SprParser
-from src.core.pal_handler import PaletteHandler
+from src.core.parsers.act import ActParser, DIRECTIONS
+from src.core.sprite_cache import SpriteCache
+from src.core.pal_handler import PaletteHandler, PAL_SIZE
+from src.core.palbank import PaletteBank
+from src.core.pal_index import PaletteFolderIndex
 from src.ui.preview import SpritePreview
+from src.ui.playback import PlaybackBuffer
+from src.ui.contact_sheet import ContactSheet
 
 
 class PreviewWindow(ctk.CTkToplevel):
@@ -20,7 +25,12 @@ class PreviewWindow(ctk.CTkToplevel):
         
         # State
         self.spr_parser = None
-        self.palettes = []  # List of palette file paths
+        self.act_parser = None  # .act next to the SPR, drives the animations
+        self.palettes = []  # List of palette file paths, or the open PaletteBank
+        self.bank = None
+        self.palette_index = None  # PaletteFolderIndex of the loaded folder
+        self._index_version = -1
+        self._index_poll_job = None
         self.current_palette_index = 0
         self.current_frame_index = 0
         
@@ -44,6 +54,15 @@ class PreviewWindow(ctk.CTkToplevel):
         )
         self.btn_load_folder.pack(side="left", padx=5)
         
+        self.btn_load_bank = ctk.CTkButton(
+            self.top_frame, 
+            text="🗃 Abrir Banco", 
+            command=self._load_palette_bank,
+            fg_color="#E07A5F",
+            hover_color="#C0583D"
+        )
+        self.btn_load_bank.pack(side="left", padx=5)
+        
         # --- Info & Zoom Frame ---
         self.info_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.info_frame.pack(fill="x", padx=10, pady=5)
@@ -69,6 +88,11 @@ class PreviewWindow(ctk.CTkToplevel):
         self.preview = SpritePreview(self)
         self.preview.pack(fill="both", expand=True, padx=10, pady=10)
         
+        # Grid of the current frame under a page of palettes (shown instead of the preview)
+        self.sheet = ContactSheet(self)
+        self.sheet.on_select = self._on_sheet_select
+        self.sheet_visible = False
+        
         # --- Navigation ---
         self.nav_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.nav_frame.pack(fill="x", padx=10, pady=10)
@@ -86,6 +110,9 @@ class PreviewWindow(ctk.CTkToplevel):
         self.btn_next_pal = ctk.CTkButton(self.nav_frame, text="▶", width=40, command=self._next_palette)
         self.btn_next_pal.pack(side="left", padx=2)
         
+        self.btn_sheet = ctk.CTkButton(self.nav_frame, text="▦", width=40, command=self._toggle_contact_sheet)
+        self.btn_sheet.pack(side="left", padx=2)
+        
         # Separator
         ctk.CTkLabel(self.nav_frame, text="   |   ").pack(side="left")
         
@@ -106,11 +133,22 @@ class PreviewWindow(ctk.CTkToplevel):
         self.lbl_pal_name = ctk.CTkLabel(self, text="", text_color="gray")
         self.lbl_pal_name.pack(pady=(0, 5))
         
+        # Palette filter (folders only): part of the file name, e.g. a class name
+        self.filter_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.filter_frame.pack(pady=(0, 5))
+        
+        ctk.CTkLabel(self.filter_frame, text="Filtro:").pack(side="left", padx=(0, 5))
+        
+        self.filter_var = ctk.StringVar()
+        self.entry_filter = ctk.CTkEntry(self.filter_frame, textvariable=self.filter_var, width=200)
+        self.entry_filter.pack(side="left")
+        self.filter_var.trace_add("write", lambda *args: self._apply_palette_filter())
+        
         # --- Animation Controls ---
         self.anim_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.anim_frame.pack(fill="x", padx=10, pady=5)
         
-        # Action list (RO animations)
+        # Action list (RO player animations; ACT files of other sprites get numbered actions)
         self.actions = {
             0: "Idle (Parado)",
             1: "Walk (Andando)",
@@ -121,6 +159,7 @@ class PreviewWindow(ctk.CTkToplevel):
             11: "Attack 3",
             12: "Skill Cast",
         }
+        self.player_action_types = 13
         
         self.lbl_anim = ctk.CTkLabel(self.anim_frame, text="Animação:", font=("Roboto", 11, "bold"))
         self.lbl_anim.pack(side="left", padx=(0, 5))
@@ -139,6 +178,8 @@ class PreviewWindow(ctk.CTkToplevel):
         self.is_playing = False
         self.animation_speed = 150  # ms between frames
         self.animation_job = None
+        self.playback = None  # PlaybackBuffer pre-rendering the playing action
+        self.display_palette = None  # Palette of the frame on screen
         
         self.btn_play = ctk.CTkButton(
             self.anim_frame, 
@@ -169,19 +210,53 @@ class PreviewWindow(ctk.CTkToplevel):
         self.current_action = 0
         self.action_frames = []  # List of frame indices for current action
         self.action_frame_index = 0  # Current frame within action
+        self.action_delay = None  # ms per frame from the ACT, None without one
         
         # Focus this window
         self.focus_force()
         self.grab_set()
     
+    def _action_stride(self):
+        """ACT actions per action type (one per direction, facing south first)"""
+        return DIRECTIONS if self.act_parser.num_actions >= DIRECTIONS else 1
+
+    def _refresh_action_list(self):
+        """Fill the action menu from the loaded ACT (or the default RO player actions)"""
+        if self.act_parser and self.act_parser.num_actions:
+            action_types = self.act_parser.num_actions // self._action_stride()
+            if action_types >= self.player_action_types:
+                values = [f"{k}: {v}" for k, v in self.actions.items() if k < action_types]
+            else:
+                values = [f"{k}: Ação {k}" for k in range(action_types)]
+        else:
+            values = [f"{k}: {v}" for k, v in self.actions.items()]
+            
+        self.combo_action.configure(values=values)
+        self.action_var.set(values[0])
+        self.current_action = int(values[0].split(":")[0])
+
     def _calculate_action_frames(self):
         """Calculate frame indices for current action based on RO sprite structure"""
+        self.action_delay = None
         if not self.spr_parser or not self.spr_parser.images:
             self.action_frames = []
             return
             
         total_frames = len(self.spr_parser.images)
         
+        if self.act_parser and self.act_parser.num_actions:
+            # Frames, order and timing straight from the ACT (direction 0)
+            act_index = self.current_action * self._action_stride()
+            if act_index < self.act_parser.num_actions:
+                sprites = self.act_parser.frame_sprites(act_index, self.spr_parser.num_indexed)
+                self.action_frames = [f for f in sprites if 0 <= f < total_frames]
+                self.action_delay = self.act_parser.get_delay(act_index)
+            else:
+                self.action_frames = []
+            self.action_frame_index = 0
+            return
+        
+        # No ACT: fixed frame ranges of RO body sprites
         # RO Body Sprite Frame Indices (from user):
         # Idle: 0-4
         # Walk: 5-44
@@ -241,25 +316,68 @@ class PreviewWindow(ctk.CTkToplevel):
         
         if self.is_playing:
             self.btn_play.configure(text="⏸ Pause", fg_color="#FF5555", hover_color="#CC0000")
-            self._animate()
+            if self.action_frames and self.spr_parser:
+                self._sync_playback((self.action_frame_index + 1) % len(self.action_frames))
+            self.animation_job = self.after(self._frame_delay(), self._animate)
         else:
             self.btn_play.configure(text="▶ Play", fg_color="#4CAF50", hover_color="#388E3C")
             if self.animation_job:
                 self.after_cancel(self.animation_job)
                 self.animation_job = None
+            self._stop_playback()
+    
+    def _frame_delay(self):
+        """ms until the next animation frame (ACT delay scaled by the speed slider, 150 = 1x)"""
+        if self.action_delay:
+            return max(10, int(self.action_delay * self.animation_speed / 150))
+        return self.animation_speed
     
     def _animate(self):
         """Advance animation frame"""
-        if not self.is_playing or not self.action_frames:
+        self.animation_job = None
+        if not self.is_playing or not self.action_frames or not self.spr_parser:
             return
             
         # Advance to next frame in action
         self.action_frame_index = (self.action_frame_index + 1) % len(self.action_frames)
-        self.current_frame_index = self.action_frames[self.action_frame_index]
-        self._update_display()
         
-        # Schedule next frame
-        self.animation_job = self.after(self.animation_speed, self._animate)
+        # Only swap in the pre-rendered image; a frame that isn't ready yet is dropped
+        playback = self._sync_playback(self.action_frame_index)
+        item = playback.take(self.action_frame_index)
+        if playback.error is not None:
+            self._playback_failed(playback.error)
+            return
+        if item is not None:
+            frame, rendered = item
+            self.current_frame_index = self.action_frames[self.action_frame_index]
+            self.lbl_frame_count.configure(text=f"{self.current_frame_index + 1}/{len(self.spr_parser.images)}")
+            self.preview.set_sprite(frame, palette=self.playback.palette, rendered=rendered)
+        
+        self.animation_job = self.after(self._frame_delay(), self._animate)
+    
+    def _sync_playback(self, start):
+        """
+        PlaybackBuffer of the current action, palette and zoom; a new one
+        (rendering from loop position `start`) when any of them changed.
+        """
+        if self.playback is None or not self.playback.matches(
+                self.action_frames, self.display_palette, self.preview.scale):
+            self._stop_playback()
+            self.playback = PlaybackBuffer(self.spr_parser.get_image, self.action_frames,
+                                           self.display_palette, self.preview.scale,
+                                           start=start).start()
+        return self.playback
+    
+    def _stop_playback(self):
+        if self.playback is not None:
+            self.playback.cancel()
+            self.playback = None
+
+    def _playback_failed(self, error):
+        """Stops playing when a frame could not be rendered"""
+        if self.is_playing:
+            self._toggle_play()
+        messagebox.showerror("Erro", f"Falha ao reproduzir a animação: {error}")
     
     def _on_speed_change(self, value):
         """Handle speed slider change"""
@@ -287,7 +405,8 @@ class PreviewWindow(ctk.CTkToplevel):
             return
             
         try:
-            self.spr_parser = SprParser(path)
+            self._stop_playback()
+            self.spr_parser = SprParser(path, disk_cache=SpriteCache.default())
             self.spr_parser.extract_palette()
             self.spr_parser.parse_images()
             self.current_frame_index = 0
@@ -295,31 +414,178 @@ class PreviewWindow(ctk.CTkToplevel):
             spr_name = os.path.basename(path)
             self.lbl_info.configure(text=f"SPR: {spr_name}")
             
+            try:
+                self.act_parser = ActParser.for_sprite(path)
+            except (OSError, ValueError) as e:
+                self.act_parser = None
+                messagebox.showwarning("Aviso", f"ACT ignorado, usando quadros padrão: {e}")
+            if self.act_parser:
+                self.lbl_info.configure(text=f"SPR: {spr_name} + ACT")
+            self._refresh_action_list()
+            self._calculate_action_frames()
+            if self.action_frames:
+                self.current_frame_index = self.action_frames[0]
+            
             self._update_display()
             
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao carregar SPR: {e}")
             
     def _load_palette_folder(self):
-        """Load folder with .pal files"""
+        """Load folder with .pal files (scanned in the background, natural order)"""
         folder = filedialog.askdirectory(title="Selecione a pasta com arquivos .pal")
         if not folder:
             return
             
-        # Find all .pal files
-        pal_files = glob.glob(os.path.join(folder, "*.pal"))
-        if not pal_files:
+        self._close_bank()
+        self._stop_palette_index()
+        self.palettes = []
+        self.current_palette_index = 0
+        
+        # First palettes show up as soon as the first batch is indexed
+        self.palette_index = PaletteFolderIndex(folder).start()
+        self._index_version = -1
+        self._poll_palette_index()
+        
+    def _poll_palette_index(self):
+        """Pick up new index batches until the folder scan is done"""
+        self._index_poll_job = None
+        index = self.palette_index
+        if index is None:
+            return
+            
+        if index.version != self._index_version:
+            self._index_version = index.version
+            self._apply_palette_filter()
+            
+        if not index.done:
+            self._index_poll_job = self.after(100, self._poll_palette_index)
+        elif index.error is not None:
+            messagebox.showerror("Erro", f"Falha ao ler a pasta: {index.error}")
+        elif not len(index):
             messagebox.showwarning("Aviso", "Nenhum arquivo .pal encontrado na pasta!")
+            
+    def _apply_palette_filter(self):
+        """Rebuild the palette list from the folder index, keeping the current palette"""
+        if self.palette_index is None:
             return
+        current = None
+        if self.palettes and self.current_palette_index < len(self.palettes):
+            current = self.palettes[self.current_palette_index]
             
-        # Sort files naturally
-        pal_files.sort()
+        self.palettes = self.palette_index.paths(text=self.filter_var.get().strip() or None)
+        try:
+            self.current_palette_index = self.palettes.index(current) if current else 0
+        except ValueError:
+            self.current_palette_index = 0
+        self._update_display()
         
-        self.palettes = pal_files
+    def _stop_palette_index(self):
+        if self._index_poll_job is not None:
+            self.after_cancel(self._index_poll_job)
+            self._index_poll_job = None
+        if self.palette_index is not None:
+            self.palette_index.cancel()
+            self.palette_index = None
+            
+    def _load_palette_bank(self):
+        """Open a .palbank file (palettes are read on demand from the mapped file)"""
+        path = filedialog.askopenfilename(
+            filetypes=[("Banco de Paletas", "*.palbank")],
+            title="Selecione o banco de paletas"
+        )
+        if not path:
+            return
+            
+        try:
+            bank = PaletteBank(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erro", f"Falha ao abrir banco: {e}")
+            return
+        if not len(bank):
+            bank.close()
+            messagebox.showwarning("Aviso", "O banco não contém paletas!")
+            return
+            
+        self._close_bank()
+        self._stop_palette_index()
+        self.bank = bank
+        self.palettes = bank
         self.current_palette_index = 0
         
         self._update_display()
         
+    def _close_bank(self):
+        if self.bank is not None:
+            if self.palettes is self.bank:
+                self.palettes = []
+            self.bank.close()
+            self.bank = None
+            
+    def _palette_name(self, index):
+        if self.bank is not None:
+            return self.bank.name(index)
+        return os.path.basename(self.palettes[index])
+        
+    def _load_palette(self, index):
+        if self.bank is not None:
+            return self.bank.palette(index)
+        return PaletteHandler.load(self.palettes[index])
+        
+    def _palette_bytes(self, index):
+        """Raw 1024-byte .pal content of a palette, or None if it can't be read"""
+        if self.bank is not None:
+            return self.bank[index]
+        try:
+            with open(self.palettes[index], 'rb') as f:
+                data = f.read(PAL_SIZE)
+        except OSError:
+            return None
+        return data if len(data) == PAL_SIZE else None
+        
+    def _toggle_contact_sheet(self):
+        """Switch between the single preview and the palette grid"""
+        if self.sheet_visible:
+            self.sheet.pack_forget()
+            self.preview.pack(fill="both", expand=True, padx=10, pady=10, before=self.nav_frame)
+            self.sheet_visible = False
+            self._update_display()
+            return
+            
+        if not self.spr_parser or not self.spr_parser.images or not self.palettes:
+            messagebox.showwarning("Aviso", "Carregue um SPR e uma pasta de paletas primeiro!")
+            return
+        if self.spr_parser.images[self.current_frame_index].mode != 'P':
+            messagebox.showwarning("Aviso", "O quadro atual é RGBA e não usa paleta.")
+            return
+        if self.is_playing:
+            self._toggle_play()
+            
+        self.preview.pack_forget()
+        self.sheet.pack(fill="both", expand=True, padx=10, pady=10, before=self.nav_frame)
+        self.sheet_visible = True
+        self.sheet.page = self.current_palette_index // self.sheet.page_size
+        self._update_display()
+        
+    def _refresh_contact_sheet(self):
+        """Point the grid at the current frame and palette list (re-rendered only if they changed)"""
+        frame = self.spr_parser.images[self.current_frame_index]
+        if frame.mode != 'P':
+            return
+        self.sheet.set_source(frame, self.palettes, self._palette_bytes, self._palette_name)
+        self.sheet.show_page(self.sheet.page)
+        
+    def _on_sheet_select(self, index):
+        """Thumbnail clicked: back to the single preview with that palette"""
+        self.current_palette_index = index
+        self._toggle_contact_sheet()
+        
+    def destroy(self):
+        self._stop_playback()
+        self._stop_palette_index()
+        self._close_bank()
+        super().destroy()
+        
     def _prev_palette(self):
         if not self.palettes:
             return
@@ -358,8 +624,9 @@ class PreviewWindow(ctk.CTkToplevel):
         # Update palette counter
         if self.palettes:
             total_pals = len(self.palettes)
-            self.lbl_pal_count.configure(text=f"{self.current_palette_index + 1}/{total_pals}")
-            pal_name = os.path.basename(self.palettes[self.current_palette_index])
+            scanning = "+" if self.palette_index is not None and not self.palette_index.done else ""
+            self.lbl_pal_count.configure(text=f"{self.current_palette_index + 1}/{total_pals}{scanning}")
+            pal_name = self._palette_name(self.current_palette_index)
             self.lbl_pal_name.configure(text=pal_name)
         else:
             self.lbl_pal_count.configure(text="0/0")
@@ -372,13 +639,16 @@ class PreviewWindow(ctk.CTkToplevel):
         # Get frame image
         if self.current_frame_index >= len(self.spr_parser.images):
             self.current_frame_index = 0
+        if self.sheet_visible:
+            if self.palettes:
+                self._refresh_contact_sheet()
+            return
         base_img = self.spr_parser.images[self.current_frame_index]
         
         # Get palette
         if self.palettes:
             try:
-                pal_path = self.palettes[self.current_palette_index]
-                palette = PaletteHandler.load(pal_path)
+                palette = self._load_palette(self.current_palette_index)
                 palette_rgba = [(r, g, b, 255) for r, g, b in palette]
             except Exception as e:
                 messagebox.showerror("Erro", f"Falha ao carregar paleta: {e}")
@@ -387,4 +657,5 @@ class PreviewWindow(ctk.CTkToplevel):
             # Use original palette from SPR
             palette_rgba = self.spr_parser.palette
             
+        self.display_palette = palette_rgba
         self.preview.set_sprite(base_img, palette=palette_rgba)